@@ -0,0 +1,72 @@
+# backend 模块：增强 / 直方图 / 色彩空间函数的后端注册表
+# 纯 Python 实现为参考后端（python），NumPy 向量化实现为可选后端（numpy）
+import os
+from importlib import import_module
+
+# 通过环境变量选择默认后端，例如 ENHANCE_BACKEND=numpy python main.py
+BACKEND_ENV = 'ENHANCE_BACKEND'
+DEFAULT_BACKEND = 'python'
+
+# 每个后端必须提供的函数（各增强函数都接受可选的 hist 参数：已统计好的 Histogram）
+BACKEND_FUNCTIONS = (
+    'compute_histogram',
+    'rgb_to_ycrcb',
+    'histogram_equalization',
+    'clahe_equalization',
+    'sliding_equalization',
+    'contrast_stretch',
+    'gamma_correction',
+)
+
+# 名称 → 模块路径（延迟导入，未安装 NumPy 时不影响纯 Python 后端）或已加载的后端对象
+_REGISTRY = {
+    'python': 'backend.python_backend',
+    'numpy': 'backend.numpy_backend',
+}
+
+
+def register_backend(name, backend):
+    """
+    注册一个后端
+    参数：
+        name: 后端名称
+        backend: 模块路径字符串（首次使用时导入），或任意提供 BACKEND_FUNCTIONS 属性的对象
+    """
+    if not isinstance(backend, str):
+        missing = [f for f in BACKEND_FUNCTIONS if not hasattr(backend, f)]
+        if missing:
+            raise ValueError(f"后端 {name} 缺少函数: {', '.join(missing)}")
+    _REGISTRY[name] = backend
+
+
+def get_backend(name=None):
+    """
+    获取后端对象，其属性即为 BACKEND_FUNCTIONS 中的各个函数
+    参数：name 为 None 时读取环境变量 ENHANCE_BACKEND，仍为空则使用 python 参考后端
+    """
+    if name is None:
+        name = os.environ.get(BACKEND_ENV) or DEFAULT_BACKEND
+    if name not in _REGISTRY:
+        raise ValueError(f"未知后端：{name}（可选：{', '.join(sorted(_REGISTRY))}）")
+    backend = _REGISTRY[name]
+    if isinstance(backend, str):
+        backend = import_module(backend)
+        _REGISTRY[name] = backend
+    return backend
+
+
+def available_backends():
+    """返回当前环境下可成功加载的后端名称列表"""
+    names = []
+    for name in sorted(_REGISTRY):
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def dispatch(func_name, *args, backend=None, **kwargs):
+    """按名称调用指定后端（或默认后端）中的函数"""
+    return getattr(get_backend(backend), func_name)(*args, **kwargs)
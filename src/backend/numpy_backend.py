@@ -0,0 +1,131 @@
+# NumPy 向量化后端：与纯 Python 参考实现逐项对齐（同样的浮点运算顺序与四舍六入五成双）
+import math
+
+import numpy as np
+
+from image_io.buffer import ImageBuffer
+from enhancement.clahe import clip_histogram
+# 滑动窗口 CLAHE 的开销在逐像素的大整数运算上，向量化没有收益，直接沿用参考实现（结果逐位一致）
+from enhancement.sliding import sliding_equalization  # noqa: F401
+
+NAME = 'numpy'
+
+
+def _as_array(pixels):
+    """ImageBuffer 零拷贝转为 uint8 数组（H×W 或 H×W×C），嵌套列表则复制一份"""
+    if isinstance(pixels, ImageBuffer):
+        arr = np.frombuffer(pixels.data, dtype=np.uint8)
+        if pixels.channels == 1:
+            return arr.reshape(pixels.height, pixels.width)
+        return arr.reshape(pixels.height, pixels.width, pixels.channels)
+    return np.asarray(pixels)
+
+
+def _restore(template, arr):
+    """按调用方传入的类型返回结果：ImageBuffer 或嵌套列表"""
+    if isinstance(template, ImageBuffer):
+        arr = np.ascontiguousarray(arr, dtype=np.uint8)
+        channels = arr.shape[2] if arr.ndim == 3 else 1
+        return ImageBuffer(arr.shape[1], arr.shape[0], channels, bytearray(arr))
+    return arr.tolist()
+
+
+def _round_to_uint8(values):
+    """与 Python round() 一致的银行家舍入，并裁剪到字节范围"""
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+def _cdf_lut(hist):
+    """由直方图构建均衡化 LUT，公式与参考实现一致；CDF 退化时返回恒等映射"""
+    cdf = np.cumsum(hist)
+    total = int(cdf[-1])
+    nonzero = cdf[cdf > 0]
+    cdf_min = int(nonzero[0]) if nonzero.size else 0
+    if total == cdf_min:
+        return np.arange(256, dtype=np.float64)
+    return np.rint((cdf - cdf_min) / (total - cdf_min) * 255)
+
+
+def compute_histogram(y_channel):
+    arr = _as_array(y_channel)
+    if not isinstance(y_channel, ImageBuffer):
+        arr = np.clip(arr.astype(np.int64), 0, 255)
+    return np.bincount(arr.ravel(), minlength=256).tolist()
+
+
+def rgb_to_ycrcb(pixels):
+    arr = _as_array(pixels).astype(np.float64)
+    r, g, b = arr[..., 0], arr[..., 1], arr[..., 2]
+    return _restore(pixels, _round_to_uint8(0.299 * r + 0.587 * g + 0.114 * b))
+
+
+def histogram_equalization(y_channel, hist=None):
+    arr = _as_array(y_channel).astype(np.uint8)
+    hist = np.bincount(arr.ravel(), minlength=256) if hist is None else np.asarray(list(hist))
+    lut = _round_to_uint8(_cdf_lut(hist))
+    return _restore(y_channel, lut[arr])
+
+
+def contrast_stretch(y_channel, hist=None):
+    arr = _as_array(y_channel).astype(np.uint8)
+    if hist is not None:
+        y_min, y_max = hist.min, hist.max
+    else:
+        y_min, y_max = int(arr.min()), int(arr.max())
+    if y_max == y_min:
+        return y_channel  # 若亮度无变化，返回原图
+    lut = _round_to_uint8((np.arange(256) - y_min) * 255 / (y_max - y_min))
+    return _restore(y_channel, lut[arr])
+
+
+def gamma_correction(y_channel, gamma=1.5, hist=None):
+    arr = _as_array(y_channel).astype(np.uint8)
+    lut = _round_to_uint8((np.arange(256) / 255) ** gamma * 255)
+    return _restore(y_channel, lut[arr])
+
+
+# workers 与参考实现的签名保持一致；向量化实现本身不分进程
+def clahe_equalization(y_channel, tile_size=8, clip_limit=40, redistribute_remainder=False, hist=None, workers=1):
+    arr = _as_array(y_channel).astype(np.uint8)
+    height, width = arr.shape
+    tile_rows = tile_cols = tile_size
+    block_h = math.ceil(height / tile_rows)
+    block_w = math.ceil(width / tile_cols)
+
+    # === 1. 每个 tile 的裁剪直方图 → LUT ===
+    luts = np.empty((tile_rows, tile_cols, 256), dtype=np.float64)
+    for ty in range(tile_rows):
+        for tx in range(tile_cols):
+            tile = arr[ty * block_h:(ty + 1) * block_h, tx * block_w:(tx + 1) * block_w]
+            hist = np.bincount(tile.ravel(), minlength=256)
+            if redistribute_remainder:
+                hist = np.array(clip_histogram(hist.tolist(), clip_limit, True))
+            else:
+                excess = int(np.maximum(hist - clip_limit, 0).sum())
+                hist = np.minimum(hist, clip_limit) + excess // 256
+            luts[ty, tx] = _cdf_lut(hist)
+
+    # === 2. 四邻域 LUT 双线性插值（逐行 / 逐列索引一次算好）===
+    gx = np.arange(width) / block_w
+    gy = np.arange(height) / block_h
+    tx = gx.astype(np.int64)
+    ty = gy.astype(np.int64)
+    dx = (gx - tx)[None, :]
+    dy = (gy - ty)[:, None]
+    tx0 = np.minimum(tx, tile_cols - 1)[None, :]
+    tx1 = np.minimum(tx + 1, tile_cols - 1)[None, :]
+    ty0 = np.minimum(ty, tile_rows - 1)[:, None]
+    ty1 = np.minimum(ty + 1, tile_rows - 1)[:, None]
+
+    p00 = luts[ty0, tx0, arr]
+    p10 = luts[ty0, tx1, arr]
+    p01 = luts[ty1, tx0, arr]
+    p11 = luts[ty1, tx1, arr]
+
+    interp = (
+        (1 - dx) * (1 - dy) * p00 +
+        dx * (1 - dy) * p10 +
+        (1 - dx) * dy * p01 +
+        dx * dy * p11
+    )
+    return _restore(y_channel, _round_to_uint8(interp))
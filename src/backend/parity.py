@@ -0,0 +1,86 @@
+# 后端一致性校验：在合成图像上比较候选后端与参考后端的输出
+# 用法：python -m backend.parity [候选后端名]
+import random
+import sys
+
+from image_io.buffer import ImageBuffer
+from . import get_backend
+
+# 各函数允许的最大逐像素误差（0 表示要求逐位一致）
+TOLERANCE = {
+    'compute_histogram': 0,
+    'rgb_to_ycrcb': 0,
+    'histogram_equalization': 0,
+    'clahe_equalization': 1,
+    'sliding_equalization': 0,
+    'contrast_stretch': 0,
+    'gamma_correction': 1,
+}
+
+
+def synthetic_planes(sizes=((64, 48), (133, 97)), seed=0):
+    """
+    生成一组确定性的合成单通道平面：随机噪声、低对比度、常数平面
+    返回 [(名称, ImageBuffer)]
+    """
+    rng = random.Random(seed)
+    planes = []
+    for w, h in sizes:
+        n = w * h
+        planes.append((f'noise_{w}x{h}', ImageBuffer(w, h, 1, bytes(rng.randrange(256) for _ in range(n)))))
+        planes.append((f'low_{w}x{h}', ImageBuffer(w, h, 1, bytes(rng.randrange(100, 140) for _ in range(n)))))
+        planes.append((f'flat_{w}x{h}', ImageBuffer(w, h, 1, bytes([77]) * n)))
+    return planes
+
+
+def _max_diff(a, b):
+    """两个输出（ImageBuffer 或列表）之间的最大逐元素误差；尺寸不同返回 None"""
+    if isinstance(a, ImageBuffer):
+        if a.size != b.size or a.channels != b.channels:
+            return None
+        a, b = a.data, b.data
+    if len(a) != len(b):
+        return None
+    return max((abs(x - y) for x, y in zip(a, b)), default=0)
+
+
+def check_parity(candidate='numpy', reference='python', planes=None):
+    """
+    逐函数比较两个后端
+    返回失败项列表 [(函数名, 平面名, 误差)]，空列表表示全部通过
+    """
+    ref = get_backend(reference)
+    cand = get_backend(candidate)
+    planes = planes or synthetic_planes()
+    failures = []
+
+    for name, plane in planes:
+        rgb = ImageBuffer(plane.width, plane.height, 3,
+                          bytes(v for p in plane.data for v in (p, 255 - p, p // 2)))
+        cases = [
+            ('compute_histogram', (plane,), {}),
+            ('rgb_to_ycrcb', (rgb,), {}),
+            ('histogram_equalization', (plane,), {}),
+            ('clahe_equalization', (plane,), {}),
+            ('clahe_equalization', (plane,), {'tile_size': 4, 'clip_limit': 10}),
+            ('clahe_equalization', (plane,), {'redistribute_remainder': True}),
+            ('sliding_equalization', (plane,), {'radius': 8, 'clip_limit': 10}),
+            ('contrast_stretch', (plane,), {}),
+            ('gamma_correction', (plane,), {'gamma': 0.7}),
+            ('gamma_correction', (plane,), {'gamma': 1.5}),
+        ]
+        for func, args, kwargs in cases:
+            diff = _max_diff(getattr(ref, func)(*args, **kwargs), getattr(cand, func)(*args, **kwargs))
+            if diff is None or diff > TOLERANCE[func]:
+                failures.append((func, name, diff))
+    return failures
+
+
+if __name__ == '__main__':
+    candidate = sys.argv[1] if len(sys.argv) > 1 else 'numpy'
+    failures = check_parity(candidate)
+    for func, name, diff in failures:
+        print(f'❌ {func} @ {name}: 误差 {diff}')
+    if failures:
+        sys.exit(1)
+    print(f'✅ {candidate} 后端与参考后端一致')
@@ -0,0 +1,7 @@
+# 纯 Python 参考后端：直接复用项目中的手工实现
+from histogram import compute_histogram
+from image_io import rgb_to_ycrcb
+from enhancement import histogram_equalization, clahe_equalization, contrast_stretch, gamma_correction
+from enhancement import sliding_equalization
+
+NAME = 'python'
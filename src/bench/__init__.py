@@ -0,0 +1,5 @@
+# bench 模块：基准测试套件（合成图像、用例注册表、计时 / 峰值内存 / 基线对比）
+# 用法：python -m bench -h
+from .images import SIZES, CONTENTS, synthetic_plane, synthetic_rgb
+from .cases import BenchCase, default_cases, prepare_inputs
+from .runner import run_benchmarks, time_case, select_cases, compare, save_results, load_results
@@ -0,0 +1,142 @@
+# 基准用例注册表：每个用例说明被测函数与所需的输入形式
+# 输入在计时之外预先准备好（如嵌套列表、Histogram），计时只覆盖被测函数本身
+from functools import partial
+
+from backend import available_backends, get_backend
+from enhancement import enhance_all, histogram_equalization, clahe_equalization
+from enhancement.clahe import clahe_equalization_0, clahe_equalization_1, clahe_equalization_2
+from enhancement.clahe_parallel import PARALLEL_MIN_PIXELS, clahe_equalization_parallel
+from enhancement.sequence import SEQUENCE_MODES, enhance_sequence
+from enhancement.sliding import sliding_equalization
+from enhancement.strips import clahe_equalization_strips
+from histogram import Histogram, render_comparison
+from image_io.buffer import ImageBuffer
+from image_io.colorspace import rgb_to_ycbcr_planes, ycbcr_merge_planes, ycbcr_merge
+from image_io.resize import RESIZE_MODES, resize_image
+
+# 逐像素的旧版实现在大尺寸上要跑数分钟，默认只在不超过该像素数的图像上测
+LEGACY_MAX_PIXELS = 446 * 446
+
+# 并行 CLAHE 的进程数档位，用例名以 /workers_<N> 结尾，runner 据此报告相对单进程的加速比
+PARALLEL_WORKERS = (1, 2, 4)
+
+# 帧序列用例：帧数，以及每帧移动的方块边长 / 步长（像素），近似监控画面中走过的行人
+SEQUENCE_FRAMES = 8
+SEQUENCE_BLOCK = 64
+SEQUENCE_STEP = 16
+
+# 帧序列用例中各增强方式逐帧独立处理的对照实现
+_PER_FRAME = {'equalize': histogram_equalization, 'clahe': clahe_equalization}
+
+
+class BenchCase:
+    """
+    一个基准用例
+    属性：
+        name: 用例名（分组/函数，如 'enhance/python/clahe_equalization'）
+        func: 被测函数，以 inputs 中选出的参数调用
+        inputs: 所需输入名称的元组，取自 prepare_inputs 的结果（'y'、'rgb'、'nested'、'hist'、'frames' 等）
+        max_pixels: 可选，超过该像素数的图像跳过
+        min_pixels: 可选，小于该像素数的图像跳过
+    """
+    __slots__ = ('name', 'func', 'inputs', 'max_pixels', 'min_pixels')
+
+    def __init__(self, name, func, inputs=('y',), max_pixels=None, min_pixels=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.max_pixels = max_pixels
+        self.min_pixels = min_pixels
+
+    def __repr__(self):
+        return f'BenchCase({self.name!r})'
+
+    def applies_to(self, width, height):
+        pixels = width * height
+        return ((self.max_pixels is None or pixels <= self.max_pixels)
+                and (self.min_pixels is None or pixels >= self.min_pixels))
+
+    def __call__(self, inputs):
+        return self.func(*(inputs[k] for k in self.inputs))
+
+
+def moving_frames(y_channel, count=SEQUENCE_FRAMES, block=SEQUENCE_BLOCK, step=SEQUENCE_STEP):
+    """以 y_channel 为背景、一个亮方块沿对角线移动的帧序列（相邻帧只有小块区域变化）"""
+    width, height = y_channel.width, y_channel.height
+    block = min(block, width, height)
+    frames = []
+    for i in range(count):
+        data = bytearray(y_channel.data)
+        x0 = min(i * step, width - block)
+        y0 = min(i * step, height - block)
+        for y in range(y0, y0 + block):
+            data[y * width + x0:y * width + x0 + block] = b'\xf0' * block
+        frames.append(ImageBuffer(width, height, 1, data))
+    return frames
+
+
+def prepare_inputs(rgb):
+    """由一张 RGB 合成图像准备各用例可能用到的全部输入形式"""
+    y_channel, cb, cr = rgb_to_ycbcr_planes(rgb)
+    return {
+        'rgb': rgb,
+        'y': y_channel,
+        'cb': cb,
+        'cr': cr,
+        'nested': y_channel.to_nested(),
+        'hist': Histogram.of(y_channel),
+        'frames': moving_frames(y_channel),
+    }
+
+
+def _strips(y_channel):
+    return clahe_equalization_strips(y_channel, ImageBuffer(y_channel.width, y_channel.height, 1))
+
+
+def _sequence(frames, mode):
+    return list(enhance_sequence(frames, mode))
+
+
+def _per_frame(frames, mode):
+    return [_PER_FRAME[mode](frame) for frame in frames]
+
+
+def default_cases():
+    """全部内置用例：增强（各后端 + 旧版 CLAHE + 分条 / 并行 CLAHE + 帧序列）、缩放、色彩空间、直方图"""
+    cases = []
+    for name in available_backends():
+        be = get_backend(name)
+        for func in ('histogram_equalization', 'clahe_equalization', 'contrast_stretch', 'gamma_correction'):
+            cases.append(BenchCase(f'enhance/{name}/{func}', getattr(be, func)))
+        cases.append(BenchCase(f'histogram/{name}/compute_histogram', be.compute_histogram))
+        cases.append(BenchCase(f'colorspace/{name}/rgb_to_ycrcb', be.rgb_to_ycrcb, ('rgb',)))
+
+    for func in (clahe_equalization_0, clahe_equalization_1, clahe_equalization_2):
+        cases.append(BenchCase(f'enhance/legacy/{func.__name__}', func, ('nested',), LEGACY_MAX_PIXELS))
+    cases.append(BenchCase('enhance/strips/clahe_equalization_strips', _strips))
+    # 低于 PARALLEL_MIN_PIXELS 时会退化为单进程实现，只在 1080p / 4K 上测（--sizes all）
+    for workers in PARALLEL_WORKERS:
+        cases.append(BenchCase(f'enhance/clahe_parallel/workers_{workers}',
+                               partial(clahe_equalization_parallel, workers=workers), min_pixels=PARALLEL_MIN_PIXELS))
+    cases.append(BenchCase('enhance/fanout/enhance_all', enhance_all))
+    # 帧序列（增量直方图 + LUT 复用）与逐帧独立处理对照，均为 SEQUENCE_FRAMES 帧的总耗时
+    for mode in SEQUENCE_MODES:
+        cases.append(BenchCase(f'enhance/sequence/{mode}', partial(_sequence, mode=mode), ('frames',)))
+        cases.append(BenchCase(f'enhance/sequence/{mode}_per_frame', partial(_per_frame, mode=mode), ('frames',)))
+    for radius in (8, 32):
+        cases.append(BenchCase(f'enhance/sliding/sliding_equalization_r{radius}',
+                               partial(sliding_equalization, radius=radius), max_pixels=LEGACY_MAX_PIXELS))
+
+    for mode in RESIZE_MODES:
+        cases.append(BenchCase(f'resize/rgb_{mode}_446', partial(resize_image, target_size=(446, 446), mode=mode),
+                               ('rgb',)))
+        cases.append(BenchCase(f'resize/y_{mode}_224', partial(resize_image, target_size=(224, 224), mode=mode)))
+
+    cases.append(BenchCase('colorspace/rgb_to_ycbcr_planes', rgb_to_ycbcr_planes, ('rgb',)))
+    cases.append(BenchCase('colorspace/ycbcr_merge_planes', ycbcr_merge_planes, ('y', 'cb', 'cr')))
+    cases.append(BenchCase('colorspace/legacy/ycbcr_merge', ycbcr_merge, ('y', 'rgb'), LEGACY_MAX_PIXELS))
+
+    cases.append(BenchCase('histogram/Histogram.of', Histogram.of))
+    cases.append(BenchCase('histogram/render_hist', partial(render_comparison, kind='hist'), ('hist', 'hist')))
+    cases.append(BenchCase('histogram/render_cdf', partial(render_comparison, kind='cdf'), ('hist', 'hist')))
+    return cases
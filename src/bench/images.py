@@ -0,0 +1,70 @@
+# 基准测试用的确定性合成图像：四种尺寸 × 四种内容
+# 同一 (尺寸, 内容, 种子) 每次生成的字节完全相同，不同机器 / 不同提交之间的结果可直接比较
+import random
+
+from image_io.buffer import ImageBuffer
+from image_io.resize import resize_image
+
+# 尺寸名称 → (宽, 高)
+SIZES = {
+    '256': (256, 256),
+    '446': (446, 446),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+}
+
+# 内容类型
+CONTENTS = ('flat', 'low', 'noise', 'natural')
+
+# 低对比度：噪声压缩到 [100, 140)
+_LOW_TABLE = bytes(100 + v * 40 // 256 for v in range(256))
+
+# 自然图像的纹理：取噪声低 4 位，与平滑底图按位异或
+_TEXTURE_TABLE = bytes(v & 0x0F for v in range(256))
+
+
+def _natural(rng, width, height):
+    """
+    近似自然图像的平滑底图 + 细纹理：
+    粗网格随机亮度经双线性放大得到大尺度明暗变化，再叠加低幅度噪声
+    """
+    gw, gh = max(2, width // 64), max(2, height // 64)
+    coarse = ImageBuffer(gw, gh, 1, rng.randbytes(gw * gh))
+    smooth = resize_image(coarse, (width, height), 'bilinear').data
+    texture = rng.randbytes(width * height).translate(_TEXTURE_TABLE)
+    n = width * height
+    mixed = int.from_bytes(smooth, 'little') ^ int.from_bytes(texture, 'little')
+    return mixed.to_bytes(n, 'little')
+
+
+def synthetic_plane(size, content, seed=0):
+    """
+    生成单通道合成平面
+    参数：
+        size: SIZES 中的名称或 (宽, 高)
+        content: 'flat' 常数 | 'low' 低对比度噪声 | 'noise' 全范围噪声 | 'natural' 平滑底图 + 细纹理
+    """
+    width, height = SIZES[size] if isinstance(size, str) else size
+    n = width * height
+    rng = random.Random(f'{seed}-{content}-{width}x{height}')
+    if content == 'flat':
+        data = bytes([118]) * n
+    elif content == 'low':
+        data = rng.randbytes(n).translate(_LOW_TABLE)
+    elif content == 'noise':
+        data = rng.randbytes(n)
+    elif content == 'natural':
+        data = _natural(rng, width, height)
+    else:
+        raise ValueError(f"未知内容类型：{content}（可选：{', '.join(CONTENTS)}）")
+    return ImageBuffer(width, height, 1, data)
+
+
+def synthetic_rgb(size, content, seed=0):
+    """生成 3 通道合成图像：三个通道分别用不同种子生成后交错排列"""
+    planes = [synthetic_plane(size, content, seed=f'{seed}.{k}') for k in range(3)]
+    width, height = planes[0].size
+    data = bytearray(width * height * 3)
+    for k, plane in enumerate(planes):
+        data[k::3] = plane.data
+    return ImageBuffer(width, height, 3, data)
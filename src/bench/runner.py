@@ -0,0 +1,279 @@
+# 基准运行器：计时、峰值内存、JSON 结果与基线对比
+# 用法：
+#   python -m bench                                   # 默认 256 / 446 两种尺寸、全部内容与用例
+#   python -m bench --sizes all -o results.json       # 含 1080p / 4K
+#   python -m bench --cases 'enhance/*clahe*' --baseline base.json --threshold 0.1
+#   python -m bench --save-baseline base.json         # 把本次结果保存为基线
+#   python -m bench --sizes 1080p 4k --cases 'enhance/clahe_parallel/*'   # 并行 CLAHE 随进程数的加速比
+# 有用例比基线慢超过阈值时退出码为 1，可直接用于 CI / 提交前检查
+import argparse
+import fnmatch
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from .images import SIZES, CONTENTS, synthetic_rgb
+from .cases import default_cases, prepare_inputs
+
+# 结果文件格式版本
+RESULTS_VERSION = 1
+
+# 默认尺寸：日常快速回归；1080p / 4K 用 --sizes all 开启
+DEFAULT_SIZES = ('256', '446')
+
+# 默认回归阈值：中位耗时比基线慢 10% 以上
+DEFAULT_THRESHOLD = 0.10
+
+# 绝对差低于该值（秒）的变化视为计时噪声
+NOISE_FLOOR = 0.001
+
+
+def _measure_peak(case, inputs):
+    """执行一次（兼作预热），返回 Python 层分配的峰值字节数（tracemalloc 也统计 NumPy 数组）"""
+    tracemalloc.start()
+    try:
+        case(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def time_case(case, inputs, repeat=3, memory=True):
+    """
+    对单个用例计时：先执行一次预热（同时测峰值内存），再计时 repeat 次，计时期间关闭 GC
+    返回 {runs, median_s, min_s, mean_s, peak_bytes}
+    """
+    if memory:
+        peak = _measure_peak(case, inputs)
+    else:
+        case(inputs)
+        peak = None
+
+    times = []
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            case(inputs)
+            times.append(time.perf_counter() - start)
+    finally:
+        if enabled:
+            gc.enable()
+    return {
+        'runs': repeat,
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'mean_s': statistics.fmean(times),
+        'peak_bytes': peak,
+    }
+
+
+def select_cases(cases, patterns=None):
+    """按名称筛选用例：patterns 为 fnmatch 通配符列表（不含通配符时按子串匹配）"""
+    if not patterns:
+        return list(cases)
+
+    def matches(name, pattern):
+        if any(ch in pattern for ch in '*?['):
+            return fnmatch.fnmatchcase(name, pattern)
+        return pattern in name
+
+    return [c for c in cases if any(matches(c.name, p) for p in patterns)]
+
+
+def run_benchmarks(cases, sizes=DEFAULT_SIZES, contents=CONTENTS, repeat=3, memory=True, on_result=None):
+    """
+    在 尺寸 × 内容 的全部合成图像上运行用例
+    参数：
+        on_result: 可选回调 on_result(record)，每完成一项调用一次
+    返回：结果记录列表，每项 {case, size, content, width, height, runs, median_s, min_s, mean_s,
+          peak_bytes, mpix_per_s}
+    """
+    results = []
+    for size in sizes:
+        for content in contents:
+            inputs = None
+            for case in cases:
+                width, height = SIZES[size]
+                if not case.applies_to(width, height):
+                    continue
+                if inputs is None:
+                    inputs = prepare_inputs(synthetic_rgb(size, content))  # 同一图像的输入只准备一次
+                record = {'case': case.name, 'size': size, 'content': content, 'width': width, 'height': height}
+                record.update(time_case(case, inputs, repeat, memory))
+                median = record['median_s']
+                record['mpix_per_s'] = width * height / median / 1e6 if median > 0 else None
+                results.append(record)
+                if on_result is not None:
+                    on_result(record)
+    return results
+
+
+def environment():
+    """记录运行环境，便于判断两份结果是否可比"""
+    info = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    try:
+        import numpy
+        info['numpy'] = numpy.__version__
+    except ImportError:
+        info['numpy'] = None
+    return info
+
+
+def save_results(results, path, **meta):
+    """写出 JSON 结果文件：{version, meta, results}"""
+    payload = {'version': RESULTS_VERSION, 'meta': dict(environment(), **meta), 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+
+
+def load_results(path):
+    """读取 JSON 结果文件，返回结果记录列表"""
+    with open(path, encoding='utf-8') as f:
+        payload = json.load(f)
+    if payload.get('version') != RESULTS_VERSION:
+        raise ValueError(f"基准结果文件版本不符：{path}")
+    return payload['results']
+
+
+def _key(record):
+    return record['case'], record['size'], record['content']
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD, noise_floor=NOISE_FLOOR):
+    """
+    与基线比较中位耗时
+    返回 (regressions, improvements)，每项 (case, size, content, 基线秒数, 本次秒数, 比值)；
+    比值 > 1 + threshold 为回归，< 1 / (1 + threshold) 为改进；绝对差小于 noise_floor 的忽略
+    基线中没有的用例（新增用例）不参与比较
+    """
+    base = {_key(r): r['median_s'] for r in baseline}
+    regressions = []
+    improvements = []
+    for record in results:
+        before = base.get(_key(record))
+        now = record['median_s']
+        if before is None or abs(now - before) < noise_floor:
+            continue
+        ratio = now / before if before > 0 else float('inf')
+        item = (*_key(record), before, now, ratio)
+        if ratio > 1 + threshold:
+            regressions.append(item)
+        elif ratio < 1 / (1 + threshold):
+            improvements.append(item)
+    return regressions, improvements
+
+
+def scaling(results):
+    """
+    按进程数分档的用例（名称以 /workers_<N> 结尾）相对 workers_1 的加速比
+    返回：[(用例组, 尺寸, 内容, 进程数, 中位耗时, 加速比)]
+    """
+    groups = {}
+    for r in results:
+        group, _, last = r['case'].rpartition('/workers_')
+        if group and last.isdigit():
+            groups.setdefault((group, r['size'], r['content']), {})[int(last)] = r['median_s']
+    rows = []
+    for (group, size, content), times in groups.items():
+        base = times.get(1)
+        for workers in sorted(times):
+            now = times[workers]
+            rows.append((group, size, content, workers, now, base / now if base and now > 0 else None))
+    return rows
+
+
+def _format_bytes(n):
+    if n is None:
+        return '-'
+    for unit in ('B', 'KiB', 'MiB'):
+        if n < 1024:
+            return f'{n:.0f}{unit}'
+        n /= 1024
+    return f'{n:.1f}GiB'
+
+
+def _print_record(record):
+    print(f"{record['case']:<48} {record['size']:>5} {record['content']:<8} "
+          f"{record['median_s'] * 1000:>10.2f} ms  {_format_bytes(record['peak_bytes']):>9}", flush=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='增强 / 缩放 / 色彩空间 / 直方图函数的基准测试')
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES),
+                        help=f"图像尺寸（{' / '.join(SIZES)}，或 all），默认 {' '.join(DEFAULT_SIZES)}")
+    parser.add_argument('--contents', nargs='+', choices=CONTENTS, default=list(CONTENTS), help='图像内容类型')
+    parser.add_argument('--cases', nargs='+', default=None, help='用例名筛选（通配符或子串），默认全部')
+    parser.add_argument('--repeat', type=int, default=3, help='每项计时次数（取中位数）')
+    parser.add_argument('--no-memory', action='store_true', help='不测峰值内存（预热仍执行一次）')
+    parser.add_argument('-o', '--output', default=None, help='结果 JSON 路径')
+    parser.add_argument('--baseline', default=None, help='与该基线 JSON 比较，出现回归时退出码为 1')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='回归阈值（相对中位耗时），默认 0.10 即慢 10%%')
+    parser.add_argument('--save-baseline', default=None, help='把本次结果另存为基线')
+    parser.add_argument('--list', action='store_true', help='只列出用例名')
+    args = parser.parse_args(argv)
+    if 'all' in args.sizes:
+        args.sizes = list(SIZES)
+    unknown = [s for s in args.sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"未知尺寸：{', '.join(unknown)}（可选：{', '.join(SIZES)}，或 all）")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cases = select_cases(default_cases(), args.cases)
+    if args.list:
+        for case in cases:
+            print(case.name)
+        return 0
+    if not cases:
+        print('没有匹配的用例')
+        return 1
+
+    results = run_benchmarks(cases, args.sizes, args.contents, args.repeat, not args.no_memory,
+                             on_result=_print_record)
+    rows = scaling(results)
+    if rows:
+        print(f'\n并行扩展（相对 workers_1，本机 {os.cpu_count()} 核）：')
+        for group, size, content, workers, now, speedup in rows:
+            ratio = f'×{speedup:.2f}' if speedup is not None else '-'
+            print(f'{group:<40} {size:>5} {content:<8} workers={workers:<3} {now * 1000:>10.2f} ms  {ratio}')
+
+    meta = {'sizes': args.sizes, 'contents': args.contents, 'repeat': args.repeat}
+    if args.output:
+        save_results(results, args.output, **meta)
+    if args.save_baseline:
+        save_results(results, args.save_baseline, **meta)
+
+    if args.baseline:
+        regressions, improvements = compare(results, load_results(args.baseline), args.threshold)
+        for case, size, content, before, now, ratio in improvements:
+            print(f'✅ {case} @ {size}/{content}: {before * 1000:.2f} → {now * 1000:.2f} ms（×{ratio:.2f}）')
+        for case, size, content, before, now, ratio in regressions:
+            print(f'❌ {case} @ {size}/{content}: {before * 1000:.2f} → {now * 1000:.2f} ms（×{ratio:.2f}）')
+        if regressions:
+            print(f'\n{len(regressions)} 项超过回归阈值 {args.threshold:.0%}')
+            return 1
+        print(f'\n无回归（阈值 {args.threshold:.0%}）')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
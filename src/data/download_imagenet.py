@@ -1,33 +1,389 @@
+# ImageNet synset 下载：多个 synset 并发下载，边下载边解压（或只建分片索引）
+# - 连接池：所有下载共用一个 requests.Session，每个 synset 占一个连接，按 1 MiB 分块接收
+# - 断点续传：未下完的数据保存在 <synset>.tar.part，连接中断重试或重新运行时用 Range 请求从已有长度继续；
+#   服务器不支持 Range（返回 200）时从头接收，已处理过的字节不会重复交给校验与解压
+# - 校验：接收的同时计算 SHA-256，写出 <synset>.tar.sha256（sha256sum 格式）；--checksums 给出期望值时逐个核对
+# - 流式解压：字节按到达顺序送入 tarfile 的流式读取（'r|'），每个成员一收齐就写出，不必等整个 tar 下完；
+#   同时记录各成员的数据偏移，生成 image_io.shards 使用的 <synset>.tar.idx.json（--no-extract 时只建索引）
+# 用法：
+#   python download_imagenet.py                                       # 默认三个 synset，下载并解压到 ./extracted_images
+#   python download_imagenet.py n02123045 n04465501 -j 2 --no-extract  # 只下载并建索引，配合 main.py --shards
+#   python download_imagenet.py --base-url http://127.0.0.1:8000       # 从本地镜像 / 测试服务器下载
+import argparse
+import hashlib
+import json
 import os
-import requests
-
+import queue
+import shutil
 import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 
 # synset IDs
 synsets = ['n02352591', 'n02123045', 'n04465501']
 
+BASE_URL = 'https://image-net.org/data/winter21_whole'
 INPUT_TAR_DIR = './imagenet_data'       # 存放 .tar 文件的文件夹
 EXTRACT_DIR = './extracted_images'      # 解压后的原始图像
-os.makedirs(EXTRACT_DIR, exist_ok=True)
-
-for sid in synsets:
-    url = f'https://image-net.org/data/winter21_whole/{sid}.tar'
-    local_path = os.path.join(INPUT_TAR_DIR, f'{sid}.tar')
-    print(f'Downloading {url} ...')
-    r = requests.get(url, stream=True)
-    if r.status_code == 200:
-        with open(local_path, 'wb') as f:
-            for chunk in r.iter_content(1024):
-                f.write(chunk)
+
+# 每次从连接读取的块大小
+CHUNK_SIZE = 1 << 20
+
+# 同时下载的 synset 数（也是连接池大小）
+DEFAULT_WORKERS = 4
+
+# 连接中断、超时或 5xx 时的重试次数，第 k 次重试前等待 RETRY_BACKOFF * 2^k 秒
+MAX_RETRIES = 5
+RETRY_BACKOFF = 1.0
+
+# (连接超时, 读超时) 秒
+TIMEOUT = (10, 60)
+
+# 解压跟不上下载时最多缓存的块数，超过后下载线程等待
+PIPE_CHUNKS = 16
+
+# 索引格式与 image_io.shards 一致
+INDEX_VERSION = 1
+
+# tarfile 支持解压过滤器时（3.11.4 起）使用 'data' 过滤器，拒绝绝对路径、'..' 与设备文件等不安全成员
+_EXTRACT_FILTER = {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+
+
+def make_session(pool_size=DEFAULT_WORKERS):
+    """所有下载共用的会话：连接池容纳 pool_size 个并发连接；不接受压缩编码，保证 Range 偏移即文件偏移"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Accept-Encoding'] = 'identity'
+    return session
+
+
+def _content_range(value):
+    """解析 'bytes start-end/total' 或 'bytes */total'，返回 (start, total)，未知部分为 None"""
+    unit, _, spec = value.partition(' ')
+    span, _, total = spec.partition('/')
+    if unit != 'bytes':
+        raise ValueError(f"无法解析 Content-Range：{value}")
+    start = None if span == '*' else int(span.partition('-')[0])
+    return start, None if total == '*' else int(total)
+
+
+def fetch(session, url, path, on_data=None, chunk_size=CHUNK_SIZE, retries=MAX_RETRIES, backoff=RETRY_BACKOFF,
+          timeout=TIMEOUT):
+    """
+    断点续传地下载 url 到 path，返回 (文件大小, SHA-256 十六进制)
+    下载中的数据写在 path + '.part'（收到成功响应后才创建），完整后改名为 path
+    on_data(bytes): 按文件顺序对每个字节恰好调用一次（续传时先送入磁盘上已有的部分），供流式解压
+    """
+    part = path + '.part'
+    hasher = hashlib.sha256()
+    done = 0  # 已送入校验与 on_data 的字节数
+
+    def accept(data):
+        nonlocal done
+        hasher.update(data)
+        if on_data is not None:
+            on_data(data)
+        done += len(data)
+
+    if os.path.exists(part):
+        with open(part, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                accept(chunk)
+
+    f = None
+    attempt = 0
+    try:
+        while True:
+            headers = {'Range': f'bytes={done}-'} if done else {}
+            try:
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                    if r.status_code == 416 and done:
+                        # 已有部分就是完整文件（上次下完但还没改名）
+                        _, total = _content_range(r.headers.get('Content-Range', 'bytes */*'))
+                        if total == done:
+                            break
+                        raise ValueError(f"{part} 与服务器上的文件不符（本地 {done} 字节，远端 {total}），请删除后重试")
+                    r.raise_for_status()
+                    if r.status_code == 206:
+                        start, total = _content_range(r.headers['Content-Range'])
+                        if start != done:
+                            raise ValueError(f"服务器从第 {start} 字节开始返回，请求的是第 {done} 字节")
+                    else:
+                        # 不支持 Range：从头接收，前 done 字节只覆盖写回磁盘
+                        start = 0
+                        total = int(r.headers['Content-Length']) if 'Content-Length' in r.headers else None
+                    if f is None:
+                        f = open(part, 'r+b' if os.path.exists(part) else 'w+b')
+                    f.seek(start)
+                    pos = start
+                    for chunk in r.iter_content(chunk_size):
+                        f.write(chunk)
+                        fresh = chunk[done - pos:] if done > pos else chunk
+                        pos += len(chunk)
+                        if fresh:
+                            accept(fresh)
+                    if total is not None and pos < total:
+                        raise requests.exceptions.ChunkedEncodingError(f"连接提前关闭（{pos}/{total} 字节）")
+                    f.truncate(pos)
+                    break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    requests.HTTPError) as e:
+                status = e.response.status_code if isinstance(e, requests.HTTPError) else None
+                if (status is not None and status < 500) or attempt >= retries:
+                    raise
+                time.sleep(backoff * 2 ** attempt)
+                attempt += 1
+                print(f'🔁 {url} 第 {attempt} 次重试（已接收 {done} 字节）：{e}')
+    finally:
+        if f is not None:
+            f.close()
+
+    os.replace(part, path)
+    return done, hasher.hexdigest()
+
+
+class _ChunkPipe:
+    """
+    下载线程 → 解压线程的字节管道：有界队列（解压跟不上时下载线程等待），提供 tarfile 流式读取所需的 read
+    """
+
+    def __init__(self, maxsize=PIPE_CHUNKS):
+        self._queue = queue.Queue(maxsize)
+        self._buf = b''
+        self._pos = 0
+        self._eof = False
+
+    def write(self, data):
+        self._queue.put(data)
+
+    def close(self):
+        self._queue.put(None)
+
+    def read(self, size=-1):
+        parts = []
+        while size:
+            if self._pos == len(self._buf):
+                chunk = None if self._eof else self._queue.get()
+                if chunk is None:
+                    self._eof = True
+                    break
+                self._buf, self._pos = chunk, 0
+                continue
+            end = len(self._buf) if size < 0 else min(len(self._buf), self._pos + size)
+            parts.append(self._buf[self._pos:end])
+            if size > 0:
+                size -= end - self._pos
+            self._pos = end
+        return b''.join(parts)
+
+    def drain(self):
+        """丢弃剩余数据直到写端关闭（解压提前结束或出错时，避免下载线程一直等待）"""
+        while self.read(CHUNK_SIZE):
+            pass
+
+
+def read_members(fileobj, dest=None):
+    """
+    流式读取 tar（fileobj 只需支持 read），返回成员索引 {名称: (数据偏移, 长度)}
+    dest 给出时同时把每个普通文件成员解压到 dest
+    """
+    members = {}
+    with tarfile.open(fileobj=fileobj, mode='r|') as tar:
+        for info in tar:
+            if not info.isreg():
+                continue
+            members[info.name] = (info.offset_data, info.size)
+            if dest is not None:
+                tar.extract(info, dest, **_EXTRACT_FILTER)
+    return members
+
+
+def write_index(path, members):
+    """写出 <path>.idx.json，image_io.shards.TarShard 打开该分片时直接使用，不再遍历 tar 头"""
+    st = os.stat(path)
+    payload = {
+        'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+        'members': [[name, offset, size] for name, (offset, size) in members.items()],
+    }
+    with open(path + '.idx.json', 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False)
+
+
+def load_checksums(path):
+    """读取 sha256sum 格式的校验文件，返回 {文件名: 十六进制摘要}"""
+    checksums = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            digest, _, name = line.strip().partition(' ')
+            if digest:
+                checksums[os.path.basename(name.strip().lstrip('*'))] = digest.lower()
+    return checksums
+
+
+def _file_sha256(path, chunk_size=CHUNK_SIZE):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _check_digest(path, digest, expected, staging=None):
+    """与期望的校验值核对；不符时删除 tar 及其旁边的校验、索引文件（和未完成的解压目录），抛出 ValueError"""
+    if expected is None or digest == expected:
+        return
+    for leftover in (path, path + '.sha256', path + '.idx.json'):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    if staging is not None:
+        shutil.rmtree(staging, ignore_errors=True)
+    name = os.path.basename(path)
+    raise ValueError(f"{name} 校验失败：期望 SHA-256 {expected}，实际 {digest}（已删除，重新运行即可重新下载）")
+
+
+def _completed(sid, path, start, expected=None):
+    """
+    之前已完整处理过的 synset：结果取自旁边的校验与索引文件
+    给出期望校验值时重新计算 tar 的摘要核对（旁边的 .sha256 只记录下载时的值，之后文件可能被改动）
+    """
+    with open(path + '.idx.json', encoding='utf-8') as f:
+        members = json.load(f)['members']
+    if expected is not None:
+        digest = _file_sha256(path)
+        _check_digest(path, digest, expected)
     else:
-        print(f'Failed to download {sid}')
-
-# Step 1: 解压所有 .tar 文件
-for tarname in os.listdir(INPUT_TAR_DIR):
-    if tarname.endswith('.tar'):
-        synset_id = tarname.replace('.tar', '')
-        extract_path = os.path.join(EXTRACT_DIR, synset_id)
-        os.makedirs(extract_path, exist_ok=True)
-        with tarfile.open(os.path.join(INPUT_TAR_DIR, tarname), 'r') as tar:
-            tar.extractall(path=extract_path)
-        print(f'✅ 解压完成: {tarname}')
\ No newline at end of file
+        with open(path + '.sha256', encoding='utf-8') as f:
+            digest = f.read().split(' ', 1)[0]
+    return {'synset': sid, 'path': path, 'bytes': os.path.getsize(path), 'sha256': digest, 'members': len(members),
+            'seconds': time.perf_counter() - start}
+
+
+def download_synset(session, sid, base_url=BASE_URL, tar_dir=INPUT_TAR_DIR, extract_dir=EXTRACT_DIR,
+                    extract=True, expected=None):
+    """
+    下载一个 synset 并在接收过程中解压（extract=False 时只建索引）
+    已下完的 tar 不再请求网络，已解压的目录不再解压
+    返回 {synset, path, bytes, sha256, members, seconds}；校验不符时删除 tar 并抛出 ValueError
+    """
+    start = time.perf_counter()
+    name = f'{sid}.tar'
+    path = os.path.join(tar_dir, name)
+    dest = os.path.join(extract_dir, sid) if extract else None
+    if dest is not None and os.path.isdir(dest):
+        dest = None  # 之前已解压完成
+    if dest is None and os.path.exists(path) and os.path.exists(path + '.idx.json') \
+            and os.path.exists(path + '.sha256'):
+        return _completed(sid, path, start, expected)
+    staging = None
+    if dest is not None:
+        staging = dest + '.partial'
+        shutil.rmtree(staging, ignore_errors=True)
+
+    pipe = _ChunkPipe()
+    outcome = {}
+
+    def consume():
+        try:
+            outcome['members'] = read_members(pipe, staging)
+        except Exception as e:
+            outcome['error'] = e
+        finally:
+            pipe.drain()
+
+    reader = threading.Thread(target=consume, name=f'extract-{sid}', daemon=True)
+    reader.start()
+    try:
+        if os.path.exists(path):
+            # 已下完的 tar：从磁盘读一遍，同时重新计算摘要
+            hasher = hashlib.sha256()
+            size = 0
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    pipe.write(chunk)
+                    size += len(chunk)
+            digest = hasher.hexdigest()
+        else:
+            print(f'⬇️  Downloading {base_url}/{name} ...')
+            size, digest = fetch(session, f'{base_url}/{name}', path, on_data=pipe.write)
+    finally:
+        pipe.close()
+        reader.join()
+
+    _check_digest(path, digest, expected, staging)
+    with open(path + '.sha256', 'w', encoding='utf-8') as f:
+        f.write(f'{digest}  {name}\n')
+    if 'error' in outcome:
+        raise ValueError(f"{name} 读取失败：{outcome['error']}") from outcome['error']
+    members = outcome['members']
+    write_index(path, members)
+    if staging is not None:
+        os.replace(staging, dest)
+
+    return {'synset': sid, 'path': path, 'bytes': size, 'sha256': digest, 'members': len(members),
+            'seconds': time.perf_counter() - start}
+
+
+def download_all(sids, base_url=BASE_URL, tar_dir=INPUT_TAR_DIR, extract_dir=EXTRACT_DIR, workers=DEFAULT_WORKERS,
+                 extract=True, checksums=None, on_result=None):
+    """
+    并发下载多个 synset，返回与 sids 同序的结果列表；单个 synset 失败时其结果为 {synset, error}，不影响其余下载
+    on_result: 可选回调 on_result(结果字典)，每个 synset 完成时调用
+    """
+    os.makedirs(tar_dir, exist_ok=True)
+    if extract:
+        os.makedirs(extract_dir, exist_ok=True)
+    checksums = checksums or {}
+    session = make_session(workers)
+
+    def task(sid):
+        try:
+            result = download_synset(session, sid, base_url, tar_dir, extract_dir, extract,
+                                     checksums.get(f'{sid}.tar'))
+        except (requests.RequestException, ValueError, OSError) as e:
+            result = {'synset': sid, 'error': e}
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    with session, ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(task, sids))
+
+
+def report(result):
+    if 'error' in result:
+        print(f"❌ {result['synset']} 失败：{result['error']}")
+        return
+    mib = result['bytes'] / (1 << 20)
+    print(f"✅ {result['synset']}: {mib:.1f} MiB，{result['members']} 个文件，"
+          f"耗时 {result['seconds']:.1f}s，sha256 {result['sha256'][:16]}…")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='并发、可续传地下载 ImageNet synset，边下载边解压')
+    parser.add_argument('synsets', nargs='*', default=synsets, help='synset ID（默认下载示例中的三个类别）')
+    parser.add_argument('--base-url', default=BASE_URL, help='下载地址前缀，文件为 <base-url>/<synset>.tar')
+    parser.add_argument('--tar-dir', default=INPUT_TAR_DIR, help='存放 .tar 文件的目录')
+    parser.add_argument('--extract-dir', default=EXTRACT_DIR, help='解压目录（每个 synset 一个子目录）')
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS, help='同时下载的 synset 数')
+    parser.add_argument('--no-extract', action='store_true',
+                        help='不解压，只生成分片索引（之后用 main.py --shards 直接读取 tar）')
+    parser.add_argument('--checksums', default=None, help='sha256sum 格式的校验文件，给出时核对每个 tar')
+    args = parser.parse_args(argv)
+
+    checksums = load_checksums(args.checksums) if args.checksums else None
+    results = download_all(args.synsets, args.base_url, args.tar_dir, args.extract_dir, args.workers,
+                           extract=not args.no_extract, checksums=checksums, on_result=report)
+    failed = [r['synset'] for r in results if 'error' in r]
+    if failed:
+        raise SystemExit(f"{len(failed)} 个 synset 下载失败：{', '.join(failed)}")
+
+
+if __name__ == '__main__':
+    main()
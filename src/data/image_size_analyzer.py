@@ -1,11 +1,208 @@
+# 数据集尺寸扫描：线程池只读文件头（Image.open 不解码像素），结果缓存在持久化索引中
+# 索引以 (路径, mtime, 文件大小) 为键记录 (宽, 高, 模式)，再次扫描时只重读新增或修改过的文件
+# 另提供按尺寸分组的遍历，批处理可把同尺寸图像排在一起，复用按尺寸缓存的缩放表
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from PIL import Image
 
-def analyze_image_sizes(folder_by_class):
+# 索引文件格式版本
+INDEX_VERSION = 1
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+# 读文件头以 I/O 为主，线程数可以明显多于核数
+DEFAULT_THREADS = min(32, 4 * (os.cpu_count() or 1))
+
+
+def iter_image_stats(folder, exts=IMAGE_EXTS):
+    """递归遍历目录（按名称排序），产出 (绝对路径, mtime_ns, 文件大小)，只 stat 不打开文件"""
+    try:
+        entries = sorted(os.scandir(folder), key=lambda e: e.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir():
+            yield from iter_image_stats(entry.path, exts)
+        elif entry.name.lower().endswith(exts):
+            st = entry.stat()
+            yield os.path.abspath(entry.path), st.st_mtime_ns, st.st_size
+
+
+def read_header(path):
+    """只读文件头，返回 (宽, 高, 模式)"""
+    with Image.open(path) as img:
+        w, h = img.size
+        return w, h, img.mode
+
+
+class SizeIndex:
+    """
+    持久化的图像尺寸索引
+    参数：
+        path: 索引文件（JSON），None 时只在内存中缓存
+    属性：
+        entries: {绝对路径: [mtime_ns, 文件大小, 宽, 高, 模式]}
+        last_scan: 最近一次 scan 的统计 {files, cached, read, removed, failed, seconds}
+    索引只是缓存：文件损坏或版本不符时从空索引开始
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.last_scan = None
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    payload = json.load(f)
+                if payload.get('version') == INDEX_VERSION:
+                    self.entries = payload['entries']
+            except (OSError, ValueError, KeyError):
+                self.entries = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def scan(self, folder, threads=DEFAULT_THREADS, exts=IMAGE_EXTS):
+        """
+        扫描 folder（递归）：mtime 与文件大小都未变的文件直接使用索引，其余在线程池中读文件头
+        同时从索引中删除 folder 下已不存在的文件
+        返回 (infos, failed)：infos 为 {绝对路径: (宽, 高, 模式)}（按遍历顺序），failed 为 [(路径, 错误)]
+        """
+        start = time.perf_counter()
+        folder = os.path.abspath(folder)
+        stats = list(iter_image_stats(folder, exts))
+        seen = {path for path, _, _ in stats}
+        prefix = folder + os.sep
+        removed = [path for path in self.entries if path.startswith(prefix) and path not in seen]
+        for path in removed:
+            del self.entries[path]
+        self._dirty = self._dirty or bool(removed)
+        return self._resolve(stats, threads, start, len(removed))
+
+    def lookup(self, paths, threads=DEFAULT_THREADS):
+        """查询给定文件的尺寸（不存在的文件计入 failed），返回值同 scan"""
+        start = time.perf_counter()
+        stats = []
+        failed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                failed.append((path, f'{type(e).__name__}: {e}'))
+                continue
+            stats.append((path, st.st_mtime_ns, st.st_size))
+        infos, more = self._resolve(stats, threads, start)
+        return infos, failed + more
+
+    def _resolve(self, stats, threads, start, removed=0):
+        """由 [(路径, mtime_ns, 文件大小)] 取尺寸：命中索引的直接返回，其余并行读文件头并更新索引"""
+        stale = []
+        for path, mtime, size in stats:
+            entry = self.entries.get(path)
+            if entry is None or entry[0] != mtime or entry[1] != size:
+                stale.append((path, mtime, size))
+
+        failed = []
+        if stale:
+            def read(item):
+                try:
+                    return item, read_header(item[0]), None
+                except Exception as e:
+                    return item, None, f'{type(e).__name__}: {e}'
+
+            with ThreadPoolExecutor(max(1, threads)) as pool:
+                for (path, mtime, size), header, error in pool.map(read, stale):
+                    if error is None:
+                        self.entries[path] = [mtime, size, *header]
+                    else:
+                        # 损坏的文件不进索引，下次扫描重新尝试
+                        self.entries.pop(path, None)
+                        failed.append((path, error))
+            self._dirty = True
+
+        infos = {}
+        for path, _, _ in stats:
+            entry = self.entries.get(path)
+            if entry is not None:
+                infos[path] = (entry[2], entry[3], entry[4])
+        self.last_scan = {
+            'files': len(stats),
+            'cached': len(stats) - len(stale),
+            'read': len(stale) - len(failed),
+            'removed': removed,
+            'failed': len(failed),
+            'seconds': time.perf_counter() - start,
+        }
+        return infos, failed
+
+    def save(self):
+        """有变化时写回索引文件（先写临时文件再替换）"""
+        if not self.path or not self._dirty:
+            return
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'entries': self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def scan_image_sizes(folder, index_path=None, threads=DEFAULT_THREADS):
+    """扫描一个目录并保存索引，返回 (infos, failed)，含义同 SizeIndex.scan"""
+    index = SizeIndex(index_path)
+    result = index.scan(folder, threads)
+    index.save()
+    return result
+
+
+def size_buckets(infos):
+    """
+    按 (宽, 高) 分组：返回 [((宽, 高), [路径, ...]), ...]
+    组按图像数从多到少排列（数量相同按尺寸），组内保持原有顺序
+    """
+    groups = {}
+    for path, (w, h, _) in infos.items():
+        groups.setdefault((w, h), []).append(path)
+    return sorted(groups.items(), key=lambda kv: (-len(kv[1]), kv[0]))
+
+
+def _bucketed(infos, failed):
+    """按尺寸分组后的路径顺序；读不出文件头的放在最后（交给批处理照常报告错误）"""
+    return [path for _, group in size_buckets(infos) for path in group] + [path for path, _ in failed]
+
+
+def iter_by_size(folder, index_path=None, threads=DEFAULT_THREADS):
+    """按尺寸分组顺序产出目录中的图像路径：同尺寸的图像连续出现"""
+    yield from _bucketed(*scan_image_sizes(folder, index_path, threads))
+
+
+def order_by_size(paths, index_path=None, threads=DEFAULT_THREADS):
+    """
+    把给定的图像路径按尺寸分组重新排列（返回列表，路径原样保留），用于批处理：
+    同尺寸图像连续处理，按尺寸缓存的缩放表整组复用
+    """
+    index = SizeIndex(index_path)
+    infos, failed = index.lookup(paths, threads)
+    index.save()
+    original = {os.path.abspath(p): p for p in paths}
+    return [original[path] for path in _bucketed(infos, failed)]
+
+
+def analyze_image_sizes(folder_by_class, index_path=None, threads=DEFAULT_THREADS):
     """
     遍历每类文件夹中的图像，统计最大尺寸、最小尺寸、平均面积（像素总数）
     参数：folder_by_class 是一个 {class_id: folder_path} 的字典
+         index_path: 可选，尺寸索引文件；再次统计时只读新增或修改过的文件
+         threads: 读文件头的线程数
     """
+    index = SizeIndex(index_path)
     results = {}
     global_total = 0
     global_area_sum = 0
@@ -18,19 +215,15 @@ def analyze_image_sizes(folder_by_class):
         total_area = 0
         count = 0
 
-        for fname in os.listdir(folder):
-            if not fname.lower().endswith(('.jpg', '.jpeg', '.png')):
-                continue
-            try:
-                with Image.open(os.path.join(folder, fname)) as img:
-                    w, h = img.size
-                    area = w * h
-                    max_size = max(max_size, (w, h), key=lambda x: x[0] * x[1])
-                    min_size = min(min_size, (w, h), key=lambda x: x[0] * x[1])
-                    total_area += area
-                    count += 1
-            except Exception as e:
-                print(f"⚠️ 跳过损坏图像: {fname}, 错误: {e}")
+        infos, failed = index.scan(folder, threads)
+        for path, error in failed:
+            print(f"⚠️ 跳过损坏图像: {os.path.basename(path)}, 错误: {error}")
+        for w, h, _ in infos.values():
+            area = w * h
+            max_size = max(max_size, (w, h), key=lambda x: x[0] * x[1])
+            min_size = min(min_size, (w, h), key=lambda x: x[0] * x[1])
+            total_area += area
+            count += 1
 
         if count > 0:
             avg_area = total_area / count
@@ -47,6 +240,7 @@ def analyze_image_sizes(folder_by_class):
             global_max = max(global_max, max_size, key=lambda x: x[0] * x[1])
             global_min = min(global_min, min_size, key=lambda x: x[0] * x[1])
 
+    index.save()
     global_avg_area = global_area_sum / global_total if global_total else 0
     global_avg_side = int(global_avg_area ** 0.5)
 
@@ -65,7 +259,7 @@ if __name__ == '__main__':
     synsets = ['n02123045', 'n02352591', 'n04465501']
     folder_map = {s: os.path.join(base, s) for s in synsets}
 
-    results, global_summary = analyze_image_sizes(folder_map)
+    results, global_summary = analyze_image_sizes(folder_map, index_path=os.path.join(base, '.size_index.json'))
 
     print("\n📊 每类图像统计：")
     for k, v in results.items():
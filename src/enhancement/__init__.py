@@ -2,4 +2,11 @@
 from .equalize import histogram_equalization
 from .stretch import contrast_stretch
 from .gamma import gamma_correction
-from .clahe import clahe_equalization
\ No newline at end of file
+from .clahe import clahe_equalization, tile_histograms
+from .clahe_parallel import clahe_equalization_parallel
+from .sliding import sliding_equalization
+from .lut import gamma_lut, stretch_lut, equalize_lut, compose_luts, build_point_lut, apply_point_ops
+from .strips import histogram_equalization_strips, contrast_stretch_strips, gamma_correction_strips
+from .strips import clahe_equalization_strips, apply_lut_strips, strip_histogram
+from .fanout import FANOUT_MODES, enhance_all
+from .sequence import SEQUENCE_MODES, SequenceEnhancer, enhance_sequence
@@ -1,4 +1,8 @@
 # 自适应直方图均衡化（CLAHE）手工实现
+from multiprocessing import current_process
+
+from image_io.buffer import ImageBuffer, to_buffer, restore_like
+from histogram import count_bytes, compute_cdf
 
 # 简化版自适应直方图均衡化（CLAHE）：分块增强 + 裁剪限制
 def clahe_equalization_0(y_channel, tile_size=8, clip_limit=40):
@@ -189,108 +193,293 @@ def clahe_equalization_2(y_channel, tile_size=8, clip_limit=40):
 
     return output
 
-# 使用等大小 tile 分块，对每个块局部直方图增强 + 裁剪限制 + 四邻域插值融合
-def clahe_equalization(y_channel, tile_size=8, clip_limit=40):
+
+def clip_histogram(hist, clip_limit, redistribute_remainder=False):
     """
-    CLAHE（自适应直方图均衡化）：支持非整除图像尺寸 + 插值融合
+    直方图裁剪：超过 clip_limit 的部分平均分配到全部 256 个 bin
     参数：
-        y_channel: 输入图像的 Y 通道（二维列表）
-        tile_size: 划分为 tile_size x tile_size 个网格块
-        clip_limit: 每个 bin 的频数上限，用于限制局部对比度
-    返回：
-        output: 增强后的 Y 通道图像（二维列表）
+        redistribute_remainder: 为 True 时把 excess % 256 的余数也按等间隔逐个 +1 分配，
+                                保持总频数不变；默认 False 与原实现一致（余数丢弃）
     """
-    import math
-
-    height = len(y_channel)
-    width = len(y_channel[0])
+    excess = 0
+    clipped = [0] * 256
+    for i, h in enumerate(hist):
+        if h > clip_limit:
+            excess += h - clip_limit
+            h = clip_limit
+        clipped[i] = h
+
+    inc = excess // 256
+    if inc:
+        clipped = [h + inc for h in clipped]
+    if redistribute_remainder:
+        remainder = excess - inc * 256
+        if remainder:
+            step = max(256 // remainder, 1)
+            for i in range(0, 256, step):
+                if remainder == 0:
+                    break
+                clipped[i] += 1
+                remainder -= 1
+    return clipped
+
+
+def tile_lut(hist):
+    """
+    由（裁剪后的）tile 直方图构建 LUT
+    注意：低于 tile 最小灰度的表项为负值，这些灰度可能出现在相邻 tile 中，
+    插值时需保留原值，最终结果再裁剪到 0~255
+    """
+    cdf = compute_cdf(hist)
+    total = cdf[-1]
+    cdf_min = next((c for c in cdf if c > 0), 0)
 
-    # 实际 tile 数量（保证覆盖图像）
-    tile_rows = tile_size
-    tile_cols = tile_size
+    if total == cdf_min:
+        return list(range(256))
+    return [round((c - cdf_min) / (total - cdf_min) * 255) for c in cdf]
 
-    # 每个 tile 的最大宽高（不要求整除）
-    block_h = math.ceil(height / tile_rows)
-    block_w = math.ceil(width / tile_cols)
 
-    # 初始化所有 tile 的 LUT 表
-    LUTS = [[None for _ in range(tile_cols)] for _ in range(tile_rows)]
+def tile_grid(height, width, tile_size):
+    """
+    返回 (block_h, block_w)：每个 tile 的最大高宽（向上取整，保证覆盖图像）
+    """
+    return -(-height // tile_size), -(-width // tile_size)
 
-    # === 1. 对每个 tile 计算 LUT ===
-    for ty in range(tile_rows):
-        for tx in range(tile_cols):
-            # 计算 tile 的真实边界
-            y0 = ty * block_h
-            y1 = min((ty + 1) * block_h, height)
-            x0 = tx * block_w
-            x1 = min((tx + 1) * block_w, width)
 
-            tile = [row[x0:x1] for row in y_channel[y0:y1]]
+def tile_histograms(plane, tile_size=8, tile_rows=None):
+    """
+    统计 CLAHE 各 tile 的直方图（二维列表 HISTS[ty][tx]），直接在原始缓冲的行视图上统计，不复制 tile
+    各 tile 恰好划分整幅平面，全部相加即为全局直方图（见 enhance_all）
+    参数：
+        tile_rows: 只统计这些 tile 行（可迭代对象），默认全部；未统计的行为 None
+    """
+    width, height = plane.width, plane.height
+    block_h, block_w = tile_grid(height, width, tile_size)
+    view = memoryview(plane.data)
+
+    hists = [None] * tile_size
+    for ty in (range(tile_size) if tile_rows is None else tile_rows):
+        y0 = ty * block_h
+        y1 = min(y0 + block_h, height)
+        row_hists = []
+        for tx in range(tile_size):
+            x0 = min(tx * block_w, width)
+            x1 = min(x0 + block_w, width)
 
-            # 构建直方图
             hist = [0] * 256
-            for row in tile:
-                for p in row:
-                    hist[p] += 1
-
-            # 裁剪并重新分配
-            excess = sum(max(0, h - clip_limit) for h in hist)
-            for i in range(256):
-                if hist[i] > clip_limit:
-                    hist[i] = clip_limit
-            inc = excess // 256
-            hist = [h + inc for h in hist]
-
-            # 构建 CDF → LUT
-            cdf = [0] * 256
-            cdf[0] = hist[0]
-            for i in range(1, 256):
-                cdf[i] = cdf[i - 1] + hist[i]
-            total = cdf[-1]
-            cdf_min = next((c for c in cdf if c > 0), 0)
-
-            if total == cdf_min:
-                lut = list(range(256))
-            else:
-                lut = [round((cdf[i] - cdf_min) / (total - cdf_min) * 255) for i in range(256)]
-
-            LUTS[ty][tx] = lut
+            for y in range(y0, y1):
+                count_bytes(view[y * width + x0:y * width + x1], hist)
+            row_hists.append(hist)
+        hists[ty] = row_hists
+    return hists
+
+
+def compute_tile_luts(plane, tile_size=8, clip_limit=40, redistribute_remainder=False, tile_rows=None,
+                      tile_hists=None):
+    """
+    计算 CLAHE 各 tile 的 LUT（二维列表 LUTS[ty][tx]）
+    参数：
+        plane: 单通道 ImageBuffer
+        tile_rows: 只计算这些 tile 行（可迭代对象），默认全部；用于并行 / 分块计算
+        tile_hists: 可选，已统计好的 tile_histograms 结果（与 clip_limit 无关，可在多组参数间共享）
+    """
+    if tile_hists is None:
+        tile_hists = tile_histograms(plane, tile_size, tile_rows)
+    luts = [None] * tile_size
+    for ty in (range(tile_size) if tile_rows is None else tile_rows):
+        luts[ty] = [tile_lut(clip_histogram(hist, clip_limit, redistribute_remainder)) for hist in tile_hists[ty]]
+    return luts
+
+
+# 定点除法：round(n / d) ≈ ((n + d // 2) * ceil(2^40 / d)) >> 40，结果位于 8 字节字段的第 5 字节
+_DIV_SHIFT = 40
+_RESULT_BYTE = _DIV_SHIFT // 8
+
+
+def _packed(buf, pieces, hi_pieces):
+    """把按 tile 分段查表得到的字节行写入 4 字节字段（低 / 高字节），整体解释为一个大整数"""
+    buf[0::4] = b''.join(pieces)
+    if hi_pieces is not None:
+        buf[1::4] = b''.join(hi_pieces)
+    return int.from_bytes(buf, 'little')
+
+
+def _interpolate_rows_lookup(plane, luts, tile_size, y_start, y_end, src):
+    """
+    逐像素查表的插值实现（LUT 取值范围过大、无法打包时使用）
+    每个 tile 列的纵向合成 LUT 逐行原地更新，left / right 按列引用同一批列表
+    """
+    width, height = plane.width, plane.height
+    block_h, block_w = tile_grid(height, width, tile_size)
+    last = tile_size - 1
+    denom2 = 2 * block_w * block_h
+    half = block_w * block_h
+    kx = [x % block_w for x in range(width)]
+    ikx = [block_w - k for k in kx]
+
+    blended = [[0] * 256 for _ in range(tile_size)]
+    left = [blended[min(x // block_w, last)] for x in range(width)]
+    right = [blended[min(x // block_w + 1, last)] for x in range(width)]
+    out = bytearray(width * (y_end - y_start))
+
+    pos = 0
+    for y in range(y_start, y_end):
+        ty, ky = divmod(y, block_h)
+        iky = block_h - ky
+        top = luts[min(ty, last)]
+        bottom = luts[min(ty + 1, last)]
+        for t in range(tile_size):
+            # 乘 2 以便最终以 (2n + d) // 2d 的形式四舍五入
+            blended[t][:] = [2 * (iky * a + ky * b) for a, b in zip(top[t], bottom[t])]
+
+        vals = [
+            (i * a[v] + k * b[v] + half) // denom2
+            for v, a, b, k, i in zip(src[pos:pos + width], left, right, kx, ikx)
+        ]
+        out[pos:pos + width] = bytes([0 if v < 0 else 255 if v > 255 else v for v in vals])
+        pos += width
+
+    return out
+
+
+def interpolate_rows(plane, luts, tile_size=8, y_start=0, y_end=None, band=None):
+    """
+    CLAHE 第二阶段：对 [y_start, y_end) 行执行四邻域 LUT 双线性插值，返回这些行的 bytearray
+    参数：
+        band: 可选，[y_start, y_end) 行的像素字节；给出时 plane 只提供宽高（分条处理时整幅平面不在内存中）
+        luts: 只需包含这些行用到的 tile 行（ty 与 ty + 1），其余可为 None
+    双线性权重可分离：纵向权重在一行内为常数，横向权重在一列内为常数。因此
+      1) 逐行：用 bytearray.translate 按 tile 分段查表，把映射结果打包进大整数的定长字段，
+         一次标量乘加完成整行的纵向加权；
+      2) 逐列：取出该列的纵向结果，一次标量乘加完成横向加权，再用定点乘法完成除法与舍入。
+    所有运算均为 C 层的字节 / 大整数操作，Python 层循环次数只与行数、列数成正比
+    与逐像素浮点实现相比，舍入方式不同，结果误差不超过 ±1
+    """
+    width, height = plane.width, plane.height
+    if y_end is None:
+        y_end = height
+    rows = y_end - y_start
+    block_h, block_w = tile_grid(height, width, tile_size)
+    last = tile_size - 1
+    den = block_w * block_h
+
+    # 负值表项（见 tile_lut）整体加偏移量后按两个字节打包，最后在字段内完成 max(0, ·) 裁剪
+    src = memoryview(band if band is not None else plane.data)
+    if band is None:
+        src = src[y_start * width:y_end * width]
+
+    lowest = min(min(lut) for row in luts if row is not None for lut in row)
+    offset = -lowest if lowest < 0 else 0
+    if 255 + offset >= 1 << 16:
+        return _interpolate_rows_lookup(plane, luts, tile_size, y_start, y_end, src)
+
+    # 每个 tile 的查表字节：加偏移后的低字节表与高字节表（无偏移时不需要高字节表）
+    lo_tables = []
+    hi_tables = []
+    for row_luts in luts:
+        if row_luts is None:
+            lo_tables.append(None)
+            hi_tables.append(None)
+            continue
+        shifted = [[v + offset for v in lut] for lut in row_luts]
+        lo_tables.append([bytes(v & 0xFF for v in lut) for lut in shifted])
+        hi_tables.append([bytes(v >> 8 for v in lut) for lut in shifted])
+    # 第 t 段像素左侧使用 tile t、右侧使用 tile min(t + 1, last)
+    right_of = [min(t + 1, last) for t in range(tile_size)]
+
+    def lookup(segs, tables, ty, right):
+        """第 ty 行 tile 的左 / 右侧查表结果，打包为大整数"""
+        lo, hi = lo_tables[ty], hi_tables[ty]
+        if right:
+            lo = [lo[t] for t in right_of]
+            hi = [hi[t] for t in right_of]
+        return _packed(tables, [seg.translate(t) for seg, t in zip(segs, lo)],
+                       [seg.translate(t) for seg, t in zip(segs, hi)] if offset else None)
+
+    # === 1. 逐行纵向加权，结果存入 4 字节字段 ===
+    bounds = [(t * block_w, (t + 1) * block_w) for t in range(tile_size)]
+    stride = 4 * width
+    vert_left = bytearray(stride * rows)
+    vert_right = bytearray(stride * rows)
+    field = bytearray(stride)
+
+    pos = 0
+    for y in range(y_start, y_end):
+        ty, ky = divmod(y, block_h)
+        ty0, ty1 = min(ty, last), min(ty + 1, last)
+        iky = block_h - ky
+        start = (y - y_start) * width
+        row = src[start:start + width].tobytes()
+        segs = [row[x0:x1] for x0, x1 in bounds]
+
+        left = iky * lookup(segs, field, ty0, False)
+        right = iky * lookup(segs, field, ty0, True)
+        if ky:
+            left += ky * lookup(segs, field, ty1, False)
+            right += ky * lookup(segs, field, ty1, True)
+        vert_left[pos:pos + stride] = left.to_bytes(stride, 'little')
+        vert_right[pos:pos + stride] = right.to_bytes(stride, 'little')
+        pos += stride
+
+    # === 2. 逐列横向加权 + 定点除法，结果存入 8 字节字段 ===
+    left_view = memoryview(vert_left).cast('I')
+    right_view = memoryview(vert_right).cast('I')
+    column = bytearray(8 * rows)
+    column_view = memoryview(column).cast('I')
+    multiplier = -(-(1 << _DIV_SHIFT) // den)
+    bias = int.from_bytes((den // 2).to_bytes(8, 'little') * rows, 'little')
+    clamp = 0
+    if offset:
+        # 每个字段加 (2^16 - offset)：结果 ≥ 0 时第 16 位（字段第 7 字节）为 1，低 8 位即结果
+        clamp = int.from_bytes((((1 << 16) - offset) << _DIV_SHIFT).to_bytes(8, 'little') * rows, 'little')
+
+    out = bytearray(width * rows)
+    for x in range(width):
+        k = x % block_w
+        column_view[0::2] = left_view[x::width]
+        acc = (block_w - k) * int.from_bytes(column, 'little')
+        if k:
+            column_view[0::2] = right_view[x::width]
+            acc += k * int.from_bytes(column, 'little')
+        packed = ((acc + bias) * multiplier + clamp).to_bytes(8 * rows, 'little')
+
+        values = packed[_RESULT_BYTE::8]
+        if offset:
+            keep = int.from_bytes(packed[_RESULT_BYTE + 2::8], 'little') * 0xFF
+            values = (int.from_bytes(values, 'little') & keep).to_bytes(rows, 'little')
+        out[x::width] = values
+
+    return out
+
+
+# 使用等大小 tile 分块，对每个块局部直方图增强 + 裁剪限制 + 四邻域插值融合
+def clahe_equalization(y_channel, tile_size=8, clip_limit=40, redistribute_remainder=False, hist=None,
+                       tile_hists=None, workers=1):
+    """
+    CLAHE（自适应直方图均衡化）：支持非整除图像尺寸 + 插值融合
+    参数：
+        y_channel: 输入图像的 Y 通道（二维列表或单通道 ImageBuffer）
+        tile_size: 划分为 tile_size x tile_size 个网格块
+        clip_limit: 每个 bin 的频数上限，用于限制局部对比度
+        redistribute_remainder: 是否把裁剪余量的余数也重新分配（见 clip_histogram）
+        hist: 全图直方图（为与其他增强方法统一接口而保留；CLAHE 只使用各 tile 的局部直方图）
+        tile_hists: 可选，已统计好的 tile 直方图（tile_histograms 的结果），省去统计
+        workers: 进程数（None 取 CPU 核数）；> 1 且图像不小于 PARALLEL_MIN_PIXELS 时
+                 改用 clahe_equalization_parallel，结果完全一致。进程池子进程（daemonic）内不能再建进程，仍走单进程
+    返回：
+        output: 增强后的 Y 通道图像（类型与输入一致）
+    """
+    plane = to_buffer(y_channel)
+    if workers != 1:
+        from .clahe_parallel import PARALLEL_MIN_PIXELS, clahe_equalization_parallel
+        if plane.width * plane.height >= PARALLEL_MIN_PIXELS and not current_process().daemon:
+            return clahe_equalization_parallel(y_channel, tile_size, clip_limit, redistribute_remainder,
+                                               workers=workers)
+
+    # === 1. 对每个 tile 计算 LUT ===
+    luts = compute_tile_luts(plane, tile_size, clip_limit, redistribute_remainder, tile_hists=tile_hists)
 
     # === 2. 对每个像素执行 4-LUT 插值融合 ===
-    output = [[0 for _ in range(width)] for _ in range(height)]
-
-    for y in range(height):
-        for x in range(width):
-            # 像素所在 tile 的浮点索引位置
-            gx = x / block_w
-            gy = y / block_h
-
-            tx = int(gx)
-            ty = int(gy)
-            dx = gx - tx
-            dy = gy - ty
-
-            # 限制 tile 索引合法（边缘处理）
-            tx0 = min(tx, tile_cols - 1)
-            tx1 = min(tx + 1, tile_cols - 1)
-            ty0 = min(ty, tile_rows - 1)
-            ty1 = min(ty + 1, tile_rows - 1)
-
-            val = y_channel[y][x]
-
-            # 取出四个邻接 tile 的 LUT 值
-            p00 = LUTS[ty0][tx0][val]
-            p10 = LUTS[ty0][tx1][val]
-            p01 = LUTS[ty1][tx0][val]
-            p11 = LUTS[ty1][tx1][val]
-
-            # 双线性插值融合
-            interp_val = (
-                (1 - dx) * (1 - dy) * p00 +
-                dx * (1 - dy) * p10 +
-                (1 - dx) * dy * p01 +
-                dx * dy * p11
-            )
-            output[y][x] = int(round(interp_val))
+    output = interpolate_rows(plane, luts, tile_size)
 
-    return output
+    return restore_like(y_channel, ImageBuffer(plane.width, plane.height, 1, output))
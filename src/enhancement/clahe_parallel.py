@@ -0,0 +1,111 @@
+# 并行 CLAHE：面向扫描文档、2000 万像素以上照片等大图
+# 两个阶段都可以独立切分：
+#   1) 各 tile 行的 LUT 互不依赖 → 按 tile 行分给进程池
+#   2) 插值融合只依赖全部 LUT 与本行像素 → 按行带（row band）分给进程池
+# 输入 / 输出平面放在 multiprocessing.shared_memory 中，进程间只传递名称、尺寸与 LUT
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from image_io.buffer import ImageBuffer, to_buffer, restore_like
+from .clahe import compute_tile_luts, interpolate_rows, clahe_equalization
+
+# 小于该像素数时进程调度开销大于收益，直接走单进程实现
+PARALLEL_MIN_PIXELS = 1 << 20
+
+
+def _attach(name):
+    """在子进程中按名称挂载共享内存"""
+    return shared_memory.SharedMemory(name=name)
+
+
+def _luts_worker(name, width, height, tile_size, clip_limit, redistribute_remainder, tile_rows):
+    """子进程：计算若干 tile 行的 LUT"""
+    shm = _attach(name)
+    try:
+        plane = ImageBuffer.wrap(width, height, 1, shm.buf)
+        luts = compute_tile_luts(plane, tile_size, clip_limit, redistribute_remainder, tile_rows)
+        result = [(ty, luts[ty]) for ty in tile_rows]
+        del plane, luts
+        return result
+    finally:
+        shm.close()
+
+
+def _band_worker(name, out_name, width, height, tile_size, luts, y_start, y_end):
+    """子进程：对 [y_start, y_end) 行做插值融合，结果直接写入共享输出平面"""
+    shm = _attach(name)
+    out = _attach(out_name)
+    try:
+        plane = ImageBuffer.wrap(width, height, 1, shm.buf)
+        out.buf[y_start * width:y_end * width] = interpolate_rows(plane, luts, tile_size, y_start, y_end)
+        del plane
+    finally:
+        shm.close()
+        out.close()
+
+
+def _split(count, parts):
+    """把 range(count) 均分为至多 parts 段，返回 [(start, end)]"""
+    parts = max(1, min(parts, count))
+    base, extra = divmod(count, parts)
+    bounds = []
+    start = 0
+    for i in range(parts):
+        end = start + base + (1 if i < extra else 0)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def clahe_equalization_parallel(y_channel, tile_size=8, clip_limit=40, redistribute_remainder=False,
+                                workers=None, bands_per_worker=2, executor=None):
+    """
+    多进程 CLAHE，结果与 clahe_equalization 完全一致
+    参数：
+        workers: 进程数，默认取 CPU 核数；≤ 1 或图像较小时退化为单进程实现
+        bands_per_worker: 每个进程分到的行带数，略大于 1 便于负载均衡
+        executor: 可复用的 ProcessPoolExecutor（批处理时避免反复创建进程池）
+    返回：增强后的 Y 通道（类型与输入一致）
+    """
+    plane = to_buffer(y_channel)
+    width, height = plane.width, plane.height
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or width * height < PARALLEL_MIN_PIXELS:
+        return clahe_equalization(y_channel, tile_size, clip_limit, redistribute_remainder)
+
+    size = width * height
+    src = shared_memory.SharedMemory(create=True, size=size)
+    dst = shared_memory.SharedMemory(create=True, size=size)
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        src.buf[:size] = plane.data
+
+        # === 1. 按 tile 行并行计算 LUT ===
+        luts = [None] * tile_size
+        jobs = [
+            pool.submit(_luts_worker, src.name, width, height, tile_size, clip_limit,
+                        redistribute_remainder, list(range(a, b)))
+            for a, b in _split(tile_size, workers)
+        ]
+        for job in jobs:
+            for ty, row_luts in job.result():
+                luts[ty] = row_luts
+
+        # === 2. 按行带并行插值 ===
+        jobs = [
+            pool.submit(_band_worker, src.name, dst.name, width, height, tile_size, luts, a, b)
+            for a, b in _split(height, workers * bands_per_worker)
+        ]
+        for job in jobs:
+            job.result()
+
+        output = bytearray(dst.buf[:size])
+    finally:
+        if executor is None:
+            pool.shutdown()
+        for shm in (src, dst):
+            shm.close()
+            shm.unlink()
+
+    return restore_like(y_channel, ImageBuffer(width, height, 1, output))
@@ -0,0 +1,73 @@
+# 多方式扇出：同一 Y 平面一次性执行多种增强，共享中间结果
+#   - 全局直方图只统计一次（CDF、最值由 Histogram 缓存），传给各方式；
+#     同时请求 CLAHE 时先统计各 tile 直方图，全局直方图由其相加得到，整幅平面只扫描一次
+#   - 点运算（均衡化、拉伸、Gamma）的增强后直方图由原直方图经同一 LUT 推导，不再扫描输出
+#   - 色度相关的合并中间量见 image_io.chroma_offsets（与 Y 无关，各方式共享）
+from backend import get_backend
+from histogram import Histogram
+from image_io.buffer import to_buffer
+from utils import metrics
+from .clahe import clahe_equalization, tile_histograms
+from .lut import POINT_OPS, build_point_lut, remap_histogram
+
+# 支持的增强方式
+FANOUT_MODES = ('equalize', 'clahe', 'stretch', 'gamma', 'sliding')
+
+# 增强方式 → 后端函数名
+_METHOD_NAMES = {
+    'equalize': 'histogram_equalization',
+    'clahe': 'clahe_equalization',
+    'stretch': 'contrast_stretch',
+    'gamma': 'gamma_correction',
+    'sliding': 'sliding_equalization',
+}
+
+
+def _sum_histograms(tile_hists):
+    """各 tile 直方图逐 bin 相加"""
+    return [sum(column) for column in zip(*(hist for row in tile_hists for hist in row))]
+
+
+def enhance_all(y_channel, modes=FANOUT_MODES, params=None, hist=None, backend=None):
+    """
+    对同一 Y 平面执行多种增强
+    参数：
+        modes: 增强方式列表（FANOUT_MODES 的子集）
+        params: 可选 {方式: 参数字典}，如 {'gamma': {'gamma': 0.7}, 'clahe': {'clip_limit': 20}}
+        hist: 可选，已统计好的原始平面 Histogram
+        backend: 计算后端名称，None 时读取环境变量 ENHANCE_BACKEND
+    返回：(原图 Histogram, {方式: (增强后的 Y, 增强后的 Histogram)})，增强结果与逐个调用各方法一致
+    """
+    params = params or {}
+    unknown = [m for m in modes if m not in _METHOD_NAMES]
+    if unknown:
+        raise ValueError(f"未知增强方式：{', '.join(unknown)}（可选：{', '.join(FANOUT_MODES)}）")
+    be = get_backend(backend)
+    plane = to_buffer(y_channel)
+
+    # 参考实现的 CLAHE 可以直接使用预先统计的 tile 直方图
+    tile_hists = None
+    with metrics.stage('histogram'):
+        if 'clahe' in modes and be.clahe_equalization is clahe_equalization:
+            tile_hists = tile_histograms(plane, params.get('clahe', {}).get('tile_size', 8))
+            if hist is None:
+                hist = Histogram(_sum_histograms(tile_hists))
+        if hist is None:
+            hist = Histogram(be.compute_histogram(plane))
+        elif not isinstance(hist, Histogram):
+            hist = Histogram(hist)
+
+    results = {}
+    for mode in modes:
+        mode_params = params.get(mode, {})
+        extra = {'tile_hists': tile_hists} if mode == 'clahe' and tile_hists is not None else {}
+        with metrics.stage(f'enhance.{mode}'):
+            y_enhanced = getattr(be, _METHOD_NAMES[mode])(y_channel, hist=hist, **mode_params, **extra)
+        with metrics.stage('histogram'):
+            if mode in POINT_OPS:
+                # 点运算：增强后直方图可由原直方图经同一 LUT 推导，无需再扫描像素
+                hist_after = Histogram(remap_histogram(hist, build_point_lut([(mode, mode_params)], hist)))
+            else:
+                hist_after = Histogram(be.compute_histogram(y_enhanced))
+        results[mode] = (y_enhanced, hist_after)
+    return hist, results
@@ -1,7 +1,9 @@
+from image_io.buffer import to_buffer, restore_like
+from .lut import gamma_lut
+
+
 # Gamma 校正（提升暗部细节）
-def gamma_correction(y_channel, gamma=1.5):
-    result = [[
-        round((pix / 255) ** gamma * 255)
-        for pix in row
-    ] for row in y_channel]
-    return result
+# hist 参数仅为与其他增强方法统一接口，gamma 与图像统计量无关
+def gamma_correction(y_channel, gamma=1.5, hist=None):
+    # 仅 256 种输入灰度，查找表按 gamma 值缓存，再整体映射
+    return restore_like(y_channel, to_buffer(y_channel).apply_lut(gamma_lut(gamma)))
\ No newline at end of file
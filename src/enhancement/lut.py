@@ -0,0 +1,120 @@
+# 点运算查找表（LUT）引擎：stretch / gamma / equalize 都只依赖像素自身灰度，
+# 可各自表示为 256 项映射表，多步增强可先合成为一张表，再对平面做一次遍历
+from functools import lru_cache
+
+from image_io.buffer import to_buffer, restore_like
+from histogram import Histogram, compute_cdf
+
+IDENTITY_LUT = bytes(range(256))
+
+
+@lru_cache(maxsize=64)
+def gamma_lut(gamma):
+    """
+    Gamma 校正 LUT：lut[p] = round((p / 255) ** gamma * 255)
+    按 gamma 值缓存（有界 LRU），同一参数只计算一次
+    """
+    return bytes(round((p / 255) ** gamma * 255) for p in range(256))
+
+
+def stretch_lut(y_min, y_max):
+    """
+    线性拉伸 LUT：把 [y_min, y_max] 映射到 [0, 255]，区间外的灰度不会出现，置 0
+    y_min == y_max 时返回恒等映射
+    """
+    if y_max == y_min:
+        return IDENTITY_LUT
+    return bytes(
+        round((p - y_min) * 255 / (y_max - y_min)) if y_min <= p <= y_max else 0
+        for p in range(256)
+    )
+
+
+def equalize_lut(hist):
+    """
+    全局均衡化 LUT：lut[p] = round((cdf[p] - cdf_min) / (total - cdf_min) * 255)
+    低于最小灰度的表项不会被用到，但会算出负值，裁剪为 0；单一灰度时返回恒等映射
+    hist 为 Histogram 时直接使用其缓存的 CDF
+    """
+    cdf = hist.cdf if isinstance(hist, Histogram) else compute_cdf(hist)
+
+    cdf_min = next((c for c in cdf if c > 0), 0)
+    total = cdf[-1]
+    if total == cdf_min:
+        return IDENTITY_LUT
+    return bytes(max(0, round((cdf[i] - cdf_min) / (total - cdf_min) * 255)) for i in range(256))
+
+
+def compose_luts(*luts):
+    """
+    合成多个 LUT：先应用第一个，再应用第二个……返回等价的单张 LUT
+    """
+    result = IDENTITY_LUT
+    for lut in luts:
+        result = result.translate(bytes(lut))
+    return result
+
+
+def remap_histogram(hist, lut):
+    """
+    求平面经 lut 映射后的直方图，无需真正遍历像素：hist'[lut[p]] += hist[p]
+    """
+    out = [0] * 256
+    for p, count in enumerate(hist):
+        if count:
+            out[lut[p]] += count
+    return out
+
+
+# 各点运算的 LUT 构建器：统一签名 (当前直方图, **参数) → LUT
+POINT_OPS = {
+    'stretch': lambda hist: stretch_lut(hist.min, hist.max),
+    'gamma': lambda hist, gamma=1.5: gamma_lut(gamma),
+    'equalize': lambda hist: equalize_lut(hist),
+}
+
+# 不依赖图像统计量的运算，整条链都由它们组成时可跳过直方图统计
+_STATELESS_OPS = {'gamma'}
+
+
+def _normalize_op(op):
+    """'gamma' 或 ('gamma', {'gamma': 0.7}) → (名称, 参数字典)"""
+    if isinstance(op, str):
+        return op, {}
+    name, params = op
+    return name, dict(params or {})
+
+
+def build_point_lut(ops, hist=None):
+    """
+    将点运算链合成为一张 LUT
+    参数：
+        ops: 运算列表，元素为名称或 (名称, 参数字典)，如 ['stretch', ('gamma', {'gamma': 0.7})]
+        hist: 原始平面的 Histogram（或频数列表）；链中含 stretch / equalize 时必须提供
+    说明：后续步骤所需的直方图由 remap_histogram 从原始直方图推导，不再扫描像素
+    """
+    if hist is not None and not isinstance(hist, Histogram):
+        hist = Histogram(hist)
+    lut = IDENTITY_LUT
+    for op in ops:
+        name, params = _normalize_op(op)
+        if name not in POINT_OPS:
+            raise ValueError(f"未知点运算：{name}")
+        current = None
+        if name not in _STATELESS_OPS:
+            current = hist if lut is IDENTITY_LUT else Histogram(remap_histogram(hist, lut))
+        lut = compose_luts(lut, POINT_OPS[name](current, **params))
+    return lut
+
+
+def apply_point_ops(y_channel, ops, hist=None):
+    """
+    对 Y 通道执行一串点运算（如 stretch → gamma），只统计一次直方图、只遍历一次平面
+    hist: 可选，已统计好的原始平面 Histogram，避免重复统计
+    返回类型与输入一致（ImageBuffer 或二维列表）
+    """
+    plane = to_buffer(y_channel)
+    ops = [_normalize_op(op) for op in ops]
+    if hist is None and any(name not in _STATELESS_OPS for name, _ in ops):
+        hist = Histogram.of(plane)
+    return restore_like(y_channel, plane.apply_lut(build_point_lut(ops, hist)))
@@ -0,0 +1,227 @@
+# 帧序列（监控视频等）增强：相邻帧高度相关，逐帧独立处理会重复大量工作，各帧独立建表还会闪烁
+#   - 增量直方图：按 (行, tile 列) 分段与上一帧比较，只对变化的分段减去旧计数、加上新计数；
+#     变化像素过多（如整体曝光变化）时直接重新统计
+#   - LUT 复用：直方图与上次建表时的直方图之间的距离（归一化 L1）不超过阈值时沿用原 LUT，CLAHE 按 tile 判断
+#   - 时间平滑：重新建表后不直接切换，而是逐帧向新表逼近，避免亮度跳变造成闪烁
+#   - 输出复用：某个 tile 行带的像素与其插值用到的两行 LUT 都没变时，直接沿用上一帧该行带的输出
+# threshold = 0 且 smoothing = 0 时，每帧结果与 histogram_equalization / clahe_equalization 逐位一致
+from histogram import Histogram, count_bytes
+from image_io.buffer import ImageBuffer, to_buffer, restore_like
+from .lut import equalize_lut
+from .clahe import clip_histogram, tile_lut, tile_grid, tile_histograms, interpolate_rows
+
+# 支持的增强方式
+SEQUENCE_MODES = ('equalize', 'clahe')
+
+# 默认复用阈值：直方图有不超过 2% 的像素换了灰度级时沿用原 LUT
+DEFAULT_THRESHOLD = 0.02
+
+# 默认平滑系数：每帧把当前 LUT 与目标 LUT 的差距缩小到原来的一半
+DEFAULT_SMOOTHING = 0.5
+
+# 变化分段的像素占比超过该值时，重新统计比增量更新（减旧 + 加新）更快
+RECOUNT_RATIO = 0.5
+
+
+def histogram_distance(a, b):
+    """两个直方图的归一化 L1 距离：0 为完全相同，1 为完全不重叠"""
+    total = max(sum(a), sum(b))
+    if not total:
+        return 0.0
+    return sum(abs(x - y) for x, y in zip(a, b)) / (2 * total)
+
+
+def approach(current, target, smoothing):
+    """
+    把 LUT current 向 target 逼近一步：每项剩余差距乘以 smoothing 后截断取整
+    只要两者不同，每项每次至少移动 1，有限帧内必然收敛到 target
+    """
+    if not smoothing or current is None:
+        return list(target)
+    return [t - int((t - c) * smoothing) for c, t in zip(current, target)]
+
+
+class SequenceEnhancer:
+    """
+    帧序列增强器：逐帧调用 process(frame)，在帧之间保留直方图、LUT 与上一帧输出
+    参数：
+        mode: 'equalize'（全局均衡化）或 'clahe'
+        tile_size, clip_limit, redistribute_remainder: CLAHE 参数，含义同 clahe_equalization
+        threshold: LUT 复用阈值（直方图距离，见 histogram_distance），0 表示直方图一变就重新建表
+        smoothing: 时间平滑系数，取值 [0, 1)，0 表示立即切换到新 LUT
+    属性：
+        stats: 累计统计（帧数、变化分段、重新统计次数、LUT 重建 / 复用次数、行带复用次数）
+    帧尺寸变化时自动从头开始（视为新的序列）
+    """
+
+    def __init__(self, mode='clahe', tile_size=8, clip_limit=40, redistribute_remainder=False,
+                 threshold=DEFAULT_THRESHOLD, smoothing=DEFAULT_SMOOTHING):
+        if mode not in SEQUENCE_MODES:
+            raise ValueError(f"序列模式不支持增强方式：{mode}（可选：{', '.join(SEQUENCE_MODES)}）")
+        if not 0 <= smoothing < 1:
+            raise ValueError(f"平滑系数应在 [0, 1) 内，实际为 {smoothing}")
+        if threshold < 0:
+            raise ValueError(f"复用阈值不能为负数：{threshold}")
+        self.mode = mode
+        # 全局均衡化视为 1×1 的网格：整幅图只有一个 tile，分段即整行
+        self.grid = tile_size if mode == 'clahe' else 1
+        self.clip_limit = clip_limit
+        self.redistribute_remainder = redistribute_remainder
+        self.threshold = threshold
+        self.smoothing = smoothing
+        self.stats = dict.fromkeys(('frames', 'segments', 'segments_changed', 'recounts',
+                                    'luts_rebuilt', 'luts_reused', 'bands', 'bands_reused'), 0)
+        self.reset()
+
+    def reset(self):
+        """丢弃帧间状态，下一帧按第一帧处理"""
+        self._size = None
+        self._prev = None      # 上一帧像素（bytes）
+        self._output = None    # 上一帧输出（bytes）
+        self._hists = None     # 当前各 tile 直方图 [ty][tx]
+        self._refs = None      # 各 tile 上次建表时的直方图
+        self._targets = None   # 各 tile 最新建出的 LUT
+        self._luts = None      # 各 tile 实际使用的 LUT（平滑后）
+        self._pending = set()  # 尚未收敛到目标 LUT 的 tile
+
+    def _build_lut(self, hist):
+        if self.mode == 'equalize':
+            return list(equalize_lut(Histogram(hist)))
+        return tile_lut(clip_histogram(hist, self.clip_limit, self.redistribute_remainder))
+
+    def _start(self, plane, data):
+        """第一帧：完整统计与建表"""
+        width, height = plane.width, plane.height
+        block_h, block_w = tile_grid(height, width, self.grid)
+        self._size = (width, height)
+        self._block_h = block_h
+        self._bounds = [(x0, min(x0 + block_w, width))
+                        for x0 in (min(tx * block_w, width) for tx in range(self.grid))]
+        self._hists = tile_histograms(plane, self.grid)
+        self._refs = [[list(hist) for hist in row] for row in self._hists]
+        self._targets = [[self._build_lut(hist) for hist in row] for row in self._hists]
+        self._luts = [list(row) for row in self._targets]
+        self._pending = set()
+        self.stats['luts_rebuilt'] += self.grid * self.grid
+        return set(range(self.grid))
+
+    def _update_histograms(self, plane, data):
+        """
+        与上一帧逐分段比较并增量更新各 tile 直方图
+        返回 (直方图有变化的 tile 集合, 像素有变化的 tile 行集合)
+        """
+        prev = self._prev
+        width, height = self._size
+        block_h = self._block_h
+        changed = []
+        changed_pixels = 0
+        for y in range(height):
+            start = y * width
+            if prev[start:start + width] == data[start:start + width]:
+                continue
+            ty = y // block_h
+            for tx, (x0, x1) in enumerate(self._bounds):
+                a, b = start + x0, start + x1
+                if a < b and prev[a:b] != data[a:b]:
+                    changed.append((a, b, ty, tx))
+                    changed_pixels += b - a
+        self.stats['segments'] += height * self.grid
+        self.stats['segments_changed'] += len(changed)
+
+        dirty = {(ty, tx) for _, _, ty, tx in changed}
+        if changed_pixels > RECOUNT_RATIO * width * height:
+            self.stats['recounts'] += 1
+            rows = sorted({ty for ty, _ in dirty})
+            recounted = tile_histograms(plane, self.grid, rows)
+            for ty in rows:
+                self._hists[ty] = recounted[ty]
+        else:
+            hists = self._hists
+            for a, b, ty, tx in changed:
+                hist = hists[ty][tx]
+                for val in prev[a:b]:
+                    hist[val] -= 1
+                count_bytes(data[a:b], hist)
+        return dirty, {ty for ty, _ in dirty}
+
+    def _update_luts(self, dirty):
+        """按阈值决定重建或复用各 tile 的 LUT，再做一步平滑，返回 LUT 有变化的 tile 行集合"""
+        changed_rows = set()
+        for ty, tx in dirty:
+            hist = self._hists[ty][tx]
+            if histogram_distance(hist, self._refs[ty][tx]) <= self.threshold:
+                self.stats['luts_reused'] += 1
+                continue
+            self.stats['luts_rebuilt'] += 1
+            self._refs[ty][tx] = list(hist)
+            target = self._build_lut(hist)
+            self._targets[ty][tx] = target
+            if target != self._luts[ty][tx]:
+                self._pending.add((ty, tx))
+
+        for ty, tx in list(self._pending):
+            target = self._targets[ty][tx]
+            lut = approach(self._luts[ty][tx], target, self.smoothing)
+            if lut == target:
+                self._pending.discard((ty, tx))
+            self._luts[ty][tx] = lut
+            changed_rows.add(ty)
+        return changed_rows
+
+    def _render(self, plane, data, recompute):
+        """重新计算 recompute 中的行带，其余行带沿用上一帧输出"""
+        width, height = self._size
+        if self.mode == 'equalize':
+            self.stats['bands'] += 1
+            if not recompute:
+                self.stats['bands_reused'] += 1
+                return bytearray(self._output)
+            return bytearray(data.translate(bytes(self._luts[0][0])))
+
+        block_h = self._block_h
+        bands = [ty for ty in range(self.grid) if ty * block_h < height]
+        self.stats['bands'] += len(bands)
+        out = bytearray(width * height) if self._output is None else bytearray(self._output)
+        # 相邻的待重算行带合并为一次 interpolate_rows 调用（逐列开销只付一次）
+        runs = []
+        for ty in bands:
+            if ty not in recompute:
+                self.stats['bands_reused'] += 1
+            elif runs and runs[-1][1] == ty:
+                runs[-1][1] = ty + 1
+            else:
+                runs.append([ty, ty + 1])
+        for t0, t1 in runs:
+            y0, y1 = t0 * block_h, min(t1 * block_h, height)
+            out[y0 * width:y1 * width] = interpolate_rows(plane, self._luts, self.grid, y0, y1)
+        return out
+
+    def process(self, frame):
+        """增强一帧（单通道 ImageBuffer 或二维列表），返回类型与输入一致"""
+        plane = to_buffer(frame)
+        data = bytes(plane.data)
+        if (plane.width, plane.height) != self._size:
+            self.reset()
+
+        if self._prev is None:
+            recompute = self._start(plane, data)
+        else:
+            dirty, pixel_rows = self._update_histograms(plane, data)
+            lut_rows = self._update_luts(dirty)
+            # 第 ty 个行带插值用到第 ty、ty + 1 行 LUT
+            last = self.grid - 1
+            recompute = {ty for ty in range(self.grid)
+                         if ty in pixel_rows or ty in lut_rows or min(ty + 1, last) in lut_rows}
+
+        out = self._render(plane, data, recompute)
+        self._prev = data
+        self._output = bytes(out)
+        self.stats['frames'] += 1
+        return restore_like(frame, ImageBuffer(plane.width, plane.height, 1, out))
+
+
+def enhance_sequence(frames, mode='clahe', **params):
+    """逐帧增强一个帧序列（可迭代对象），惰性产出增强结果；params 传给 SequenceEnhancer"""
+    enhancer = SequenceEnhancer(mode, **params)
+    for frame in frames:
+        yield enhancer.process(frame)
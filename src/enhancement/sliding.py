@@ -0,0 +1,140 @@
+# 滑动窗口自适应均衡化（逐像素窗口 AHE / CLAHE）：每个像素按以它为中心的 (2r+1)² 窗口的直方图均衡化，
+# 没有 tile 划分，也就没有块效应与插值
+# 移动直方图（Huang / Perreault 思路）：
+#   - 每列维护一个列直方图，覆盖当前行上下 r 行；换行时每列只减去离开的一行像素、加上进入的一行像素
+#   - 窗口直方图 = 相邻 2r+1 个列直方图之和；右移一列时加上进入的列、减去离开的列
+# 直方图按定长字段打包进一个大整数（字段 i = 灰度 ≤ i 的像素数，即累计直方图），
+# 列直方图的加减、取 CDF 都是一次 C 层大整数运算，每个像素的开销与窗口半径无关
+from itertools import accumulate, chain
+from operator import sub
+
+from image_io.buffer import ImageBuffer, to_buffer, restore_like
+
+
+def _layout(area):
+    """字段宽度与打包常量：字段能容纳窗口的最大像素数 area，最高位留作裁剪判断的保护位"""
+    bits = area.bit_length() + 1
+    unit = sum(1 << (bits * i) for i in range(256))
+    # STEP[v]：灰度 v 的一个像素对累计直方图的贡献（字段 v..255 各加 1）
+    steps = [unit >> (bits * v) << (bits * v) for v in range(256)]
+    return bits, unit, steps
+
+
+def _fold_masks(bits):
+    """按字段数折半求和用的掩码：(字段数 n, 低 n 个字段的掩码)"""
+    halves = []
+    n = 256
+    while n > 1:
+        n //= 2
+        halves.append((bits * n, (1 << (bits * n)) - 1))
+    return halves
+
+
+def _field_sum(x, halves):
+    """大整数各字段之和（高半部分加到低半部分，反复折半；字段之和不超过单个字段的容量）"""
+    for shift, mask in halves:
+        x = (x & mask) + (x >> shift)
+    return x
+
+
+def _clip_terms(cum, v, bits, field, full, bias, guards, lows, halves):
+    """
+    裁剪项：返回 (超出 clip_limit 的总量, 其中灰度 ≤ v 的部分)
+    由累计直方图相邻字段相减得到各 bin 频数（累计值单调，不会借位），加偏置后保护位为 1 的字段即 > clip_limit 的 bin；
+    这些字段去掉偏置即为超出量，再按字段求和
+    """
+    hist = cum - ((cum << bits) & full)
+    biased = hist + bias
+    over_bits = biased & guards
+    if not over_bits:
+        return 0, 0
+    marks = over_bits >> (bits - 1)
+    over = ((biased ^ over_bits) & (marks * field)) + marks
+    return _field_sum(over, halves), _field_sum(over & lows[v], halves)
+
+
+def sliding_equalization(y_channel, radius=32, clip_limit=40, redistribute_remainder=False, hist=None):
+    """
+    滑动窗口 CLAHE：每个像素按其 (2*radius+1)² 邻域（图像边缘处窗口截断）的裁剪直方图均衡化
+    参数：
+        y_channel: 输入图像的 Y 通道（二维列表或单通道 ImageBuffer）
+        radius: 窗口半径
+        clip_limit: 窗口直方图每个 bin 的频数上限（含义同 clahe_equalization）；None 时不裁剪，即普通 AHE
+        redistribute_remainder: 是否把裁剪余量的余数也重新分配（见 clip_histogram）
+        hist: 全图直方图（为与其他增强方法统一接口而保留，不使用）
+    返回：增强后的 Y 通道（类型与输入一致）
+    每个像素的结果与对其窗口直方图执行 clip_histogram + tile_lut 后查表完全一致
+    """
+    if radius < 0:
+        raise ValueError(f"窗口半径不能为负数：{radius}")
+    plane = to_buffer(y_channel)
+    width, height = plane.width, plane.height
+    data = plane.data
+    out = bytearray(width * height)
+
+    side = 2 * radius + 1
+    area = min(side, width) * min(side, height)
+    bits, unit, steps = _layout(area)
+    field = (1 << bits) - 1
+    full = (1 << (bits * 256)) - 1
+    top = bits * 255
+    clip = clip_limit is not None and clip_limit < area
+    if clip:
+        guard = 1 << (bits - 1)
+        bias = unit * (guard - clip_limit - 1)
+        guards = unit * guard
+        lows = [(1 << (bits * (v + 1))) - 1 for v in range(256)]
+        halves = _fold_masks(bits)
+
+    # 列直方图初始覆盖第 0..radius 行
+    cols = [0] * width
+    for y in range(min(radius + 1, height)):
+        cols = [c + steps[v] for c, v in zip(cols, data[y * width:(y + 1) * width])]
+
+    pad = [0] * (radius + 1)
+    for y in range(height):
+        if y:
+            # 列直方图下移一行：加入第 y + radius 行，移出第 y - radius - 1 行
+            if y + radius < height:
+                entering = data[(y + radius) * width:(y + radius + 1) * width]
+                cols = [c + steps[v] for c, v in zip(cols, entering)]
+            if y - radius - 1 >= 0:
+                leaving = data[(y - radius - 1) * width:(y - radius) * width]
+                cols = [c - steps[v] for c, v in zip(cols, leaving)]
+
+        # 窗口直方图逐列右移：第 x 列的窗口 = 第 x-1 列的窗口 + 列 x+radius − 列 x-radius-1
+        first = sum(cols[:radius + 1])
+        enter = cols[radius + 1:] + pad
+        leave = pad[1:] + cols
+        windows = accumulate(chain((first,), map(sub, enter[:width - 1], leave[:width - 1])))
+
+        row = data[y * width:(y + 1) * width]
+        values = []
+        for cum, v in zip(windows, row):
+            total = cum >> top
+            lowest = ((cum & -cum).bit_length() - 1) // bits  # 窗口最小灰度
+            cdf_min = (cum >> (bits * lowest)) & field
+            cdf = (cum >> (bits * v)) & field
+            if clip:
+                excess, partial = _clip_terms(cum, v, bits, field, full, bias, guards, lows, halves)
+                if excess:
+                    inc = excess // 256
+                    cdf += (v + 1) * inc - partial
+                    total += 256 * inc - excess
+                    rem = excess - 256 * inc if redistribute_remainder else 0
+                    if rem:
+                        # 余数逐个分配到 0, step, 2*step, ... 号 bin
+                        step = max(256 // rem, 1)
+                        cdf += min(rem, v // step + 1)
+                        total += rem
+                    if inc or rem:
+                        cdf_min = min(cum & field, clip_limit) + inc + (1 if rem else 0)
+                    else:
+                        cdf_min = min(cdf_min, clip_limit)
+            if total == cdf_min:
+                values.append(v)
+            else:
+                values.append(round((cdf - cdf_min) / (total - cdf_min) * 255))
+        out[y * width:(y + 1) * width] = bytes(values)
+
+    return restore_like(y_channel, ImageBuffer(width, height, 1, out))
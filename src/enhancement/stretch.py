@@ -1,12 +1,16 @@
+from image_io.buffer import to_buffer, restore_like
+from .lut import stretch_lut
+
+
 # 对比度拉伸（线性灰度归一化）
-def contrast_stretch(y_channel):
-    y_flat = [pix for row in y_channel for pix in row]
-    y_min, y_max = min(y_flat), max(y_flat)
+# hist: 可选，已统计好的 Histogram，直接读取其缓存的最值
+def contrast_stretch(y_channel, hist=None):
+    plane = to_buffer(y_channel)
+    if hist is not None:
+        y_min, y_max = hist.min, hist.max
+    else:
+        y_min, y_max = min(plane.data), max(plane.data)
     if y_max == y_min:
         return y_channel  # 若亮度无变化，返回原图
 
-    result = [[
-        round((pix - y_min) * 255 / (y_max - y_min))
-        for pix in row
-    ] for row in y_channel]
-    return result
\ No newline at end of file
+    return restore_like(y_channel, plane.apply_lut(stretch_lut(y_min, y_max)))
\ No newline at end of file
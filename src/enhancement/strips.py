@@ -0,0 +1,145 @@
+# 分条（out-of-core）增强：整幅平面不进入内存，按行带读取 / 写出
+# 数据源与输出只需提供 width、height、read_rows(y0, y1) / write_rows(y0, data)，
+# 例如 image_io.RawPlane（内存映射的原始平面）或 ImageBuffer
+#   - 全局方法（均衡化、拉伸）：第一遍逐行带累加直方图，第二遍逐行带查表
+#   - CLAHE：按 tile 行滑动，只保留当前 tile 行与下一 tile 行的 LUT；每个行带读取两次（统计 + 插值）
+# 峰值内存只与行带大小（band_rows × 宽度）和 tile 列数有关，与图像高度无关
+import argparse
+
+from histogram import Histogram, count_bytes
+from .lut import equalize_lut, gamma_lut, stretch_lut
+from .clahe import clip_histogram, tile_lut, tile_grid, interpolate_rows
+
+# 默认每个行带的行数
+DEFAULT_BAND_ROWS = 256
+
+
+def iter_bands(y_start, y_end, band_rows=DEFAULT_BAND_ROWS):
+    """把 [y_start, y_end) 切分为至多 band_rows 行的行带，逐个产出 (y0, y1)"""
+    for y0 in range(y_start, y_end, band_rows):
+        yield y0, min(y0 + band_rows, y_end)
+
+
+def _check_planes(source, sink):
+    if getattr(source, 'channels', 1) != 1:
+        raise ValueError("分条增强只支持单通道平面")
+    if sink is not None and (sink.width, sink.height) != (source.width, source.height):
+        raise ValueError(f"输出尺寸 {sink.width}x{sink.height} 与输入 {source.width}x{source.height} 不符")
+
+
+def strip_histogram(source, band_rows=DEFAULT_BAND_ROWS):
+    """逐行带累加整幅平面的直方图"""
+    hist = [0] * 256
+    for y0, y1 in iter_bands(0, source.height, band_rows):
+        count_bytes(source.read_rows(y0, y1), hist)
+    return Histogram(hist)
+
+
+def apply_lut_strips(source, sink, lut, band_rows=DEFAULT_BAND_ROWS):
+    """逐行带查表：sink = lut[source]"""
+    _check_planes(source, sink)
+    table = lut if isinstance(lut, (bytes, bytearray)) else bytes(lut)
+    for y0, y1 in iter_bands(0, source.height, band_rows):
+        sink.write_rows(y0, source.read_rows(y0, y1).translate(table))
+    return sink
+
+
+def histogram_equalization_strips(source, sink, band_rows=DEFAULT_BAND_ROWS, hist=None):
+    """分条全局直方图均衡化（两遍）；hist 可传入已统计好的 Histogram 省去第一遍"""
+    if hist is None:
+        hist = strip_histogram(source, band_rows)
+    return apply_lut_strips(source, sink, equalize_lut(hist), band_rows)
+
+
+def contrast_stretch_strips(source, sink, band_rows=DEFAULT_BAND_ROWS, hist=None):
+    """分条线性拉伸（两遍）；亮度无变化时原样复制"""
+    if hist is None:
+        hist = strip_histogram(source, band_rows)
+    return apply_lut_strips(source, sink, stretch_lut(hist.min, hist.max), band_rows)
+
+
+def gamma_correction_strips(source, sink, gamma=1.5, band_rows=DEFAULT_BAND_ROWS):
+    """分条 Gamma 校正（一遍）"""
+    return apply_lut_strips(source, sink, gamma_lut(gamma), band_rows)
+
+
+def _tile_row_luts(source, ty, tile_size, clip_limit, redistribute_remainder, band_rows):
+    """逐行带统计第 ty 行各 tile 的直方图并构建 LUT，与 compute_tile_luts 结果一致"""
+    width, height = source.width, source.height
+    block_h, block_w = tile_grid(height, width, tile_size)
+    y0 = ty * block_h
+    y1 = min(y0 + block_h, height)
+    starts = [min(tx * block_w, width) for tx in range(tile_size)]
+    bounds = [(x0, min(x0 + block_w, width)) for x0 in starts]
+
+    hists = [[0] * 256 for _ in range(tile_size)]
+    for b0, b1 in iter_bands(y0, y1, band_rows):
+        band = memoryview(source.read_rows(b0, b1))
+        for start in range(0, (b1 - b0) * width, width):
+            for hist, (x0, x1) in zip(hists, bounds):
+                count_bytes(band[start + x0:start + x1], hist)
+    return [tile_lut(clip_histogram(hist, clip_limit, redistribute_remainder)) for hist in hists]
+
+
+def clahe_equalization_strips(source, sink, tile_size=8, clip_limit=40, redistribute_remainder=False,
+                              band_rows=DEFAULT_BAND_ROWS):
+    """
+    分条 CLAHE，结果与 clahe_equalization 逐位一致
+    第 ty 行 tile 覆盖的像素行只用到 ty 与 ty + 1 两行 LUT：
+    处理到第 ty 行时先统计第 ty + 1 行的直方图，丢弃第 ty - 1 行，再逐行带插值输出
+    """
+    _check_planes(source, sink)
+    width, height = source.width, source.height
+    block_h, _ = tile_grid(height, width, tile_size)
+    last = tile_size - 1
+    params = (tile_size, clip_limit, redistribute_remainder, band_rows)
+
+    luts = [None] * tile_size
+    luts[0] = _tile_row_luts(source, 0, *params)
+    for ty in range(tile_size):
+        y0 = ty * block_h
+        y1 = min(y0 + block_h, height)
+        if y0 >= y1:
+            break
+        nxt = min(ty + 1, last)
+        if luts[nxt] is None:
+            luts[nxt] = _tile_row_luts(source, nxt, *params)
+        if ty > 0:
+            luts[ty - 1] = None  # 滑动窗口：之后的行不会再用到上一行 LUT
+
+        for b0, b1 in iter_bands(y0, y1, band_rows):
+            sink.write_rows(b0, interpolate_rows(source, luts, tile_size, b0, b1, band=source.read_rows(b0, b1)))
+    return sink
+
+
+# 增强方式 → 分条实现
+STRIP_METHODS = {
+    'equalize': histogram_equalization_strips,
+    'stretch': contrast_stretch_strips,
+    'gamma': gamma_correction_strips,
+    'clahe': clahe_equalization_strips,
+}
+
+
+def main(argv=None):
+    """命令行：对原始平面文件分条增强，例如
+    python -m enhancement.strips scan_y.raw scan_y_clahe.raw --size 60000 40000 -m clahe
+    """
+    from image_io.raw import RawPlane
+
+    parser = argparse.ArgumentParser(description='超大图像的分条增强（输入输出均为原始 8 位单通道平面）')
+    parser.add_argument('input', help='输入原始平面文件')
+    parser.add_argument('output', help='输出原始平面文件')
+    parser.add_argument('--size', type=int, nargs=2, metavar=('W', 'H'), required=True, help='平面宽高')
+    parser.add_argument('-m', '--mode', choices=sorted(STRIP_METHODS), default='clahe', help='增强方式')
+    parser.add_argument('--band-rows', type=int, default=DEFAULT_BAND_ROWS, help='每个行带的行数')
+    args = parser.parse_args(argv)
+
+    width, height = args.size
+    with RawPlane(args.input, width, height) as source, RawPlane.create(args.output, width, height) as sink:
+        STRIP_METHODS[args.mode](source, sink, band_rows=args.band_rows)
+        sink.flush()
+
+
+if __name__ == '__main__':
+    main()
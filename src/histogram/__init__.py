@@ -1,2 +1,4 @@
 # histogram 模块初始化
-from .histogram_utils import compute_histogram, render_histogram_image, compute_cdf, render_cdf_image
\ No newline at end of file
+from .histogram import Histogram, count_bytes
+from .histogram_utils import compute_histogram, render_histogram_image, compute_cdf, render_cdf_image
+from .render import render_histogram_into, render_cdf_into, render_comparison
\ No newline at end of file
@@ -0,0 +1,120 @@
+from bisect import bisect_left
+
+from image_io.buffer import ImageBuffer
+from utils.math_utils import compute_cdf
+
+
+def count_bytes(data, hist=None):
+    """
+    统计字节缓冲（bytes / bytearray / memoryview）中 0~255 各值的出现次数
+    hist 不为 None 时累加到该列表中（如逐行统计一个 tile），否则新建长度 256 的列表
+    说明：实测逐字节累加比 Counter 与 256 次 bytes.count 都快
+    """
+    if hist is None:
+        hist = [0] * 256
+    for val in data:
+        hist[val] += 1
+    return hist
+
+
+class Histogram:
+    """
+    灰度直方图：每个平面只统计一次，派生统计量（CDF、最值、均值、分位数）首次访问时计算并缓存
+    行为与长度 256 的频数列表一致（可索引、迭代、求 max），可直接传给渲染函数与各增强方法
+    """
+    __slots__ = ('counts', '_cdf', '_min', '_max', '_mean', '_percentiles')
+
+    def __init__(self, counts):
+        counts = list(counts)
+        if len(counts) != 256:
+            raise ValueError(f"直方图长度应为 256，实际为 {len(counts)}")
+        self.counts = counts
+        self._cdf = None
+        self._min = None
+        self._max = None
+        self._mean = None
+        self._percentiles = {}
+
+    @classmethod
+    def of(cls, y_channel):
+        """由单通道 ImageBuffer 或二维列表统计直方图；已是 Histogram 时原样返回"""
+        if isinstance(y_channel, Histogram):
+            return y_channel
+        if isinstance(y_channel, ImageBuffer):
+            return cls(count_bytes(y_channel.data))
+        hist = [0] * 256
+        for row in y_channel:
+            for val in row:
+                hist[max(0, min(255, int(val)))] += 1  # 修正越界值
+        return cls(hist)
+
+    def __repr__(self):
+        return f'Histogram(total={self.total})'
+
+    def __len__(self):
+        return 256
+
+    def __getitem__(self, index):
+        return self.counts[index]
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def __eq__(self, other):
+        if isinstance(other, Histogram):
+            return self.counts == other.counts
+        return self.counts == other
+
+    @property
+    def cdf(self):
+        """累计分布（整数列表，长度 256）"""
+        if self._cdf is None:
+            self._cdf = compute_cdf(self.counts)
+        return self._cdf
+
+    @property
+    def total(self):
+        """像素总数"""
+        return self.cdf[-1]
+
+    @property
+    def cdf_min(self):
+        """CDF 中第一个非零值（即最小灰度的频数），空直方图为 0"""
+        y_min = self.min
+        return self.cdf[y_min] if y_min is not None else 0
+
+    @property
+    def min(self):
+        """出现过的最小灰度，空直方图为 None"""
+        if self._min is None:
+            self._min = next((i for i in range(256) if self.counts[i]), None)
+        return self._min
+
+    @property
+    def max(self):
+        """出现过的最大灰度，空直方图为 None"""
+        if self._max is None:
+            self._max = next((i for i in range(255, -1, -1) if self.counts[i]), None)
+        return self._max
+
+    @property
+    def mean(self):
+        """平均灰度"""
+        if self._mean is None:
+            total = self.total
+            self._mean = sum(i * c for i, c in enumerate(self.counts)) / total if total else 0.0
+        return self._mean
+
+    def percentile(self, q):
+        """
+        第 q 百分位灰度（0 ≤ q ≤ 100）：累计频数首次达到 total * q / 100 的灰度
+        CDF 单调不减，在缓存的 CDF 上二分查找；结果按 q 缓存
+        """
+        if q in self._percentiles:
+            return self._percentiles[q]
+        if not 0 <= q <= 100:
+            raise ValueError(f"百分位应在 0~100 之间：{q}")
+        total = self.total
+        value = bisect_left(self.cdf, max(total * q / 100, 1)) if total else None
+        self._percentiles[q] = value
+        return value
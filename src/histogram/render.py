@@ -0,0 +1,83 @@
+# 直方图 / CDF 渲染：直接绘制到预分配的单通道字节缓冲
+# 增强前后两个面板画在同一块缓冲的左右两侧，不经过嵌套列表、拼接与伪 RGB 扩展
+from image_io.buffer import ImageBuffer
+from utils.metrics import timed
+from .histogram import Histogram
+
+# 面板宽度（每列对应一个灰度级）
+PANEL_WIDTH = 256
+
+# 左右面板之间的黑色间隔列数
+PANEL_GAP = 10
+
+# _BAR_TABLES[t]：把柱高 h 映射为 255（h ≥ t）或 0 的 translate 表，用于整行一次生成
+_BAR_TABLES = [bytes(255 if h >= t else 0 for h in range(256)) for t in range(256)]
+
+
+def render_histogram_into(image, hist, x0=0):
+    """
+    在单通道 ImageBuffer 的 [x0, x0 + 256) 列内绘制直方图（黑底白柱）
+    柱高按最大频数归一化到图像高度；逐行用 translate 一次生成整行像素
+    """
+    height, stride = image.height, image.stride
+    max_count = max(hist)
+    scale = height / max_count if max_count > 0 else 1
+    heights = [min(int(c * scale), height) for c in hist]
+
+    data = image.data
+    if height < len(_BAR_TABLES):
+        heights = bytes(heights)
+        for y in range(height):
+            start = y * stride + x0
+            # 第 y 行为白色的列：柱高 ≥ height - y
+            data[start:start + PANEL_WIDTH] = heights.translate(_BAR_TABLES[height - y])
+    else:
+        # 柱高超出单字节范围时逐行比较
+        for y in range(height):
+            start = y * stride + x0
+            t = height - y
+            data[start:start + PANEL_WIDTH] = bytes(255 if h >= t else 0 for h in heights)
+    return image
+
+
+def render_cdf_into(image, cdf, x0=0):
+    """
+    在单通道 ImageBuffer 的 [x0, x0 + 256) 列内绘制 CDF 曲线（黑底白线）
+    相邻两点之间用竖直线段连接；cdf 也可以直接传入 Histogram
+    """
+    if isinstance(cdf, Histogram):
+        cdf = cdf.cdf
+    height, stride = image.height, image.stride
+    total = cdf[-1]
+    scale = height / total if total > 0 else 1
+
+    data = image.data
+    prev_y = height - 1
+    for x in range(PANEL_WIDTH):
+        y_val = int(height - 1 - cdf[x] * scale)  # 倒着画
+        lo = max(min(prev_y, y_val), 0)
+        hi = min(max(prev_y, y_val), height - 1)
+        for y in range(lo, hi + 1):
+            data[y * stride + x0 + x] = 255
+        prev_y = y_val
+    return image
+
+
+@timed('render')
+def render_comparison(before, after, kind='hist', height=100, gap=PANEL_GAP):
+    """
+    增强前后对比图：左右两个面板，中间 gap 列黑色间隔，返回单通道 ImageBuffer
+    参数：
+        before, after: 直方图（Histogram 或频数列表）；kind 为 'cdf' 时也可传 CDF 列表
+        kind: 'hist' 绘制直方图，'cdf' 绘制累计分布曲线
+    """
+    if kind == 'hist':
+        draw = render_histogram_into
+    elif kind == 'cdf':
+        draw = render_cdf_into
+    else:
+        raise ValueError(f"未知渲染类型：{kind}")
+    image = ImageBuffer(PANEL_WIDTH * 2 + gap, height, 1)
+    draw(image, before, 0)
+    draw(image, after, PANEL_WIDTH + gap)
+    return image
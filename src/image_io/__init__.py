@@ -1,3 +1,10 @@
-from .io import load_image_rgb, save_image_rgb
-from .colorspace import rgb_to_ycrcb, y_to_rgb, ycbcr_merge
-from .resize import resize_image_rgb_nearest, resize_image_rgb_bilinear, resize_channel_yuv_nearest, resize_channel_yuv_bilinear
\ No newline at end of file
+from .buffer import ImageBuffer, to_buffer, restore_like
+from .io import load_image, save_image, load_image_ycbcr, save_image_ycbcr, load_image_rgb, save_image_rgb
+from .colorspace import rgb_to_ycrcb, y_to_rgb, ycbcr_merge, rgb_to_ycbcr_planes, ycbcr_merge_planes
+from .colorspace import chroma_offsets
+from .resize import RESIZE_MODES, axis_taps, resize_image
+from .resize import resize_image_rgb_nearest, resize_image_rgb_bilinear, resize_image_rgb_area
+from .resize import resize_channel_yuv_nearest, resize_channel_yuv_bilinear, resize_channel_yuv_area
+from .raw import RawPlane, export_raw_plane, import_raw_plane
+from .shards import TarShard, TarShardWriter, open_shard, list_shard_images, member_ref, split_member_ref
+from .y4m import Y4MReader, Y4MWriter
@@ -0,0 +1,158 @@
+from itertools import chain
+
+
+class ImageBuffer:
+    """
+    紧凑图像类型：用一段连续的 bytearray 存储 H×W×C 的 8 位像素
+    像素按行优先、通道交错排列（RGBRGB...），单通道即为灰度平面（Y/Cr/Cb）
+    属性：
+        width, height: 图像宽高
+        channels: 通道数（1 为单平面，3 为 RGB）
+        data: bytearray，长度为 width * height * channels
+    """
+    __slots__ = ('width', 'height', 'channels', 'data')
+
+    def __init__(self, width, height, channels=1, data=None):
+        size = width * height * channels
+        if data is None:
+            data = bytearray(size)
+        elif not isinstance(data, bytearray):
+            data = bytearray(data)
+        if len(data) != size:
+            raise ValueError(f"像素数据长度 {len(data)} 与尺寸 {width}x{height}x{channels} 不符")
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.data = data
+
+    def __reduce__(self):
+        # 零拷贝视图（wrap）不能直接序列化，传给子进程时复制为 bytearray
+        data = self.data if isinstance(self.data, bytearray) else bytearray(self.data)
+        return ImageBuffer, (self.width, self.height, self.channels, data)
+
+    def __repr__(self):
+        return f'ImageBuffer({self.width}x{self.height}x{self.channels})'
+
+    def __eq__(self, other):
+        if not isinstance(other, ImageBuffer):
+            return NotImplemented
+        return (self.width, self.height, self.channels) == (other.width, other.height, other.channels) \
+            and self.data == other.data
+
+    @classmethod
+    def wrap(cls, width, height, channels, buffer):
+        """
+        零拷贝包装外部缓冲（如 multiprocessing.shared_memory 的 buf）
+        data 为 memoryview：可读取像素，不可原地修改，也不能改变长度
+        """
+        buf = cls.__new__(cls)
+        buf.width, buf.height, buf.channels = width, height, channels
+        buf.data = memoryview(buffer)[:width * height * channels]
+        return buf
+
+    @property
+    def size(self):
+        """(宽, 高)，与 Pillow 的 Image.size 约定一致"""
+        return self.width, self.height
+
+    @property
+    def stride(self):
+        """每行字节数"""
+        return self.width * self.channels
+
+    @classmethod
+    def from_nested(cls, pixels):
+        """
+        由旧版嵌套列表构造：H×W（单通道）或 H×W×3（RGB）
+        """
+        height = len(pixels)
+        width = len(pixels[0]) if height else 0
+        first = pixels[0][0] if width else 0
+        if isinstance(first, (list, tuple)):
+            channels = len(first)
+            data = bytearray(chain.from_iterable(chain.from_iterable(pixels)))
+        else:
+            channels = 1
+            data = bytearray(chain.from_iterable(pixels))
+        return cls(width, height, channels, data)
+
+    def to_nested(self):
+        """
+        转换回旧版嵌套列表（兼容层）
+        单通道返回 H×W 列表，多通道返回 H×W×C 列表
+        """
+        d, c, stride = self.data, self.channels, self.stride
+        if c == 1:
+            return [list(d[i:i + stride]) for i in range(0, len(d), stride)]
+        return [
+            [list(d[i:i + c]) for i in range(start, start + stride, c)]
+            for start in range(0, len(d), stride)
+        ]
+
+    def row(self, y):
+        """返回第 y 行的零拷贝视图（memoryview）"""
+        stride = self.stride
+        return memoryview(self.data)[y * stride:(y + 1) * stride]
+
+    def rows(self):
+        """逐行生成零拷贝视图"""
+        view = memoryview(self.data)
+        stride = self.stride
+        for start in range(0, len(self.data), stride):
+            yield view[start:start + stride]
+
+    def read_rows(self, y0, y1):
+        """取出 [y0, y1) 行的像素字节（分条处理的数据源接口，与 RawPlane 一致）"""
+        stride = self.stride
+        return bytes(self.data[y0 * stride:y1 * stride])
+
+    def write_rows(self, y0, data):
+        """从第 y0 行开始写入若干整行像素（分条处理的输出接口，与 RawPlane 一致）"""
+        start = y0 * self.stride
+        self.data[start:start + len(data)] = data
+
+    def pixel(self, x, y):
+        """读取 (x, y) 处像素：单通道返回 int，多通道返回 tuple"""
+        c = self.channels
+        i = (y * self.width + x) * c
+        if c == 1:
+            return self.data[i]
+        return tuple(self.data[i:i + c])
+
+    def channel(self, index):
+        """抽取第 index 个通道为新的单通道平面"""
+        if self.channels == 1:
+            return self.copy()
+        return ImageBuffer(self.width, self.height, 1, self.data[index::self.channels])
+
+    def copy(self):
+        return ImageBuffer(self.width, self.height, self.channels, bytearray(self.data))
+
+    def apply_lut(self, lut):
+        """
+        对所有字节应用 256 项查找表（点运算），返回新的 ImageBuffer
+        使用 bytearray.translate，一次 C 级遍历完成
+        """
+        table = lut if isinstance(lut, (bytes, bytearray)) else bytes(lut)
+        data = self.data
+        if isinstance(data, memoryview):
+            data = data.tobytes()  # 零拷贝视图（wrap）没有 translate，先整块复制一次
+        return ImageBuffer(self.width, self.height, self.channels, data.translate(table))
+
+
+def to_buffer(pixels):
+    """
+    统一输入：ImageBuffer 原样返回，嵌套列表转换为 ImageBuffer
+    """
+    if isinstance(pixels, ImageBuffer):
+        return pixels
+    return ImageBuffer.from_nested(pixels)
+
+
+def restore_like(template, buf):
+    """
+    统一输出：若调用方传入的是嵌套列表，则把结果转换回嵌套列表，否则直接返回 ImageBuffer
+    """
+    if isinstance(template, ImageBuffer):
+        return buf
+    return buf.to_nested()
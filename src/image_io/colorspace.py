@@ -1,48 +1,179 @@
+from utils.metrics import timed
+from .buffer import ImageBuffer, to_buffer, restore_like
+
+
+@timed('colorspace')
 def rgb_to_ycrcb(pixels):
     """
     将 RGB 像素图像转换为 YCrCb 格式
     返回 Y 通道二维数组，Cr/Cb 可选
+    输入为 ImageBuffer 时返回单通道 ImageBuffer，输入为嵌套列表时返回二维列表
     """
-    height, width = len(pixels), len(pixels[0])
-    Y = [[0 for _ in range(width)] for _ in range(height)]
-    for y in range(height):
-        for x in range(width):
-            r, g, b = pixels[y][x]
-            Y[y][x] = round(0.299 * r + 0.587 * g + 0.114 * b)
-    return Y
+    buf = to_buffer(pixels)
+    d = buf.data
+    Y = bytearray(
+        round(0.299 * r + 0.587 * g + 0.114 * b)
+        for r, g, b in zip(d[0::3], d[1::3], d[2::3])
+    )
+    return restore_like(pixels, ImageBuffer(buf.width, buf.height, 1, Y))
 
 
 def y_to_rgb(y_channel):
     """
     将灰度图（Y 通道）转为伪 RGB 图像（三通道相同）
     """
-    return [[[v, v, v] for v in row] for row in y_channel]
+    buf = to_buffer(y_channel)
+    d = buf.data
+    rgb = bytearray(len(d) * 3)
+    rgb[0::3] = d
+    rgb[1::3] = d
+    rgb[2::3] = d
+    return restore_like(y_channel, ImageBuffer(buf.width, buf.height, 3, rgb))
 
+@timed('merge')
 def ycbcr_merge(y_channel, original_rgb):
     """
     将增强后的 Y 通道与原始 RGB 图像中的 CrCb 通道合并，重建彩色图像
     原理：用增强后的 Y 替换原图中的亮度，再从 YCrCb 转回 RGB
     """
-    height = len(y_channel)
-    width = len(y_channel[0])
-    merged = []
-
-    for i in range(height):
-        row = []
-        for j in range(width):
-            r, g, b = original_rgb[i][j]
-            # 原图 RGB → CrCb（近似转换）
-            Cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
-            Cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
-            Y = y_channel[i][j]
-
-            # YCrCb → RGB（反向变换）
-            R = Y + 1.402 * (Cr - 128)
-            G = Y - 0.344136 * (Cb - 128) - 0.714136 * (Cr - 128)
-            B = Y + 1.772 * (Cb - 128)
-
-            row.append([int(max(0, min(255, R))),
-                        int(max(0, min(255, G))),
-                        int(max(0, min(255, B)))])
-        merged.append(row)
-    return merged
\ No newline at end of file
+    y_buf = to_buffer(y_channel)
+    rgb = to_buffer(original_rgb)
+    d = rgb.data
+    merged = bytearray(len(d))
+
+    i = 0
+    for Y, r, g, b in zip(y_buf.data, d[0::3], d[1::3], d[2::3]):
+        # 原图 RGB → CrCb（近似转换）
+        Cr = 128 + 0.5 * r - 0.418688 * g - 0.081312 * b
+        Cb = 128 - 0.168736 * r - 0.331264 * g + 0.5 * b
+
+        # YCrCb → RGB（反向变换）
+        R = Y + 1.402 * (Cr - 128)
+        G = Y - 0.344136 * (Cb - 128) - 0.714136 * (Cr - 128)
+        B = Y + 1.772 * (Cb - 128)
+
+        merged[i] = int(max(0, min(255, R)))
+        merged[i + 1] = int(max(0, min(255, G)))
+        merged[i + 2] = int(max(0, min(255, B)))
+        i += 3
+
+    return restore_like(y_channel, ImageBuffer(y_buf.width, y_buf.height, 3, merged))
+
+
+# === 定点整数 YCbCr（JFIF / BT.601 全范围）===
+# 系数放大 2^16 后取整，运算全部为整数乘加与移位
+_SHIFT = 16
+_HALF = 1 << (_SHIFT - 1)
+
+# 反变换只依赖 Cb / Cr 的 256 种取值，预先算好每项的偏移量
+_R_CR = [(91881 * (c - 128) + _HALF) >> _SHIFT for c in range(256)]     # 1.402
+_G_CB = [-22554 * (c - 128) for c in range(256)]                         # 0.344136
+_G_CR = [-46802 * (c - 128) for c in range(256)]                         # 0.714136
+_B_CB = [(116130 * (c - 128) + _HALF) >> _SHIFT for c in range(256)]    # 1.772
+
+# 裁剪表：_CLIP[v + _CLIP_OFFSET] = clip(v, 0, 255)，覆盖反变换可能出现的全部取值
+_CLIP_OFFSET = 512
+_CLIP = bytes(max(0, min(255, v - _CLIP_OFFSET)) for v in range(1280))
+
+
+@timed('colorspace')
+def rgb_to_ycbcr_planes(pixels):
+    """
+    将 RGB 图像一次性拆分为 Y、Cb、Cr 三个单通道 ImageBuffer（定点整数系数）
+    多种增强方式共享同一组色度平面，只需拆分一次
+    注意：Y 与 rgb_to_ycrcb 的浮点结果可能相差 ±1
+    """
+    buf = to_buffer(pixels)
+    d = buf.data
+    rs, gs, bs = d[0::3], d[1::3], d[2::3]
+    clip = _CLIP
+    off = _CLIP_OFFSET + 128
+
+    Y = bytes((19595 * r + 38470 * g + 7471 * b + _HALF) >> _SHIFT for r, g, b in zip(rs, gs, bs))
+    Cb = bytes(clip[((-11059 * r - 21709 * g + 32768 * b + _HALF) >> _SHIFT) + off] for r, g, b in zip(rs, gs, bs))
+    Cr = bytes(clip[((32768 * r - 27439 * g - 5329 * b + _HALF) >> _SHIFT) + off] for r, g, b in zip(rs, gs, bs))
+
+    w, h = buf.width, buf.height
+    return ImageBuffer(w, h, 1, Y), ImageBuffer(w, h, 1, Cb), ImageBuffer(w, h, 1, Cr)
+
+
+# === 打包整数合并 ===
+# 每个像素占一个定长字段，整幅平面打包为一个大整数，加法、与、或都在 C 层一次完成
+# 反变换 R = clip(Y + r(Cr))、G = clip(Y + g(Cb, Cr))、B = clip(Y + b(Cb))：
+# 色度偏移量与 Y 无关，同一张图像的各增强方式共享（chroma_offsets 只算一次），每种方式只剩加 Y 与裁剪
+
+# 偏移量 + 256 存入 16 位字段；Y + 偏移 + 256 ∈ [29, 738]，高字节 0 / 1 / ≥2 分别对应 <0、正常、>255
+_BIAS = 256
+_R_LO = bytes((v + _BIAS) & 0xFF for v in _R_CR)
+_R_HI = bytes((v + _BIAS) >> 8 for v in _R_CR)
+_B_LO = bytes((v + _BIAS) & 0xFF for v in _B_CB)
+_B_HI = bytes((v + _BIAS) >> 8 for v in _B_CB)
+
+# G 的两项先在 32 位字段中相加再舍入移位（与逐像素的 (g_cb + g_cr + HALF) >> 16 一致）：
+# 每项加 2^30 保证为正，和右移 16 位后多出 2^15，再减去 2^15 - 256 即得偏移量 + 256
+_G_BIAS = 1 << 30
+_G_CB_BYTES = [bytes(((v + _G_BIAS) >> (8 * k)) & 0xFF for v in _G_CB) for k in range(4)]
+_G_CR_BYTES = [bytes(((v + _G_BIAS) >> (8 * k)) & 0xFF for v in _G_CR) for k in range(4)]
+_G_EXCESS = (2 * _G_BIAS >> _SHIFT) - _BIAS
+
+# 按高字节裁剪：结果 = (低字节 & _KEEP[高]) | _SATURATE[高]
+_KEEP = bytes([0, 0xFF] + [0] * 254)
+_SATURATE = bytes([0, 0] + [255] * 254)
+
+
+def _as_bytes(data):
+    """translate 需要 bytes / bytearray；零拷贝视图（如平面缓存）先取出字节"""
+    return data.tobytes() if isinstance(data, memoryview) else data
+
+
+def _pack_fields(parts, field_bytes, count):
+    """parts[k] 为各字段的第 k 个字节（小端），打包为一个大整数"""
+    buf = bytearray(field_bytes * count)
+    for k, part in enumerate(parts):
+        buf[k::field_bytes] = part
+    return int.from_bytes(buf, 'little')
+
+
+def _repeat_field(value, field_bytes, count):
+    return int.from_bytes(value.to_bytes(field_bytes, 'little') * count, 'little')
+
+
+def chroma_offsets(cb, cr):
+    """
+    由 Cb、Cr 平面计算 R / G / B 三个通道的色度偏移量（打包为 16 位字段的大整数）
+    与 Y 无关，同一张图像的所有增强结果共享；传给 ycbcr_merge_planes 的 offsets 参数
+    """
+    cbd, crd = _as_bytes(cb.data), _as_bytes(cr.data)
+    n = len(cbd)
+    r = _pack_fields([crd.translate(_R_LO), crd.translate(_R_HI)], 2, n)
+    b = _pack_fields([cbd.translate(_B_LO), cbd.translate(_B_HI)], 2, n)
+    g32 = (_pack_fields([cbd.translate(t) for t in _G_CB_BYTES], 4, n)
+           + _pack_fields([crd.translate(t) for t in _G_CR_BYTES], 4, n)
+           + _repeat_field(_HALF, 4, n)).to_bytes(4 * n, 'little')
+    g = _pack_fields([g32[2::4], g32[3::4]], 2, n) - _repeat_field(_G_EXCESS, 2, n)
+    return r, g, b
+
+
+@timed('merge')
+def ycbcr_merge_planes(y_channel, cb, cr, offsets=None):
+    """
+    用（增强后的）Y 平面与预先拆分好的 Cb、Cr 平面重建 RGB 图像
+    参数：
+        offsets: 可选，chroma_offsets(cb, cr) 的结果；多种增强方式合并同一组色度时只需计算一次
+    每个通道为一次大整数加法 + 按高字节查表裁剪，结果与逐像素定点公式逐位一致
+    返回 3 通道 ImageBuffer
+    """
+    y_buf = to_buffer(y_channel)
+    if offsets is None:
+        offsets = chroma_offsets(cb, cr)
+    n = len(y_buf.data)
+    y_packed = _pack_fields([y_buf.data], 2, n)
+
+    merged = bytearray(n * 3)
+    for k, offset in enumerate(offsets):
+        fields = (y_packed + offset).to_bytes(2 * n, 'little')
+        hi = fields[1::2]
+        value = (int.from_bytes(fields[0::2], 'little') & int.from_bytes(hi.translate(_KEEP), 'little')) \
+            | int.from_bytes(hi.translate(_SATURATE), 'little')
+        merged[k::3] = value.to_bytes(n, 'little')
+    return ImageBuffer(y_buf.width, y_buf.height, 3, merged)
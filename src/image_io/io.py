@@ -1,23 +1,93 @@
 from PIL import Image
 
-def load_image_rgb(path):
+from utils.metrics import timed
+from .buffer import ImageBuffer, to_buffer
+
+# ImageBuffer 通道数与 Pillow 模式之间的对应关系
+_MODES = {1: 'L', 3: 'RGB'}
+_CHANNELS = {'L': 1, 'RGB': 3}
+
+# 各格式的默认编码参数：PNG 主要用于直方图等黑白线条图，最快压缩级别已远小于 JPEG
+_SAVE_PARAMS = {'PNG': {'compress_level': 1}}
+
+
+def _to_pil(image, mode=None):
+    """将 ImageBuffer 直接交给 Pillow（Image.frombytes 按原始字节解释，不构造逐像素对象）"""
+    return Image.frombytes(mode or _MODES[image.channels], image.size, image.data)
+
+
+def _draft(img, mode, target_size):
     """
-    使用 Pillow 加载 JPEG 图像，返回 RGB 图像三维列表（H x W x 3）
+    已知缩放目标时启用 JPEG 缩小解码（Image.draft）：在 DCT 域按 1/2、1/4、1/8 缩小，
+    Pillow 会选取仍不小于 target_size 的最大缩小比例，之后再由 resize 缩放到精确尺寸
+    非 JPEG 图像不受影响
+    """
+    if target_size:
+        img.draft(mode, tuple(target_size))
+
+
+@timed('decode')
+def load_image(path, mode='RGB', target_size=None):
+    """
+    使用 Pillow 加载 JPEG 图像，返回 ImageBuffer（紧凑字节缓冲）
+    参数：
+        mode: 'RGB' 返回 3 通道图像，'L' 返回单通道灰度平面
+        target_size: 可选 (宽, 高)，之后要缩放到的尺寸；给出时启用缩小解码，
+                     返回的图像不小于该尺寸，但可能小于原图
+    解码结果通过 Image.tobytes 一次性取出，不再经过 getdata 的逐像素元组
     """
     with Image.open(path) as img:
-        img = img.convert('RGB')
+        _draft(img, mode, target_size)
+        img = img.convert(mode)
         w, h = img.size
-        data = list(img.getdata())
-        pixels = [[list(data[y * w + x]) for x in range(w)] for y in range(h)]
-        return pixels
+        return ImageBuffer(w, h, _CHANNELS[mode], img.tobytes())
+
+
+@timed('decode')
+def load_image_ycbcr(path, target_size=None):
+    """
+    加载图像并直接拆分为 Y、Cb、Cr 三个单通道 ImageBuffer
+    使用 Pillow 的 convert('YCbCr').split() 在 C 层完成色彩空间转换
+    target_size 含义同 load_image；JPEG 此时直接以 YCbCr 解码，省去色彩空间转换
+    注意：Pillow 使用 JPEG 定点系数，与 rgb_to_ycrcb 的浮点结果可能相差 ±1
+    """
+    with Image.open(path) as img:
+        _draft(img, 'YCbCr', target_size)
+        ycbcr = img if img.mode == 'YCbCr' else img.convert('RGB').convert('YCbCr')
+        w, h = ycbcr.size
+        return tuple(ImageBuffer(w, h, 1, band.tobytes()) for band in ycbcr.split())
+
+
+def load_image_rgb(path, target_size=None):
+    """
+    使用 Pillow 加载 JPEG 图像，返回 RGB 图像三维列表（H x W x 3）
+    兼容旧接口：内部经由 load_image 读取后转换为嵌套列表；target_size 含义同 load_image
+    """
+    return load_image(path, target_size=target_size).to_nested()
+
+
+@timed('encode')
+def save_image(image, path, format=None):
+    """
+    保存 ImageBuffer（1 通道按灰度 'L' 保存，3 通道按 'RGB' 保存）
+    format 为 None 时按扩展名决定：.png 无损保存为 PNG，其余保存为 JPEG
+    """
+    if format is None:
+        format = 'PNG' if path.lower().endswith('.png') else 'JPEG'
+    _to_pil(image).save(path, format=format, **_SAVE_PARAMS.get(format, {}))
+
+
+def save_image_ycbcr(y, cb, cr, path):
+    """
+    将 Y、Cb、Cr 三个平面合并后直接以 YCbCr 模式编码为 JPEG，省去回转 RGB 的一步
+    """
+    bands = [_to_pil(plane, 'L') for plane in (y, cb, cr)]
+    Image.merge('YCbCr', bands).save(path, format='JPEG')
 
 
 def save_image_rgb(pixels, path):
     """
     保存 RGB 图像（3 通道）为 JPEG
+    同时接受 H×W×3 嵌套列表与 ImageBuffer
     """
-    h, w = len(pixels), len(pixels[0])
-    flat = [tuple(pixels[y][x]) for y in range(h) for x in range(w)]
-    img = Image.new('RGB', (w, h))
-    img.putdata(flat)
-    img.save(path, format='JPEG')
+    save_image(to_buffer(pixels), path)
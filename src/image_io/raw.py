@@ -0,0 +1,102 @@
+# 磁盘上的原始 8 位平面（行优先、无文件头），通过 mmap 按行带读写
+# 用于超大图像（扫描件、十亿像素级拼接图）的分条处理：任何时刻只有当前行带在 Python 内存中
+import mmap
+import os
+
+from PIL import Image
+
+from .io import _draft
+
+
+class RawPlane:
+    """
+    内存映射的原始平面
+    属性：
+        width, height, channels: 尺寸与通道数（通道交错存储）
+    与 ImageBuffer 一样提供 read_rows / write_rows，可作为分条处理的数据源或输出
+    """
+
+    def __init__(self, path, width, height, channels=1, writable=False):
+        size = width * height * channels
+        actual = os.path.getsize(path)
+        if actual != size:
+            raise ValueError(f"原始平面文件大小 {actual} 与尺寸 {width}x{height}x{channels} 不符")
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self._file = open(path, 'r+b' if writable else 'rb')
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._file.fileno(), size, access=access) if size else None
+
+    @classmethod
+    def create(cls, path, width, height, channels=1):
+        """新建（或覆盖）指定尺寸的原始平面文件，以可写方式打开"""
+        with open(path, 'wb') as f:
+            f.truncate(width * height * channels)
+        return cls(path, width, height, channels, writable=True)
+
+    def __repr__(self):
+        return f'RawPlane({self.path!r}, {self.width}x{self.height}x{self.channels})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    @property
+    def stride(self):
+        return self.width * self.channels
+
+    def read_rows(self, y0, y1):
+        """取出 [y0, y1) 行的像素字节"""
+        stride = self.stride
+        return self._map[y0 * stride:y1 * stride]
+
+    def write_rows(self, y0, data):
+        """从第 y0 行开始写入若干整行像素"""
+        start = y0 * self.stride
+        self._map[start:start + len(data)] = data
+
+    def flush(self):
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+def export_raw_plane(image_path, raw_path, mode='L', band_rows=1024, target_size=None):
+    """
+    把图像文件转为原始平面文件（按行带裁剪后写出），返回 (宽, 高)
+    参数：
+        mode: 'L' 导出亮度平面，'RGB' 导出交错的三通道
+        target_size: 可选，启用 JPEG 缩小解码（见 load_image）
+    注意：压缩格式（JPEG / PNG）只能整幅解码，解码结果位于 Pillow 的 C 层内存中；
+    本函数只避免在 Python 层再复制整幅图像。真正超出内存的输入应直接以原始平面提供
+    """
+    with Image.open(image_path) as img:
+        _draft(img, mode, target_size)
+        width, height = img.size
+        channels = 1 if mode == 'L' else 3
+        with RawPlane.create(raw_path, width, height, channels) as plane:
+            for y0 in range(0, height, band_rows):
+                y1 = min(y0 + band_rows, height)
+                plane.write_rows(y0, img.crop((0, y0, width, y1)).convert(mode).tobytes())
+            plane.flush()
+    return width, height
+
+
+def import_raw_plane(raw_path, image_path, width, height, channels=1):
+    """把原始平面文件编码为普通图像文件（格式按扩展名决定），便于查看处理结果；Pillow 直接读取映射内存"""
+    mode = 'L' if channels == 1 else 'RGB'
+    with RawPlane(raw_path, width, height, channels) as plane:
+        Image.frombuffer(mode, (width, height), plane._map, 'raw', mode, 0, 1).save(image_path)
@@ -1,104 +1,249 @@
-def resize_image_rgb_nearest(pixels, target_size=(256, 256)):
-    """
-    使用最近邻插值手工实现图像缩放（适用于 RGB 图像）
-    输入：
-        pixels: 三维列表，尺寸 H×W×3
-        target_size: (新宽度, 新高度)，默认 (256, 256)
-    返回：
-        resized_pixels: 缩放后的三维列表，维度为 H'×W'×3
-    """
-    src_h, src_w = len(pixels), len(pixels[0])
-    dst_w, dst_h = target_size
+# 可分离缩放引擎：先竖直、后水平两遍一维重采样
+# 每个轴的「源索引 + 定点权重」表只依赖 (源长度, 目标长度, 方式)，按有界 LRU 缓存，
+# 同尺寸的图像（如 ImageNet 中大量 500×375）直接复用
+# 重采样在打包的大整数上完成：一行（或一列）所有像素放进等宽字段，与同一个标量权重相乘一次即可
+from functools import lru_cache
+from operator import itemgetter
 
-    resized = [[[0, 0, 0] for _ in range(dst_w)] for _ in range(dst_h)]
+from utils.metrics import timed
+from .buffer import ImageBuffer, to_buffer, restore_like
 
-    for y in range(dst_h):
-        for x in range(dst_w):
-            # 对应原图中最近的坐标
-            src_x = round(x * src_w / dst_w)
-            src_y = round(y * src_h / dst_h)
+# 支持的缩放方式
+RESIZE_MODES = ('nearest', 'bilinear', 'area')
 
-            # 保证索引合法
-            src_x = min(src_x, src_w - 1)
-            src_y = min(src_y, src_h - 1)
+# 定点权重精度：每个轴的权重之和为 2^12
+_WEIGHT_BITS = 12
+_ONE = 1 << _WEIGHT_BITS
 
-            resized[y][x] = pixels[src_y][src_x]
+# 竖直一遍的中间结果 ≤ 255 * 2^12 < 2^24，占 3 字节字段；
+# 水平一遍的结果 ≤ 255 * 2^24 + 2^23 < 2^32，占 5 字节字段，右移 24 位（第 4 个字节）即为像素值
+_MID_BYTES = 3
+_OUT_BYTES = 5
+_RESULT_BYTE = 2 * _WEIGHT_BITS // 8
+_HALF_FIELD = (1 << (2 * _WEIGHT_BITS - 1)).to_bytes(_OUT_BYTES, 'little')
 
-    return resized
 
-def resize_image_rgb_bilinear(pixels, target_size=(256, 256)):
+def _nearest_index(i, src, dst):
+    """最近邻源索引：round(i * src / dst)，并保证索引合法"""
+    return min(round(i * src / dst), src - 1)
+
+
+def _normalize(taps):
+    """把浮点权重量化为和恰为 2^12 的整数权重（误差并入最大的一项），丢弃零权重"""
+    weights = [round(w * _ONE) for _, w in taps]
+    weights[weights.index(max(weights))] += _ONE - sum(weights)
+    return tuple((s, w) for (s, _), w in zip(taps, weights) if w)
+
+
+@lru_cache(maxsize=64)
+def axis_taps(src, dst, mode):
     """
-    手工实现双线性插值图像缩放（适用于 RGB 图像）
-    输入：pixels 为 H×W×3 列表
-    输出：resize 后的 H'×W'×3 图像
+    单个轴的重采样表：第 i 个目标像素 = Σ 源像素[s] * w / 2^12，返回 ((s, w), ...) 的元组
+    参数：
+        src, dst: 源 / 目标长度
+        mode: 'nearest' | 'bilinear'（两端对齐，与原实现一致） | 'area'（按覆盖面积加权平均）
     """
-    src_h, src_w = len(pixels), len(pixels[0])
-    dst_w, dst_h = target_size
-    dst_pixels = [[[0, 0, 0] for _ in range(dst_w)] for _ in range(dst_h)]
+    if mode not in RESIZE_MODES:
+        raise ValueError(f"未知缩放方式：{mode}（可选：{', '.join(RESIZE_MODES)}）")
+    table = []
+    for i in range(dst):
+        if mode == 'nearest':
+            taps = ((_nearest_index(i, src, dst), 1.0),)
+        elif mode == 'bilinear':
+            g = i * (src - 1) / (dst - 1) if dst > 1 else 0.0
+            s0 = int(g)
+            s1 = min(s0 + 1, src - 1)
+            d = g - s0
+            taps = ((s0, 1 - d), (s1, d)) if s1 != s0 else ((s0, 1.0),)
+        else:
+            # 目标像素 i 覆盖源区间 [i * scale, (i + 1) * scale)，权重为各源像素被覆盖的长度占比
+            scale = src / dst
+            start, end = i * scale, (i + 1) * scale
+            s = int(start)
+            taps = []
+            while s < end and s < src:
+                overlap = min(end, s + 1) - max(start, s)
+                if overlap > 0:
+                    taps.append((s, overlap / scale))
+                s += 1
+        table.append(_normalize(taps))
+    return tuple(table)
+
+
+@lru_cache(maxsize=64)
+def _nearest_gather(src_w, dst_w, channels):
+    """最近邻的整行取值器：一次 itemgetter 调用取出目标行的全部字节"""
+    indices = [
+        _nearest_index(x, src_w, dst_w) * channels + k
+        for x in range(dst_w) for k in range(channels)
+    ]
+    return itemgetter(*indices) if len(indices) > 1 else (lambda row: (row[indices[0]],))
+
+
+def _resize_nearest(buf, dst_w, dst_h):
+    """
+    最近邻缩放：每个目标行由一次 itemgetter 从源行取出，相同源行的结果直接复用
+    结果与逐像素计算坐标的原实现逐位一致
+    """
+    src_w, src_h, c = buf.width, buf.height, buf.channels
+    stride = src_w * c
+    gather = _nearest_gather(src_w, dst_w, c)
+    src = buf.data
 
+    rows = {}
+    out = []
     for y in range(dst_h):
-        for x in range(dst_w):
-            gx = x * (src_w - 1) / (dst_w - 1)
-            gy = y * (src_h - 1) / (dst_h - 1)
+        sy = _nearest_index(y, src_h, dst_h)
+        row = rows.get(sy)
+        if row is None:
+            row = rows[sy] = bytes(gather(src[sy * stride:(sy + 1) * stride]))
+        out.append(row)
+    return ImageBuffer(dst_w, dst_h, c, b''.join(out))
+
 
-            x0, y0 = int(gx), int(gy)
-            x1, y1 = min(x0 + 1, src_w - 1), min(y0 + 1, src_h - 1)
-            dx, dy = gx - x0, gy - y0
+def _pack(data, field_bytes, count):
+    """把 count 个字节展开到 field_bytes 宽的字段中，打包为一个大整数（小端，第 0 个字节在最低位）"""
+    spread = bytearray(field_bytes * count)
+    spread[0::field_bytes] = data
+    return int.from_bytes(spread, 'little')
+
+
+def _resample(buf, dst_w, dst_h, mode):
+    """
+    通用可分离重采样（bilinear / area）
+    1) 竖直一遍：每个目标行 = Σ 打包源行 × 权重（整行共享同一权重，所有通道一起算）
+    2) 水平一遍：每个目标列（逐通道）= Σ 打包中间列 × 权重，中间列由步长切片直接取出
+    """
+    src_w, src_h, c = buf.width, buf.height, buf.channels
+    stride = src_w * c
+    x_taps = axis_taps(src_w, dst_w, mode)
+    y_taps = axis_taps(src_h, dst_h, mode)
+    src = buf.data
+
+    # === 1. 竖直一遍：中间结果按字节拆为 3 个平面（dst_h × stride），便于下一遍按列切片 ===
+    planes = [bytearray(dst_h * stride) for _ in range(_MID_BYTES)]
+    packed_rows = {}
+    for y, taps in enumerate(y_taps):
+        first = taps[0][0]
+        for s in [s for s in packed_rows if s < first]:
+            del packed_rows[s]  # 权重表单调，之前的源行不会再被用到
+        acc = 0
+        for s, w in taps:
+            row = packed_rows.get(s)
+            if row is None:
+                row = packed_rows[s] = _pack(src[s * stride:(s + 1) * stride], _MID_BYTES, stride)
+            acc += row * w
+        mid = acc.to_bytes(_MID_BYTES * stride, 'little')
+        for k in range(_MID_BYTES):
+            planes[k][y * stride:(y + 1) * stride] = mid[k::_MID_BYTES]
+
+    # === 2. 水平一遍：逐目标列、逐通道，结果按步长写回输出 ===
+    out_stride = dst_w * c
+    out = bytearray(out_stride * dst_h)
+    half = int.from_bytes(_HALF_FIELD * dst_h, 'little')
+    packed_cols = {}
+
+    def column(index):
+        col = packed_cols.get(index)
+        if col is None:
+            spread = bytearray(_OUT_BYTES * dst_h)
+            for k in range(_MID_BYTES):
+                spread[k::_OUT_BYTES] = planes[k][index::stride]
+            col = packed_cols[index] = int.from_bytes(spread, 'little')
+        return col
+
+    for x, taps in enumerate(x_taps):
+        first = taps[0][0] * c
+        for i in [i for i in packed_cols if i < first]:
+            del packed_cols[i]
+        for k in range(c):
+            acc = half
+            for s, w in taps:
+                acc += column(s * c + k) * w
+            out[x * c + k::out_stride] = acc.to_bytes(_OUT_BYTES * dst_h, 'little')[_RESULT_BYTE::_OUT_BYTES]
+
+    return ImageBuffer(dst_w, dst_h, c, out)
+
+
+def _resize_bilinear(buf, dst_w, dst_h):
+    """双线性缩放（两端对齐），与浮点逐像素实现相差不超过 ±1"""
+    return _resample(buf, dst_w, dst_h, 'bilinear')
+
+
+def _resize_area(buf, dst_w, dst_h):
+    """面积平均缩放：大比例缩小时比最近邻更平滑、无混叠"""
+    return _resample(buf, dst_w, dst_h, 'area')
+
+
+_RESIZERS = {
+    'nearest': _resize_nearest,
+    'bilinear': _resize_bilinear,
+    'area': _resize_area,
+}
+
+
+@timed('resize')
+def resize_image(image, target_size, mode='nearest'):
+    """
+    通用缩放入口，适用于任意通道数
+    参数：
+        image: ImageBuffer 或嵌套列表（H×W 或 H×W×C）
+        target_size: (新宽度, 新高度)
+        mode: 'nearest' | 'bilinear' | 'area'
+    返回：缩放后的图像，类型与输入一致
+    """
+    if mode not in _RESIZERS:
+        raise ValueError(f"未知缩放方式：{mode}（可选：{', '.join(RESIZE_MODES)}）")
+    dst_w, dst_h = target_size
+    return restore_like(image, _RESIZERS[mode](to_buffer(image), dst_w, dst_h))
 
-            for c in range(3):  # RGB 三通道
-                a = pixels[y0][x0][c]
-                b = pixels[y0][x1][c]
-                c_ = pixels[y1][x0][c]
-                d = pixels[y1][x1][c]
 
-                val = (1 - dx) * (1 - dy) * a + dx * (1 - dy) * b + \
-                      (1 - dx) * dy * c_ + dx * dy * d
+def resize_image_rgb_nearest(pixels, target_size=(256, 256)):
+    """
+    使用最近邻插值手工实现图像缩放（适用于 RGB 图像）
+    输入：
+        pixels: 三维列表，尺寸 H×W×3，或 3 通道 ImageBuffer
+        target_size: (新宽度, 新高度)，默认 (256, 256)
+    返回：
+        resized_pixels: 缩放后的图像，类型与输入一致
+    """
+    return resize_image(pixels, target_size, 'nearest')
 
-                dst_pixels[y][x][c] = int(round(max(0, min(255, val))))
+def resize_image_rgb_bilinear(pixels, target_size=(256, 256)):
+    """
+    手工实现双线性插值图像缩放（适用于 RGB 图像）
+    输入：pixels 为 H×W×3 列表或 3 通道 ImageBuffer
+    输出：resize 后的 H'×W'×3 图像，类型与输入一致
+    """
+    return resize_image(pixels, target_size, 'bilinear')
 
-    return dst_pixels
+def resize_image_rgb_area(pixels, target_size=(256, 256)):
+    """
+    面积平均缩放（适用于 RGB 图像，大比例缩小时推荐）
+    输入：pixels 为 H×W×3 列表或 3 通道 ImageBuffer，target_size 为 (新宽度, 新高度)
+    """
+    return resize_image(pixels, target_size, 'area')
 
 def resize_channel_yuv_nearest(channel, target_size):
     """
     最近邻插值：用于单通道（Y, Cr, Cb）图像
+    注意 target_size 为 (新高度, 新宽度)
     """
-    src_h, src_w = len(channel), len(channel[0])
     dst_h, dst_w = target_size
-    resized = [[0 for _ in range(dst_w)] for _ in range(dst_h)]
-
-    for y in range(dst_h):
-        for x in range(dst_w):
-            src_x = round(x * src_w / dst_w)
-            src_y = round(y * src_h / dst_h)
-            src_x = min(src_x, src_w - 1)
-            src_y = min(src_y, src_h - 1)
-            resized[y][x] = channel[src_y][src_x]
-
-    return resized
+    return resize_image(channel, (dst_w, dst_h), 'nearest')
 
 def resize_channel_yuv_bilinear(channel, target_size):
     """
     双线性插值：用于单通道（Y, Cr, Cb）图像
+    注意 target_size 为 (新高度, 新宽度)
     """
-    src_h, src_w = len(channel), len(channel[0])
     dst_h, dst_w = target_size
-    resized = [[0 for _ in range(dst_w)] for _ in range(dst_h)]
-
-    for y in range(dst_h):
-        for x in range(dst_w):
-            gx = x * (src_w - 1) / (dst_w - 1)
-            gy = y * (src_h - 1) / (dst_h - 1)
+    return resize_image(channel, (dst_w, dst_h), 'bilinear')
 
-            x0, y0 = int(gx), int(gy)
-            x1, y1 = min(x0 + 1, src_w - 1), min(y0 + 1, src_h - 1)
-            dx, dy = gx - x0, gy - y0
-
-            a = channel[y0][x0]
-            b = channel[y0][x1]
-            c = channel[y1][x0]
-            d = channel[y1][x1]
-
-            val = (1 - dx) * (1 - dy) * a + dx * (1 - dy) * b + (1 - dx) * dy * c + dx * dy * d
-            resized[y][x] = int(round(max(0, min(255, val))))
-
-    return resized
\ No newline at end of file
+def resize_channel_yuv_area(channel, target_size):
+    """
+    面积平均缩放：用于单通道（Y, Cr, Cb）图像
+    注意 target_size 为 (新高度, 新宽度)
+    """
+    dst_h, dst_w = target_size
+    return resize_image(channel, (dst_w, dst_h), 'area')
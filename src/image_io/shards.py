@@ -0,0 +1,258 @@
+# tar 分片数据集：不解压，直接按偏移量读取未压缩 .tar 中的成员文件
+# 首次打开时遍历一遍 tar 头（跳过数据区）建立 名称 → (数据偏移, 长度) 索引，保存为旁边的 <分片>.idx.json；
+# 之后随机访问只需一次 pread，顺序流式读取按偏移递增，避免解压出海量小文件带来的 inode 与小文件 I/O 开销
+# 分片成员在流水线中以 "<分片路径>::<成员名>" 的引用字符串表示，与普通文件路径一样传递
+import io
+import json
+import os
+import tarfile
+import threading
+
+# 成员引用的分隔符
+MEMBER_SEP = '::'
+
+# 索引文件格式版本
+INDEX_VERSION = 1
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png')
+
+# tar 数据区按 512 字节块对齐
+_BLOCK = tarfile.BLOCKSIZE
+
+
+def member_ref(shard_path, name):
+    """分片成员的引用字符串"""
+    return f'{shard_path}{MEMBER_SEP}{name}'
+
+
+def split_member_ref(path):
+    """引用字符串 → (分片路径, 成员名)；普通文件路径返回 (path, None)"""
+    shard, sep, name = path.partition(MEMBER_SEP)
+    if sep and shard.lower().endswith('.tar'):
+        return shard, name
+    return path, None
+
+
+def is_member_ref(path):
+    return split_member_ref(path)[1] is not None
+
+
+def _index_path(shard_path):
+    return shard_path + '.idx.json'
+
+
+class TarShard:
+    """
+    只读的 tar 分片
+    属性：
+        members: {成员名: (数据偏移, 长度)}，按在 tar 中的先后顺序
+    读取用 os.pread（不移动共享的文件位置），多线程与 fork 出的子进程可共用同一个句柄
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+        self._lock = threading.Lock()
+        try:
+            st = os.fstat(self._fd)
+            self._stat = (st.st_size, st.st_mtime_ns)
+            self.members = self._load_index()
+            if self.members is None:
+                self.members = self._build_index()
+                self._save_index()
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def __repr__(self):
+        return f'TarShard({self.path!r}, {len(self.members)} 个成员)'
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def mtime_ns(self):
+        return self._stat[1]
+
+    def _load_index(self):
+        """旁边的索引文件与分片的大小、修改时间都一致时才使用"""
+        try:
+            with open(_index_path(self.path), encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if payload.get('version') != INDEX_VERSION or [payload.get('size'), payload.get('mtime_ns')] != list(self._stat):
+            return None
+        return {name: (offset, size) for name, offset, size in payload['members']}
+
+    def _build_index(self):
+        """遍历 tar 头建立索引（tarfile 在可 seek 的文件上直接跳过数据区）"""
+        members = {}
+        try:
+            with tarfile.open(self.path, 'r:') as tar:
+                for info in tar:
+                    if info.isreg():
+                        members[info.name] = (info.offset_data, info.size)
+        except tarfile.ReadError as e:
+            raise ValueError(f"无法读取 tar 分片 {self.path}（只支持未压缩的 .tar）：{e}") from e
+        return members
+
+    def _save_index(self):
+        payload = {
+            'version': INDEX_VERSION, 'size': self._stat[0], 'mtime_ns': self._stat[1],
+            'members': [[name, offset, size] for name, (offset, size) in self.members.items()],
+        }
+        tmp = _index_path(self.path) + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, _index_path(self.path))
+        except OSError:
+            pass  # 分片所在目录只读时只在内存中使用索引
+
+    def names(self, exts=None):
+        """成员名列表（tar 中的顺序），exts 给出时只保留这些扩展名"""
+        if exts is None:
+            return list(self.members)
+        return [name for name in self.members if name.lower().endswith(exts)]
+
+    def size(self, name):
+        return self.members[name][1]
+
+    def read(self, name):
+        """随机读取一个成员的全部字节"""
+        try:
+            offset, size = self.members[name]
+        except KeyError:
+            raise KeyError(f"分片 {self.path} 中没有成员 {name}") from None
+        if hasattr(os, 'pread'):
+            data = os.pread(self._fd, size, offset)
+        else:
+            with self._lock:
+                os.lseek(self._fd, offset, os.SEEK_SET)
+                data = os.read(self._fd, size)
+        if len(data) != size:
+            raise ValueError(f"分片 {self.path} 的成员 {name} 数据不完整")
+        return data
+
+    def open(self, name):
+        """成员内容的只读文件对象（可直接交给 Image.open）"""
+        return io.BytesIO(self.read(name))
+
+    def iter_members(self, exts=IMAGE_EXTS):
+        """按偏移顺序流式产出 (成员名, 字节)"""
+        for name in self.names(exts):
+            yield name, self.read(name)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TarShardWriter:
+    """
+    写出 tar 分片（未压缩），可多线程并发调用 add
+    先写临时文件，close 时补上 tar 结尾并改名，同时写出偏移索引，之后 TarShard 打开时无需再遍历；
+    close(commit=False)（或 with 块内抛出异常）时删除临时文件，不产生不完整的分片
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp = path + '.tmp'
+        self._tar = tarfile.open(self._tmp, 'w', format=tarfile.GNU_FORMAT)
+        self._lock = threading.Lock()
+        self.members = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def add(self, name, data, mtime=None):
+        """追加一个成员；同名成员再次写入时以最后一次为准"""
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(mtime if mtime is not None else 0)
+        with self._lock:
+            self._tar.addfile(info, io.BytesIO(data))
+            # 数据区紧跟在头部之后，按块对齐；由写完后的位置倒推数据偏移
+            padded = -(-len(data) // _BLOCK) * _BLOCK
+            self.members[name] = (self._tar.offset - padded, len(data))
+
+    def close(self, commit=True):
+        """commit 为 True 时发布分片与索引，为 False 时放弃已写入的内容"""
+        if self._tar is None:
+            return
+        self._tar.close()
+        self._tar = None
+        if not commit:
+            os.remove(self._tmp)
+            return
+        os.replace(self._tmp, self.path)
+        st = os.stat(self.path)
+        payload = {
+            'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'members': [[name, offset, size] for name, (offset, size) in self.members.items()],
+        }
+        with open(_index_path(self.path), 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False)
+
+
+# 每个进程内按路径复用已打开的分片
+_OPEN_SHARDS = {}
+
+
+def open_shard(path):
+    shard = _OPEN_SHARDS.get(path)
+    if shard is None:
+        shard = _OPEN_SHARDS[path] = TarShard(path)
+    return shard
+
+
+def list_shard_images(source, exts=IMAGE_EXTS, max_files=None):
+    """
+    列出分片中的图像成员引用：source 为单个 .tar，或包含若干 .tar 的目录（按文件名排序，不递归）
+    """
+    if os.path.isdir(source):
+        shards = sorted(os.path.join(source, n) for n in os.listdir(source) if n.lower().endswith('.tar'))
+    else:
+        shards = [source]
+    refs = []
+    for shard_path in shards:
+        for name in open_shard(shard_path).names(exts):
+            if max_files is not None and len(refs) >= max_files:
+                return refs
+            refs.append(member_ref(shard_path, name))
+    return refs
+
+
+def open_source(path):
+    """图像来源：分片成员引用返回内存文件对象，普通路径原样返回（均可交给 Image.open）"""
+    shard, name = split_member_ref(path)
+    if name is None:
+        return path
+    return open_shard(shard).open(name)
+
+
+def source_stat(path):
+    """来源的 (大小, mtime_ns)；分片成员取成员长度与分片的修改时间"""
+    shard, name = split_member_ref(path)
+    if name is None:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    handle = open_shard(shard)
+    if name not in handle:
+        raise FileNotFoundError(f"分片 {shard} 中没有成员 {name}")
+    return handle.size(name), handle.mtime_ns
+
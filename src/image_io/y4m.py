@@ -0,0 +1,143 @@
+# YUV4MPEG2（.y4m）原始视频流的逐帧读写：文件头一行参数，之后每帧 "FRAME" 行 + Y、U、V 平面
+# 只支持 8 位采样；增强只作用于 Y 平面，色度平面按原始字节透传
+import os
+
+from .buffer import ImageBuffer
+
+MAGIC = b'YUV4MPEG2'
+FRAME_MAGIC = b'FRAME'
+
+# 文件头未给出色度格式时的默认值
+DEFAULT_CHROMA = '420jpeg'
+
+
+def chroma_size(chroma, width, height):
+    """一帧中 U、V 两个平面的总字节数；不支持的色度格式（高位深、带 alpha 等）抛出 ValueError"""
+    cw, ch = (width + 1) // 2, (height + 1) // 2
+    if chroma.startswith('420') and chroma[3:] in ('', 'jpeg', 'paldv', 'mpeg2'):
+        return 2 * cw * ch
+    if chroma == '422':
+        return 2 * cw * height
+    if chroma == '444':
+        return 2 * width * height
+    if chroma == 'mono':
+        return 0
+    raise ValueError(f"不支持的 Y4M 色度格式：{chroma}（仅支持 8 位 420 / 422 / 444 / mono）")
+
+
+def parse_header(line):
+    """解析文件头行，返回参数字典（键为单字母标记，如 'W'、'H'、'F'、'C'），值为字符串"""
+    fields = line.rstrip(b'\n').split(b' ')
+    if fields[0] != MAGIC:
+        raise ValueError("不是 YUV4MPEG2 文件")
+    params = {}
+    for field in fields[1:]:
+        if field:
+            tag = field[:1].decode('ascii')
+            params[tag] = field[1:].decode('ascii')
+    if 'W' not in params or 'H' not in params:
+        raise ValueError("Y4M 文件头缺少宽高（W / H）")
+    return params
+
+
+def format_header(params):
+    parts = [MAGIC.decode('ascii')] + [f'{tag}{value}' for tag, value in params.items()]
+    return (' '.join(parts) + '\n').encode('ascii')
+
+
+class Y4MReader:
+    """
+    逐帧读取 Y4M 流
+    属性：
+        width, height: 帧尺寸
+        chroma: 色度格式（如 '420jpeg'）
+        params: 文件头全部参数（写出同格式的流时原样传给 Y4MWriter）
+    迭代产出 (Y 平面 ImageBuffer, 色度字节)，每帧新分配缓冲，可以安全保留上一帧
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self.params = parse_header(self._file.readline())
+            self._data_start = self._file.tell()
+            self.width = int(self.params['W'])
+            self.height = int(self.params['H'])
+            self.chroma = self.params.get('C', DEFAULT_CHROMA)
+            self.chroma_bytes = chroma_size(self.chroma, self.width, self.height)
+        except Exception:
+            self._file.close()
+            raise
+
+    def __repr__(self):
+        return f'Y4MReader({self.path!r}, {self.width}x{self.height}, C{self.chroma})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def frame_count(self):
+        """按文件大小估算的帧数（假设各帧的 FRAME 行都不带参数）"""
+        frame = len(FRAME_MAGIC) + 1 + self.width * self.height + self.chroma_bytes
+        return (os.path.getsize(self.path) - self._data_start) // frame
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._file.readline()
+        if not line:
+            raise StopIteration
+        if not line.startswith(FRAME_MAGIC):
+            raise ValueError(f"Y4M 帧头损坏：{line[:16]!r}")
+        luma = bytearray(self.width * self.height)
+        chroma = bytearray(self.chroma_bytes)
+        if self._file.readinto(luma) != len(luma) or self._file.readinto(chroma) != len(chroma):
+            raise ValueError("Y4M 帧数据不完整")
+        return ImageBuffer(self.width, self.height, 1, luma), bytes(chroma)
+
+    def close(self):
+        self._file.close()
+
+
+class Y4MWriter:
+    """
+    逐帧写出 Y4M 流
+    参数：
+        params: 文件头参数字典，至少包含 'W'、'H'；通常直接使用 Y4MReader.params
+    """
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = dict(params)
+        self.width = int(self.params['W'])
+        self.height = int(self.params['H'])
+        self.chroma_bytes = chroma_size(self.params.get('C', DEFAULT_CHROMA), self.width, self.height)
+        self.frames = 0
+        self._file = open(path, 'wb')
+        self._file.write(format_header(self.params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, y, chroma=None):
+        """写出一帧；chroma 为 None 时色度平面填 128（灰色）"""
+        if (y.width, y.height) != (self.width, self.height):
+            raise ValueError(f"帧尺寸 {y.width}x{y.height} 与流尺寸 {self.width}x{self.height} 不符")
+        if chroma is None:
+            chroma = b'\x80' * self.chroma_bytes
+        elif len(chroma) != self.chroma_bytes:
+            raise ValueError(f"色度数据长度 {len(chroma)} 与格式要求的 {self.chroma_bytes} 不符")
+        self._file.write(FRAME_MAGIC + b'\n')
+        self._file.write(y.data)
+        self._file.write(chroma)
+        self.frames += 1
+
+    def close(self):
+        self._file.close()
@@ -1,74 +1,146 @@
+import argparse
 import os
-from utils.file_utils import list_image_files, ensure_dir
-from image_io import load_image_rgb, save_image_rgb, rgb_to_ycrcb, y_to_rgb, ycbcr_merge
-from image_io import resize_image_rgb_nearest, resize_image_rgb_bilinear, resize_channel_yuv_nearest, resize_channel_yuv_bilinear
-from histogram import compute_histogram, render_histogram_image, compute_cdf, render_cdf_image
-from enhancement import histogram_equalization, clahe_equalization, contrast_stretch, gamma_correction
-
-# 定义增强方法映射表
-ENHANCE_METHODS = {
-    'equalize': histogram_equalization,
-    'clahe': clahe_equalization,
-    'stretch': contrast_stretch,
-    'gamma': gamma_correction
-}
+
+from utils.file_utils import list_image_files, iter_image_files
+from utils import metrics
+from image_io import RESIZE_MODES, list_shard_images
+from pipeline import DEFAULT_MODES, AVAILABLE_MODES, Manifest, run_batch, StreamPipeline, build_plane_cache
+from data.image_size_analyzer import order_by_size
 
 INPUT_DIR = './data/extracted_images'
 OUTPUT_DIR = './data/processed_images'
-HIST_DIR = os.path.join(OUTPUT_DIR, 'histograms')
 RESIZE = (446, 446)
 
-ensure_dir(OUTPUT_DIR)
-ensure_dir(HIST_DIR)
 
-image_paths = list_image_files(INPUT_DIR)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='手工直方图增强：批量处理图像目录')
+    parser.add_argument('-i', '--input', default=INPUT_DIR, help='输入图像目录（递归遍历）')
+    parser.add_argument('-o', '--output', default=OUTPUT_DIR, help='输出目录')
+    parser.add_argument('--resize', type=int, nargs=2, metavar=('W', 'H'), default=RESIZE,
+                        help='统一缩放尺寸，默认 446 446')
+    parser.add_argument('--no-resize', action='store_true', help='保持原图尺寸')
+    parser.add_argument('--resize-mode', choices=RESIZE_MODES, default='nearest',
+                        help='缩放方式，大比例缩小时推荐 area（面积平均，无混叠）')
+    parser.add_argument('--no-draft', action='store_true',
+                        help='关闭 JPEG 缩小解码（默认在 DCT 域先缩小到不小于目标尺寸再精确缩放）')
+    parser.add_argument('-m', '--modes', nargs='+', choices=AVAILABLE_MODES, default=list(DEFAULT_MODES),
+                        help='增强方式列表（sliding 为滑动窗口 CLAHE，较慢，默认不执行）')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='进程数，默认取 CPU 核数')
+    parser.add_argument('--chunk-size', type=int, default=4, help='每次分发给子进程的图像数')
+    parser.add_argument('--clahe-workers', type=int, default=1,
+                        help='CLAHE 单图进程数（0 取 CPU 核数），只对不小于 1M 像素的图像生效（如 --no-resize）；'
+                             '批处理需配合 -j 1')
+    parser.add_argument('--max-files', type=int, default=None, help='最多处理的图像数（默认不限）')
+    parser.add_argument('--backend', default=None, help='计算后端（python / numpy），默认读取 ENHANCE_BACKEND')
+    parser.add_argument('--manifest', default=None,
+                        help='增量处理清单路径，默认 <输出目录>/manifest.jsonl')
+    parser.add_argument('--force', action='store_true', help='清空清单，全部重新处理')
+    parser.add_argument('--cache', default=None,
+                        help='预解码平面缓存文件：命中的图像跳过 JPEG 解码、缩放与色彩空间转换')
+    parser.add_argument('--ingest', action='store_true',
+                        help='只生成 --cache 指定的平面缓存（按当前缩放参数解码整个输入目录）后退出')
+    parser.add_argument('--metrics', action='store_true',
+                        help='记录各阶段耗时与计数，结束时写出 <输出目录>/metrics.json 与 metrics.prom')
+    parser.add_argument('--metrics-memory', action='store_true', help='同时用 tracemalloc 记录各阶段峰值内存（较慢）')
+    parser.add_argument('--metrics-traces', action='store_true', help='在 metrics.json 中附带单图轨迹')
+    parser.add_argument('--stream', action='store_true',
+                        help='流式流水线：边遍历边处理，解码 / 增强 / 写出并行重叠')
+    parser.add_argument('--decode-threads', type=int, default=2, help='流式模式下的解码线程数')
+    parser.add_argument('--write-threads', type=int, default=None,
+                        help='编码 / 写出线程数（后台写出，计算不等待磁盘），默认批处理 4、流式 2')
+    parser.add_argument('--max-inflight-mb', type=int, default=256,
+                        help='批处理时等待写出的像素数据上限（MiB），超过时暂停接收计算结果并停止分发新任务')
+    parser.add_argument('--queue-size', type=int, default=8, help='流式模式下各阶段队列容量（图像数）')
+    parser.add_argument('--group-by-size', action='store_true',
+                        help='按原图尺寸分组处理（只读文件头，结果缓存在尺寸索引中），同尺寸图像复用缩放表')
+    parser.add_argument('--size-index', default=None, help='尺寸索引路径，默认 <输出目录>/size_index.json')
+    parser.add_argument('--shards', action='store_true',
+                        help='输入为未压缩的 tar 分片（-i 指向单个 .tar 或含 .tar 的目录），不解压直接按偏移读取')
+    parser.add_argument('--output-shard', default=None,
+                        help='把全部输出写入这个 .tar 分片（仅批处理模式；不使用增量清单）')
+    return parser.parse_args(argv)
+
+
+def input_paths(args):
+    """输入图像列表：目录中的图像文件，或 --shards 时 tar 分片中的图像成员引用"""
+    if args.shards:
+        return list_shard_images(args.input, max_files=args.max_files)
+    return list_image_files(args.input, max_files=args.max_files)
 
-for path in image_paths:
-    name = os.path.splitext(os.path.basename(path))[0]
-    pixels = load_image_rgb(path)
-    pixels = resize_image_rgb_nearest(pixels, RESIZE)
-    y_channel = rgb_to_ycrcb(pixels)
 
-    for mode, func in ENHANCE_METHODS.items():
-        out_dir = os.path.join(OUTPUT_DIR, mode)
-        ensure_dir(out_dir)
-        hist_dir = os.path.join(HIST_DIR, mode)
-        ensure_dir(hist_dir)
+def ingest(args, resize):
+    """一次性预解码：把输入目录写入平面缓存，之后的增强运行以 --cache 读取"""
+    if not args.cache:
+        raise SystemExit('--ingest 需要同时指定 --cache')
+    image_paths = input_paths(args)
+    summary = build_plane_cache(image_paths, args.cache, resize=resize, resize_mode=args.resize_mode,
+                                draft=not args.no_draft, workers=args.workers, chunk_size=args.chunk_size)
+    print(f"📦 平面缓存 {args.cache}：{summary['succeeded']}/{summary['total']} 张，"
+          f"{summary['bytes'] / 2 ** 20:.1f} MiB，耗时 {summary['seconds']:.1f}s")
+    for path, error in summary['failed']:
+        print(f'   ❌ {os.path.relpath(path)}: {error}')
 
-        # 增强处理
-        if mode == 'gamma':
-            y_enhanced = func(y_channel, gamma=0.7)
+
+def main(argv=None):
+    args = parse_args(argv)
+    resize = None if args.no_resize else tuple(args.resize)
+    if args.ingest:
+        ingest(args, resize)
+        return
+    if args.metrics or args.metrics_memory or args.metrics_traces:
+        metrics.enable(memory=args.metrics_memory, traces=args.metrics_traces)
+    if args.output_shard and args.stream:
+        raise SystemExit('--output-shard 仅支持批处理模式')
+    manifest = None
+    if not args.output_shard:
+        manifest = Manifest(args.manifest or os.path.join(args.output, 'manifest.jsonl'), reset=args.force)
+
+    def report(path, name, error):
+        if error is None:
+            print(f'✅ 增强完成: {name}')
         else:
-            y_enhanced = func(y_channel)
-
-        # 直方图绘制
-        hist_ori = compute_histogram(y_channel)
-        cdf_ori = compute_cdf(hist_ori)
-        hist_eq = compute_histogram(y_enhanced)
-        cdf_eq = compute_cdf(hist_eq)
-
-        hist_img_ori = render_histogram_image(hist_ori)
-        hist_img_cdf_ori = render_cdf_image(cdf_ori)
-        hist_img_eq = render_histogram_image(hist_eq)
-        hist_img_cdf_eq = render_cdf_image(cdf_eq)
-
-        # 合并为 RGB 输出图像
-        enhanced_rgb = ycbcr_merge(y_enhanced, pixels)
-        save_image_rgb(enhanced_rgb, os.path.join(out_dir, f'{name}.jpg'))
-
-        # 保存直方图对比图像（灰度图合并或分别存）
-        hist_combined = [
-            hist_img_ori[i] + [0]*10 + hist_img_eq[i]
-            for i in range(len(hist_img_ori))
-        ]
-        hist_rgb = y_to_rgb(hist_combined)
-        save_image_rgb(hist_rgb, os.path.join(hist_dir, f'{name}_hist.jpg'))
-
-        hist_cdf_combined = [
-            hist_img_cdf_ori[i] + [0]*10 + hist_img_cdf_eq[i]
-            for i in range(len(hist_img_cdf_ori))
-        ]
-        hist_cdf_rgb = y_to_rgb(hist_cdf_combined)
-        save_image_rgb(hist_cdf_rgb, os.path.join(hist_dir, f'{name}_cdf.jpg'))
-
-        print(f'✅ {mode} 增强完成: {name}')
\ No newline at end of file
+            print(f'❌ 跳过损坏图像: {path}, 错误: {error}')
+
+    def ordered(paths):
+        # 分片成员保持 tar 中的顺序（顺序读取），只对目录输入按尺寸分组
+        if not args.group_by_size or args.shards:
+            return paths
+        return order_by_size(list(paths), args.size_index or os.path.join(args.output, 'size_index.json'))
+
+    if args.stream:
+        pipeline = StreamPipeline(args.output, resize=resize, modes=args.modes, backend=args.backend,
+                                  decode_threads=args.decode_threads, enhance_workers=args.workers or 1,
+                                  write_threads=args.write_threads or 2, queue_size=args.queue_size,
+                                  manifest=manifest, resize_mode=args.resize_mode, draft=not args.no_draft,
+                                  cache=args.cache, clahe_workers=args.clahe_workers or None)
+        source = input_paths(args) if args.shards else iter_image_files(args.input, max_files=args.max_files)
+        summary = pipeline.run(ordered(source), on_result=report)
+    else:
+        image_paths = ordered(input_paths(args))
+        summary = run_batch(image_paths, args.output, resize=resize, modes=args.modes, workers=args.workers,
+                            chunk_size=args.chunk_size, backend=args.backend, on_result=report,
+                            manifest=manifest, resize_mode=args.resize_mode, draft=not args.no_draft,
+                            cache=args.cache, write_threads=args.write_threads or 4,
+                            max_inflight_bytes=args.max_inflight_mb << 20, output_shard=args.output_shard,
+                            clahe_workers=args.clahe_workers or None)
+
+    print(f"\n📊 共 {summary['total']} 张，成功 {summary['succeeded']}，跳过 {summary['skipped']}，失败 {len(summary['failed'])}，"
+          f"耗时 {summary['seconds']:.1f}s，吞吐 {summary['images_per_sec']:.2f} 张/秒")
+    for path, error in summary['failed']:
+        print(f'   ❌ {os.path.relpath(path)}: {error}')
+    if metrics.is_enabled():
+        report_metrics(args.output)
+
+
+def report_metrics(output_dir):
+    """打印各阶段耗时占比，并写出 JSON 汇总与 Prometheus 文本文件"""
+    summary = metrics.METRICS.summary()
+    print('\n⏱  各阶段耗时：')
+    for name, s in summary['stages'].items():
+        print(f"   {name:<18} {s['total_s']:>8.2f}s  {s['share']:>6.1%}  ×{s['count']}")
+    metrics.METRICS.write_json(os.path.join(output_dir, 'metrics.json'))
+    metrics.METRICS.write_prometheus(os.path.join(output_dir, 'metrics.prom'))
+
+
+if __name__ == '__main__':
+    main()
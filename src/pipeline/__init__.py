@@ -0,0 +1,9 @@
+# pipeline 模块：批量处理驱动（多进程分发、错误隔离、吞吐统计、增量清单、预解码缓存）
+from .batch import DEFAULT_MODES, AVAILABLE_MODES, MODE_PARAMS, enhance_methods, prepare_output_dirs
+from .batch import decode_image, enhance_image, write_outputs, process_image, run_batch
+from .batch import mode_signatures, output_paths, plan_images
+from .manifest import Manifest, file_digest, mode_signature
+from .stream import StageQueue, StreamPipeline, run_stream
+
+from .plane_cache import PlaneCache, build_plane_cache, open_plane_cache
+from .writer import OutputWriter
@@ -0,0 +1,330 @@
+import os
+import threading
+import time
+from functools import partial
+from multiprocessing import Pool
+
+from utils.file_utils import ensure_dir
+from utils import metrics
+from image_io import load_image, save_image, rgb_to_ycbcr_planes, ycbcr_merge_planes, chroma_offsets
+from image_io import resize_image
+from image_io.shards import open_source, TarShardWriter
+from histogram import render_comparison
+from enhancement import enhance_all
+from backend import get_backend
+from .manifest import Manifest, mode_signature
+from .plane_cache import open_plane_cache
+from .writer import OutputWriter, DEFAULT_MAX_INFLIGHT_BYTES
+
+# 默认执行的增强方式（同时决定输出子目录）
+DEFAULT_MODES = ('equalize', 'clahe', 'stretch', 'gamma')
+
+# 全部可选的增强方式：滑动窗口 CLAHE（无块效应，但单张耗时约为分块 CLAHE 的十倍）需用 -m 显式选择
+AVAILABLE_MODES = DEFAULT_MODES + ('sliding',)
+
+# 各增强方式的附加参数
+MODE_PARAMS = {
+    'gamma': {'gamma': 0.7},
+    'sliding': {'radius': 32, 'clip_limit': 40},
+}
+
+# 每个子进程最多预先分发的任务块数：保证子进程不空等，同时限制堆积在主进程中的计算结果
+DISPATCH_AHEAD = 2
+
+# 直方图 / CDF 对比图的扩展名：黑白线条图用无损单通道 PNG，避免 JPEG 振铃且体积更小
+HIST_EXT = '.png'
+
+
+def enhance_methods(backend=None):
+    """
+    增强方法映射表（经由后端注册表分发）
+    参数：backend 为后端名称，None 时读取环境变量 ENHANCE_BACKEND
+    """
+    be = get_backend(backend)
+    return {
+        'equalize': be.histogram_equalization,
+        'clahe': be.clahe_equalization,
+        'stretch': be.contrast_stretch,
+        'gamma': be.gamma_correction,
+        'sliding': be.sliding_equalization,
+    }
+
+
+def mode_signatures(modes, resize=(446, 446), resize_mode='nearest', draft=True):
+    """各增强方式的参数签名（以参考后端的函数默认值为准，各后端结果一致）"""
+    methods = enhance_methods('python')
+    return {mode: mode_signature(mode, methods[mode], MODE_PARAMS.get(mode, {}), resize, resize_mode, draft)
+            for mode in modes}
+
+
+def output_paths(name, mode):
+    """单张图像在某增强方式下的输出相对路径：(增强图, 直方图对比, CDF 对比)"""
+    return (
+        os.path.join(mode, f'{name}.jpg'),
+        os.path.join('histograms', mode, f'{name}_hist{HIST_EXT}'),
+        os.path.join('histograms', mode, f'{name}_cdf{HIST_EXT}'),
+    )
+
+
+def plan_images(paths, output_dir, resize=(446, 446), modes=DEFAULT_MODES, manifest=None, on_skip=None,
+                resize_mode='nearest', draft=True):
+    """
+    增量计划：逐个产出 (path, 待处理的增强方式, 内容哈希)
+    清单中内容哈希与参数签名均未变化、且输出文件仍在的增强方式会被跳过；
+    全部跳过的图像不产出，改为调用 on_skip(path)
+    manifest 为 None 时每张图像都处理全部增强方式
+    """
+    modes = tuple(modes)
+    if manifest is None:
+        for path in paths:
+            yield path, modes, None
+        return
+    signatures = mode_signatures(modes, resize, resize_mode, draft)
+    for path in paths:
+        try:
+            digest = manifest.digest(path)
+        except OSError:
+            yield path, modes, None  # 交给解码阶段报告错误
+            continue
+        name = os.path.splitext(os.path.basename(path))[0]
+        pending = tuple(
+            mode for mode in modes
+            if not manifest.is_done(path, digest, mode, signatures[mode])
+            or not all(os.path.exists(os.path.join(output_dir, p)) for p in output_paths(name, mode))
+        )
+        if pending:
+            yield path, pending, digest
+        elif on_skip is not None:
+            on_skip(path)
+
+
+def prepare_output_dirs(output_dir, modes):
+    """一次性创建所有输出目录：<output>/<mode>/ 与 <output>/histograms/<mode>/"""
+    for mode in modes:
+        ensure_dir(os.path.join(output_dir, mode))
+        ensure_dir(os.path.join(output_dir, 'histograms', mode))
+
+
+def decode_image(path, resize=(446, 446), resize_mode='nearest', draft=True, cache=None):
+    """
+    解码阶段：读取 → 缩放 → 一次拆分出 Y / Cb / Cr（各增强方式共享同一组色度平面）
+    参数：
+        resize_mode: 'nearest' | 'bilinear' | 'area'（大比例缩小时推荐 area）
+        draft: 为 True 时 JPEG 先在 DCT 域缩小解码（见 load_image 的 target_size），再精确缩放
+        cache: 预解码平面缓存（PlaneCache 或缓存文件路径），命中时直接返回映射中的平面，未命中再解码
+    path 也可以是 tar 分片成员引用 "<分片>::<成员名>"（见 image_io.shards），直接从分片中读取
+    返回：(图像名, Y, Cb, Cr)
+    """
+    if cache is not None:
+        cached = open_plane_cache(cache).get(path)
+        if cached is not None:
+            metrics.count('cache.hits')
+            return cached
+    name = os.path.splitext(os.path.basename(path))[0]
+    pixels = load_image(open_source(path), target_size=resize if draft else None)
+    metrics.count('pixels.decoded', pixels.width * pixels.height)
+    if resize:
+        pixels = resize_image(pixels, resize, resize_mode)
+    y_channel, cb, cr = rgb_to_ycbcr_planes(pixels)
+    metrics.count('images.decoded')
+    return name, y_channel, cb, cr
+
+
+def run_params(clahe_workers=1):
+    """本次运行的增强参数：MODE_PARAMS 加上 CLAHE 的进程数（只影响执行方式，不计入清单签名）"""
+    if clahe_workers == 1:
+        return MODE_PARAMS
+    return {**MODE_PARAMS, 'clahe': {**MODE_PARAMS.get('clahe', {}), 'workers': clahe_workers}}
+
+
+def enhance_image(name, y_channel, cb, cr, modes=DEFAULT_MODES, backend=None, clahe_workers=1):
+    """
+    计算阶段：一次扇出执行全部增强方式（共享直方图等中间结果，见 enhance_all）、
+    绘制直方图对比图、合并回 RGB（色度偏移量只算一次）
+    clahe_workers: CLAHE 单图进程数，> 1 时大图（≥ PARALLEL_MIN_PIXELS）走多进程 CLAHE，见 clahe_equalization
+    返回：[(相对输出路径, ImageBuffer)]，由写出阶段编码保存
+    """
+    hist_ori, results = enhance_all(y_channel, modes, run_params(clahe_workers), backend=backend)
+    with metrics.stage('merge'):
+        offsets = chroma_offsets(cb, cr)
+
+    outputs = []
+    for mode in modes:
+        y_enhanced, hist_eq = results[mode]
+        image_path, hist_path, cdf_path = output_paths(name, mode)
+
+        # 合并为 RGB 输出图像
+        outputs.append((image_path, ycbcr_merge_planes(y_enhanced, cb, cr, offsets)))
+
+        # 直方图 / CDF 对比图像（增强前后左右两个面板，单通道）
+        outputs.append((hist_path, render_comparison(hist_ori, hist_eq, 'hist')))
+        outputs.append((cdf_path, render_comparison(hist_ori, hist_eq, 'cdf')))
+
+    metrics.count('images.enhanced')
+    metrics.count('pixels.enhanced', y_channel.width * y_channel.height * len(modes))
+    return outputs
+
+
+def write_outputs(outputs, output_dir):
+    """写出阶段：把 enhance_image 的结果编码为 JPEG 保存到 output_dir 下"""
+    for rel_path, image in outputs:
+        save_image(image, os.path.join(output_dir, rel_path))
+    metrics.count('files.written', len(outputs))
+
+
+def process_image(path, output_dir, resize=(446, 446), modes=DEFAULT_MODES, backend=None,
+                  resize_mode='nearest', draft=True, cache=None, clahe_workers=1):
+    """
+    处理单张图像：解码 → 增强 → 写出
+    输出目录需事先由 prepare_output_dirs 创建
+    返回：图像名（不含扩展名）
+    """
+    with metrics.trace(path):
+        name, y_channel, cb, cr = decode_image(path, resize, resize_mode, draft, cache)
+        write_outputs(enhance_image(name, y_channel, cb, cr, modes, backend, clahe_workers), output_dir)
+    return name
+
+
+def _compute_safe(job, metrics_config=None, resize=(446, 446), backend=None, resize_mode='nearest', draft=True,
+                  cache=None, clahe_workers=1):
+    """
+    计算任务（可在子进程中执行）：解码 + 增强，输出交回主进程的写出服务，子进程不等待磁盘
+    错误隔离：单张图像失败（如损坏的 JPEG）只记录错误，不影响其余图像
+    开启计时时，附带本次新采集的阶段数据（子进程 → 主进程汇总）
+    """
+    if metrics_config is not None and metrics_config != metrics.METRICS.config():
+        metrics.METRICS.configure(**metrics_config)
+    path, modes, digest = job
+    try:
+        with metrics.trace(path):
+            name, y_channel, cb, cr = decode_image(path, resize, resize_mode, draft, cache)
+            outputs = enhance_image(name, y_channel, cb, cr, modes, backend, clahe_workers)
+        result = path, name, outputs, None, modes, digest
+    except Exception as e:
+        result = path, None, None, f'{type(e).__name__}: {e}', modes, digest
+    return result + (metrics.METRICS.drain() if metrics.is_enabled() else None,)
+
+
+def run_batch(paths, output_dir, resize=(446, 446), modes=DEFAULT_MODES, workers=None,
+              chunk_size=4, backend=None, on_result=None, manifest=None,
+              resize_mode='nearest', draft=True, cache=None, write_threads=4,
+              max_inflight_bytes=DEFAULT_MAX_INFLIGHT_BYTES, output_shard=None, clahe_workers=1):
+    """
+    多进程批量处理：子进程解码 + 增强，主进程的写出服务（OutputWriter）在后台线程中编码写盘
+    参数：
+        paths: 图像路径列表，按给出的顺序分发（调用方可先按尺寸分组，见 data.image_size_analyzer.order_by_size）
+        workers: 进程数，默认取 CPU 核数；为 1 时在当前进程内顺序计算（写出仍在后台线程）
+        chunk_size: 每次分发给子进程的图像数
+        on_result: 可选回调 on_result(path, name, error)，每张图像的输出全部写完后调用一次（完成顺序，串行调用）
+        manifest: 增量处理清单（Manifest 对象或清单文件路径），None 时全部重新处理；只登记已写完的图像
+        resize_mode, draft: 缩放方式与是否缩小解码，见 decode_image
+        cache: 预解码平面缓存文件路径（见 build_plane_cache），生成参数须与本次运行一致
+        write_threads: 编码 / 写出线程数
+        max_inflight_bytes: 等待写出的像素字节上限，超过时暂停接收计算结果；
+                            已分发但结果尚未交给写出服务的图像同时不超过 DISPATCH_AHEAD * workers * chunk_size 张，
+                            主进程内存 ≈ 该上限 + 这些图像的输出，与运行的图像总数无关
+        output_shard: 可选 .tar 路径，给出时全部输出写入这一个 tar 分片（成员名即相对输出路径），
+                      不在 output_dir 下生成小文件；此时不支持增量清单
+        clahe_workers: CLAHE 单图进程数，只在 workers 为 1 时生效（进程池子进程内不能再建进程）；
+                       适合 --no-resize 处理大图，见 enhance_image
+    返回：统计字典 {total, succeeded, skipped, failed: [(path, error)], seconds, images_per_sec}
+    说明：每张图像的输出路径只由文件名决定，结果与进程调度顺序无关；失败列表按路径排序
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    if output_shard is not None and manifest is not None:
+        raise ValueError("写出到 tar 分片时不支持增量清单（每次运行生成完整的新分片）")
+    if isinstance(manifest, str):
+        manifest = Manifest(manifest)
+    if cache is not None:
+        open_plane_cache(cache).check(resize, resize_mode, draft)
+    if output_shard is None:
+        prepare_output_dirs(output_dir, modes)
+    jobs = list(plan_images(paths, output_dir, resize, modes, manifest, resize_mode=resize_mode, draft=draft))
+    signatures = mode_signatures(modes, resize, resize_mode, draft) if manifest is not None else None
+    task = partial(_compute_safe, resize=resize, backend=backend, resize_mode=resize_mode, draft=draft,
+                   cache=cache, clahe_workers=clahe_workers, metrics_config=metrics.METRICS.config())
+
+    succeeded = 0
+    failed = []
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def finish(path, name, error, done_modes, digest):
+        nonlocal succeeded
+        # 写出线程与主线程都会调用，统计、清单与回调在锁内串行
+        with lock:
+            if error is None:
+                succeeded += 1
+                if manifest is not None and digest is not None:
+                    manifest.record(path, digest, done_modes, signatures)
+            else:
+                failed.append((path, error))
+                metrics.count('images.failed')
+            if on_result is not None:
+                on_result(path, name, error)
+
+    def collect(results, writer, slots=None):
+        for path, name, outputs, error, done_modes, digest, stage_data in results:
+            metrics.METRICS.merge(stage_data)
+            if error is not None:
+                finish(path, name, error, done_modes, digest)
+            else:
+                # 写出服务超过在途上限时在这里阻塞，分发随之停止
+                writer.submit(path, outputs, partial(_on_written, finish, name, done_modes, digest))
+            if slots is not None:
+                slots.release()
+
+    shard = TarShardWriter(output_shard) if output_shard is not None else None
+    committed = False
+    try:
+        with OutputWriter(output_dir, write_threads, max_inflight_bytes, shard=shard) as writer:
+            if workers == 1:
+                collect(map(task, jobs), writer)
+            elif jobs:
+                processes = min(workers, len(jobs))
+                chunk_size = max(1, chunk_size)
+                slots = threading.Semaphore(DISPATCH_AHEAD * processes * chunk_size)
+                stop = threading.Event()
+                with Pool(processes=processes) as pool:
+                    try:
+                        collect(pool.imap_unordered(task, _gated(jobs, slots, stop), chunksize=chunk_size),
+                                writer, slots)
+                    finally:
+                        # 异常退出时唤醒可能在等待名额的分发线程，否则 Pool 退出时会等它而卡住
+                        stop.set()
+                        slots.release()
+        committed = True
+    finally:
+        # 只有全部图像处理完才发布分片；异常或中断时丢弃临时文件，不留下看似完整的残缺分片
+        if shard is not None:
+            shard.close(commit=committed)
+
+    if manifest is not None:
+        manifest.compact()
+    seconds = time.perf_counter() - start
+    return {
+        'total': len(paths),
+        'succeeded': succeeded,
+        'skipped': len(paths) - len(jobs),
+        'failed': sorted(failed),
+        'seconds': seconds,
+        'images_per_sec': len(jobs) / seconds if seconds > 0 else 0.0,
+    }
+
+
+def _gated(jobs, slots, stop):
+    """
+    按名额分发任务：imap_unordered 的分发线程会尽快读完任务迭代器，结果处理线程也会不停接收子进程的结果，
+    不加限制时写盘一慢，主进程中堆积的结果就随运行长度增长；每取一个任务占一个名额，结果交给写出服务后归还
+    """
+    for job in jobs:
+        slots.acquire()
+        if stop.is_set():
+            return
+        yield job
+
+
+def _on_written(finish, name, modes, digest, path, error):
+    """写出服务的完成回调：一张图像的全部输出写完（或首个写出错误）"""
+    finish(path, name, error, modes, digest)
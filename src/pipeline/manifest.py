@@ -0,0 +1,137 @@
+# 增量处理清单（manifest）：追加写入的 JSONL 文件
+# 每条记录保存「输入内容哈希 + 增强方式 + 参数签名」，重跑时只处理新增 / 内容变化的图像，
+# 以及参数发生变化的增强方式；中断的运行从最后一条完整记录处继续
+import hashlib
+import inspect
+import json
+import os
+import threading
+
+from utils.file_utils import ensure_dir
+from image_io.shards import split_member_ref, open_shard, source_stat
+
+# 输出格式变化（如渲染方式调整）时递增，使旧记录全部失效
+MANIFEST_VERSION = 2
+
+# 增强函数中传递共享数据（而非参数）或只影响执行方式（不影响结果）的可选形参，不计入签名
+_UNSIGNED_PARAMS = ('hist', 'tile_hists', 'workers')
+
+# 哈希时每次读取的字节数
+_HASH_CHUNK = 1 << 20
+
+
+def file_digest(path):
+    """输入文件内容的 SHA-1（十六进制）；tar 分片成员（见 image_io.shards）按成员内容计算"""
+    h = hashlib.sha1()
+    shard, name = split_member_ref(path)
+    if name is not None:
+        h.update(open_shard(shard).read(name))
+        return h.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def mode_signature(mode, method, params, resize, resize_mode='nearest', draft=False):
+    """
+    增强方式的参数签名：函数默认参数 + 调用时覆盖的参数 + 缩放尺寸与方式 + 清单版本
+    修改 MODE_PARAMS 或函数默认值（如 clip_limit）都会改变签名
+    """
+    merged = {
+        name: p.default
+        for name, p in inspect.signature(method).parameters.items()
+        if p.default is not inspect.Parameter.empty and name not in _UNSIGNED_PARAMS
+    }
+    merged.update((name, value) for name, value in params.items() if name not in _UNSIGNED_PARAMS)
+    return json.dumps({
+        'mode': mode,
+        'params': merged,
+        'resize': list(resize) if resize else None,
+        'resize_mode': resize_mode if resize else None,
+        'draft': bool(draft and resize),
+        'version': MANIFEST_VERSION,
+    }, sort_keys=True)
+
+
+class Manifest:
+    """
+    增量处理清单
+    记录格式（每行一个 JSON）：
+        {"path", "mode", "digest", "signature", "size", "mtime_ns"}
+    同一 (path, mode) 的多条记录以最后一条为准：只有内容哈希与参数签名都与最新记录一致时才视为已完成，
+    因此文件改回旧内容时也会重新处理（输出早已被新内容覆盖）
+    size / mtime_ns 用于跳过未改动文件的重复哈希
+    """
+
+    def __init__(self, path, reset=False):
+        """reset 为 True 时清空已有清单（强制全部重新处理）"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = {}      # (path, mode) -> 记录字典
+        self._stat = {}         # path -> (size, mtime_ns, digest)
+        self._lines = 0
+        ensure_dir(os.path.dirname(os.path.abspath(path)))
+        if reset and os.path.exists(path):
+            os.remove(path)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # 中断时可能留下不完整的末行，直接忽略
+                self._lines += 1
+                self._records[(rec['path'], rec['mode'])] = rec
+                self._stat[rec['path']] = (rec['size'], rec['mtime_ns'], rec['digest'])
+
+    def __len__(self):
+        return len(self._records)
+
+    def digest(self, path):
+        """输入文件的内容哈希；大小与修改时间均未变化时直接复用清单中的记录"""
+        cached = self._stat.get(path)
+        if cached is not None and cached[:2] == source_stat(path):
+            return cached[2]
+        return file_digest(path)
+
+    def is_done(self, path, digest, mode, signature):
+        rec = self._records.get((path, mode))
+        return rec is not None and rec['digest'] == digest and rec['signature'] == signature
+
+    def record(self, path, digest, modes, signatures):
+        """
+        登记一张图像已完成的若干增强方式（追加写入并立即 flush，中断后已完成的记录不会丢失）
+        signatures: {mode: 参数签名}
+        """
+        size, mtime_ns = source_stat(path)
+        recs = [{
+            'path': path, 'mode': mode, 'digest': digest, 'signature': signatures[mode],
+            'size': size, 'mtime_ns': mtime_ns,
+        } for mode in modes]
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(rec, ensure_ascii=False) + '\n' for rec in recs)
+                f.flush()
+            self._lines += len(recs)
+            for rec in recs:
+                self._records[(path, rec['mode'])] = rec
+            self._stat[path] = (size, mtime_ns, digest)
+
+    def compact(self, min_lines=1024):
+        """
+        记录中的过期行过多时重写清单，每个 (path, mode) 只保留最新一条
+        先写临时文件再原子替换，中途中断不会损坏原清单
+        """
+        with self._lock:
+            if self._lines - len(self._records) < min_lines:
+                return
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.writelines(json.dumps(rec, ensure_ascii=False) + '\n' for rec in self._records.values())
+            os.replace(tmp, self.path)
+            self._lines = len(self._records)
@@ -0,0 +1,186 @@
+# 预解码平面缓存：一次性把整个目录解码、缩放并拆分为 Y / Cb / Cr 平面，写入单个文件
+# 之后反复调参时直接从内存映射中取平面（零拷贝视图），跳过 JPEG 解码、缩放与色彩空间转换
+# 文件布局：
+#   MAGIC | 各图像的 Y、Cb、Cr 平面依次相接 | JSON 索引 | 索引起始偏移（8 字节小端）
+# 索引记录生成参数（缩放尺寸 / 方式 / 缩小解码）与每张图像的偏移、尺寸、源文件 size / mtime_ns
+import json
+import mmap
+import os
+import struct
+import time
+from multiprocessing import Pool
+
+from image_io import ImageBuffer
+from image_io.shards import source_stat
+
+MAGIC = b'PLANES01'
+
+# 文件末尾的索引偏移
+_FOOTER = struct.Struct('<Q')
+
+
+def _cache_key(path):
+    return os.path.abspath(path)
+
+
+def cache_params(resize, resize_mode='nearest', draft=True):
+    """影响解码结果的参数，写入索引；读取时参数不一致的缓存不可使用"""
+    return {
+        'resize': list(resize) if resize else None,
+        'resize_mode': resize_mode if resize else None,
+        'draft': bool(draft and resize),
+    }
+
+
+def _ingest_task(job):
+    """解码一张图像（可在子进程中执行），同时记录源文件状态用于判断缓存是否过期"""
+    path, resize, resize_mode, draft = job
+    from .batch import decode_image  # batch 依赖本模块读取缓存，解码函数在调用时再导入
+    try:
+        size, mtime_ns = source_stat(path)
+        name, y_channel, cb, cr = decode_image(path, resize, resize_mode, draft)
+    except Exception as e:
+        return path, None, f'{type(e).__name__}: {e}'
+    return path, (name, size, mtime_ns, y_channel, cb, cr), None
+
+
+def build_plane_cache(paths, cache_path, resize=(446, 446), resize_mode='nearest', draft=True,
+                      workers=None, chunk_size=4, on_result=None):
+    """
+    预解码 paths 中的全部图像并写入缓存文件（先写临时文件，完成后原子替换）
+    按给出的顺序解码（tar 分片成员保持分片中的顺序，顺序读取），缓存内的布局与该顺序一致
+    参数：
+        resize, resize_mode, draft: 与 decode_image 相同，必须与之后增强运行使用的参数一致
+        workers: 解码进程数，默认取 CPU 核数；为 1 时在当前进程内顺序执行
+        on_result: 可选回调 on_result(path, name, error)
+    返回：统计字典 {total, succeeded, failed: [(path, error)], bytes, seconds, images_per_sec}
+    """
+    paths = list(paths)
+    workers = workers or os.cpu_count() or 1
+    entries = {}
+    failed = []
+    start = time.perf_counter()
+    tmp_path = cache_path + '.tmp'
+
+    jobs = [(path, resize, resize_mode, draft) for path in paths]
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        offset = len(MAGIC)
+
+        def collect(results):
+            nonlocal offset
+            for path, decoded, error in results:
+                if error is None:
+                    name, size, mtime_ns, y_channel, cb, cr = decoded
+                    for plane in (y_channel, cb, cr):
+                        f.write(plane.data)
+                    entries[_cache_key(path)] = {
+                        'name': name, 'offset': offset, 'width': y_channel.width, 'height': y_channel.height,
+                        'size': size, 'mtime_ns': mtime_ns,
+                    }
+                    offset += 3 * len(y_channel.data)
+                else:
+                    failed.append((path, error))
+                    name = None
+                if on_result is not None:
+                    on_result(path, name, error)
+
+        if workers == 1 or len(jobs) <= 1:
+            collect(map(_ingest_task, jobs))
+        else:
+            with Pool(processes=min(workers, len(jobs))) as pool:
+                # 有序返回：缓存文件内的布局与路径顺序一致，同样的输入得到同样的文件
+                collect(pool.imap(_ingest_task, jobs, chunksize=max(1, chunk_size)))
+
+        index = dict(cache_params(resize, resize_mode, draft), entries=entries)
+        f.write(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        f.write(_FOOTER.pack(offset))
+    _OPEN_CACHES.pop(cache_path, None)  # 本进程已打开的旧映射不再复用（其视图释放后由 GC 回收）
+    os.replace(tmp_path, cache_path)
+
+    seconds = time.perf_counter() - start
+    return {
+        'total': len(paths),
+        'succeeded': len(entries),
+        'failed': sorted(failed),
+        'bytes': os.path.getsize(cache_path),
+        'seconds': seconds,
+        'images_per_sec': len(paths) / seconds if seconds > 0 else 0.0,
+    }
+
+
+class PlaneCache:
+    """
+    只读的预解码平面缓存
+    get(path) 返回的 Y / Cb / Cr 是指向内存映射的零拷贝 ImageBuffer（data 为 memoryview）；
+    多个进程打开同一缓存时共享操作系统的页缓存
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"不是平面缓存文件：{path}")
+        (index_start,) = _FOOTER.unpack(self._map[-_FOOTER.size:])
+        index = json.loads(self._map[index_start:-_FOOTER.size].decode('utf-8'))
+        self.entries = index.pop('entries')
+        self.params = index
+        self._view = memoryview(self._map)
+
+    def __repr__(self):
+        return f'PlaneCache({self.path!r}, {len(self.entries)} 张)'
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, path):
+        return _cache_key(path) in self.entries
+
+    def check(self, resize, resize_mode='nearest', draft=True):
+        """确认缓存的生成参数与本次运行一致，否则抛出 ValueError（结果会与直接解码不同）"""
+        expected = cache_params(resize, resize_mode, draft)
+        if self.params != expected:
+            raise ValueError(f"平面缓存 {self.path} 的生成参数 {self.params} 与本次运行 {expected} 不符，请重新生成")
+
+    def get(self, path):
+        """
+        取出 (图像名, Y, Cb, Cr)；未缓存或源文件已改动（size / mtime_ns 变化）时返回 None
+        """
+        entry = self.entries.get(_cache_key(path))
+        if entry is None:
+            return None
+        try:
+            stat = source_stat(path)
+        except OSError:
+            return None
+        if stat != (entry['size'], entry['mtime_ns']):
+            return None
+        w, h = entry['width'], entry['height']
+        n = w * h
+        start = entry['offset']
+        planes = [ImageBuffer.wrap(w, h, 1, self._view[start + k * n:start + (k + 1) * n]) for k in range(3)]
+        return (entry['name'], *planes)
+
+    def close(self):
+        """关闭映射；此前取出的平面视图需已全部释放"""
+        self._view.release()
+        self._map.close()
+
+
+# 每个进程内已打开的缓存（按路径），子进程各自映射一次
+_OPEN_CACHES = {}
+
+
+def open_plane_cache(cache):
+    """
+    PlaneCache 对象原样返回；路径则在当前进程内打开一次并复用
+    传给多进程批处理时应使用路径（映射不能序列化，由各子进程自行打开）
+    """
+    if cache is None or isinstance(cache, PlaneCache):
+        return cache
+    opened = _OPEN_CACHES.get(cache)
+    if opened is None:
+        opened = _OPEN_CACHES[cache] = PlaneCache(cache)
+    return opened
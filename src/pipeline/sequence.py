@@ -0,0 +1,175 @@
+# 帧序列模式：把一个目录中的连续帧（按文件名排序）或一个 Y4M 原始视频流当作序列处理，
+# 帧间复用直方图与 LUT（见 enhancement.sequence），并统计持续帧率
+# 用法：
+#   python -m pipeline.sequence camera01.y4m -o camera01_clahe.y4m -m clahe
+#   python -m pipeline.sequence frames/ -o frames_eq/ -m equalize --threshold 0.01 --smoothing 0.7
+#   python -m pipeline.sequence camera01.y4m --per-frame          # 逐帧独立增强，作为帧率对照
+import argparse
+import os
+import time
+
+from enhancement import clahe_equalization, histogram_equalization
+from enhancement.sequence import SEQUENCE_MODES, DEFAULT_THRESHOLD, DEFAULT_SMOOTHING, SequenceEnhancer
+from image_io import load_image_ycbcr, save_image_ycbcr
+from image_io.y4m import Y4MReader, Y4MWriter
+from utils import metrics
+from utils.file_utils import ensure_dir, iter_image_files
+
+# 持续帧率不计入的起始帧数（第一帧完整建表，之后几帧填充缓存）
+DEFAULT_WARMUP = 5
+
+# 逐帧独立增强（对照组）
+_PER_FRAME = {
+    'equalize': histogram_equalization,
+    'clahe': clahe_equalization,
+}
+
+
+def is_y4m(path):
+    return path.lower().endswith('.y4m')
+
+
+def iter_frames(source, max_frames=None):
+    """
+    逐帧产出 (帧名, Y 平面, 色度)
+    source 为 .y4m 文件时色度是原始 U、V 字节，为目录时是 (Cb, Cr) 两个 ImageBuffer
+    """
+    if is_y4m(source):
+        with Y4MReader(source) as reader:
+            for index, (y, chroma) in enumerate(reader):
+                if max_frames is not None and index >= max_frames:
+                    return
+                yield f'frame_{index:06d}', y, chroma
+        return
+    if not os.path.isdir(source):
+        raise ValueError(f"帧序列输入应为目录或 .y4m 文件：{source}")
+    for path in iter_image_files(source, max_files=max_frames):
+        y, cb, cr = load_image_ycbcr(path)
+        yield os.path.splitext(os.path.relpath(path, source))[0], y, (cb, cr)
+
+
+class _FrameSink:
+    """按输入类型写出增强后的帧：Y4M → Y4M（色度透传），目录 → 目录（YCbCr 直接编码为 JPEG）"""
+
+    def __init__(self, source, output):
+        self.output = output
+        self._writer = None
+        if is_y4m(source):
+            with Y4MReader(source) as reader:
+                params = reader.params
+            self._writer = Y4MWriter(output, params)
+        else:
+            ensure_dir(output)
+
+    def write(self, name, y, chroma):
+        if self._writer is not None:
+            self._writer.write(y, chroma)
+            return
+        path = os.path.join(self.output, name + '.jpg')
+        ensure_dir(os.path.dirname(path))
+        save_image_ycbcr(y, *chroma, path)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def run_sequence(source, output=None, mode='clahe', max_frames=None, warmup=DEFAULT_WARMUP, per_frame=False,
+                 on_frame=None, **params):
+    """
+    增强一个帧序列
+    参数：
+        source: 帧目录或 .y4m 文件
+        output: 输出目录或 .y4m 文件，None 时只计时不写出
+        per_frame: 为 True 时逐帧独立调用增强函数（不复用任何帧间结果），作为对照
+        on_frame: 可选回调 on_frame(帧序号, 帧名, 本帧秒数)
+        params: 传给 SequenceEnhancer（tile_size、clip_limit、threshold、smoothing 等）
+    返回：汇总字典 {frames, seconds, fps, sustained_fps, enhance_seconds, enhance_fps, stats}
+          fps 与 sustained_fps 为端到端帧率（含读取、写出），sustained_fps 不计前 warmup 帧
+    """
+    if per_frame:
+        func = _PER_FRAME[mode]
+        clahe_params = {k: v for k, v in params.items() if k in ('tile_size', 'clip_limit', 'redistribute_remainder')}
+        enhancer = None
+    else:
+        enhancer = SequenceEnhancer(mode, **params)
+    sink = _FrameSink(source, output) if output else None
+
+    frame_times = []
+    enhance_seconds = 0.0
+    start = last = time.perf_counter()
+    try:
+        for index, (name, y, chroma) in enumerate(iter_frames(source, max_frames)):
+            t0 = time.perf_counter()
+            with metrics.stage(f'enhance.{mode}'):
+                if enhancer is not None:
+                    y_enhanced = enhancer.process(y)
+                else:
+                    y_enhanced = func(y, **clahe_params) if mode == 'clahe' else func(y)
+            enhance_seconds += time.perf_counter() - t0
+            if sink is not None:
+                sink.write(name, y_enhanced, chroma)
+            metrics.count('frames.enhanced')
+
+            now = time.perf_counter()
+            frame_times.append(now - last)
+            last = now
+            if on_frame is not None:
+                on_frame(index, name, frame_times[-1])
+    finally:
+        if sink is not None:
+            sink.close()
+
+    frames = len(frame_times)
+    seconds = last - start
+    steady = frame_times[warmup:] if frames > warmup else frame_times
+    return {
+        'frames': frames,
+        'seconds': seconds,
+        'fps': frames / seconds if seconds > 0 else 0.0,
+        'sustained_fps': len(steady) / sum(steady) if sum(steady) > 0 else 0.0,
+        'enhance_seconds': enhance_seconds,
+        'enhance_fps': frames / enhance_seconds if enhance_seconds > 0 else 0.0,
+        'stats': dict(enhancer.stats) if enhancer is not None else None,
+    }
+
+
+def _ratio(part, whole):
+    return part / whole if whole else 0.0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='帧序列 / 视频增强（帧间复用直方图与 LUT，报告持续帧率）')
+    parser.add_argument('input', help='帧目录（按文件名排序）或 .y4m 文件')
+    parser.add_argument('-o', '--output', default=None, help='输出目录或 .y4m 文件（默认只计时不写出）')
+    parser.add_argument('-m', '--mode', choices=SEQUENCE_MODES, default='clahe', help='增强方式')
+    parser.add_argument('--tile-size', type=int, default=8, help='CLAHE 网格数')
+    parser.add_argument('--clip-limit', type=int, default=40, help='CLAHE 裁剪上限')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='LUT 复用阈值（直方图归一化 L1 距离），0 表示直方图一变就重新建表')
+    parser.add_argument('--smoothing', type=float, default=DEFAULT_SMOOTHING,
+                        help='LUT 时间平滑系数 [0, 1)，0 表示不平滑')
+    parser.add_argument('--max-frames', type=int, default=None, help='最多处理的帧数')
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP, help='持续帧率不计入的起始帧数')
+    parser.add_argument('--per-frame', action='store_true', help='逐帧独立增强（对照组，不复用帧间结果）')
+    args = parser.parse_args(argv)
+
+    if args.output and is_y4m(args.input) != is_y4m(args.output):
+        parser.error('Y4M 输入只能写出为 .y4m 文件，帧目录只能写出为目录')
+    params = {'tile_size': args.tile_size, 'clip_limit': args.clip_limit}
+    if not args.per_frame:
+        params.update(threshold=args.threshold, smoothing=args.smoothing)
+    summary = run_sequence(args.input, args.output, args.mode, args.max_frames, args.warmup, args.per_frame,
+                           **params)
+
+    print(f"🎞  {summary['frames']} 帧，耗时 {summary['seconds']:.2f}s，平均 {summary['fps']:.2f} 帧/秒，"
+          f"持续 {summary['sustained_fps']:.2f} 帧/秒（增强部分 {summary['enhance_fps']:.2f} 帧/秒）")
+    stats = summary['stats']
+    if stats:
+        print(f"   变化分段 {_ratio(stats['segments_changed'], stats['segments']):.1%}，"
+              f"重新统计 {stats['recounts']} 次，LUT 重建 {stats['luts_rebuilt']} / 复用 {stats['luts_reused']}，"
+              f"行带复用 {_ratio(stats['bands_reused'], stats['bands']):.1%}")
+
+
+if __name__ == '__main__':
+    main()
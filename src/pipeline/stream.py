@@ -0,0 +1,281 @@
+# 流式生产者 / 消费者流水线：
+#   遍历目录（惰性）→ [路径队列] → 解码线程池 → [解码队列] → 增强阶段 → [写出队列] → 编码 / 写出线程池
+# 各阶段之间都是有界队列，数据集再大，内存中同时存在的图像数量也有上限；
+# 解码、编码（Pillow 在 C 层释放 GIL）与磁盘 I/O 和增强计算重叠进行
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_utils import iter_image_files
+from utils import metrics
+from .batch import DEFAULT_MODES, prepare_output_dirs, decode_image, enhance_image, write_outputs
+from .batch import plan_images, mode_signatures
+from .manifest import Manifest
+from .plane_cache import open_plane_cache
+
+# 队列结束标记：每个生产者退出时放入一个
+_DONE = object()
+
+
+class StageQueue(queue.Queue):
+    """
+    带统计的有界队列：记录累计出入队数量与历史最大深度，便于观察各阶段是否成为瓶颈
+    """
+
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.name = name
+        self.put_count = 0
+        self.get_count = 0
+        self.max_depth = 0
+
+    def _put(self, item):
+        super()._put(item)
+        if item is not _DONE:
+            self.put_count += 1
+        self.max_depth = max(self.max_depth, len(self.queue))
+
+    def _get(self):
+        item = super()._get()
+        if item is not _DONE:
+            self.get_count += 1
+        return item
+
+    def snapshot(self):
+        """当前深度、容量、占用率、历史最大深度与累计出入队数"""
+        with self.mutex:
+            depth = len(self.queue)
+            return {
+                'depth': depth,
+                'capacity': self.maxsize,
+                'occupancy': depth / self.maxsize if self.maxsize else 0.0,
+                'max_depth': self.max_depth,
+                'put': self.put_count,
+                'get': self.get_count,
+            }
+
+
+def _enhance_task(item, backend, metrics_config=None, clahe_workers=1):
+    """
+    增强阶段的任务函数（可在子进程中执行）
+    metrics_config 不为 None 表示在子进程中：按主进程的开关采集，并随结果带回阶段数据
+    """
+    path, name, y_channel, cb, cr, modes, digest = item
+    if metrics_config is not None and metrics_config != metrics.METRICS.config():
+        metrics.METRICS.configure(**metrics_config)
+    with metrics.trace(path):
+        outputs = enhance_image(name, y_channel, cb, cr, modes, backend, clahe_workers)
+    stage_data = metrics.METRICS.drain() if metrics_config is not None and metrics.is_enabled() else None
+    return path, name, outputs, modes, digest, stage_data
+
+
+class StreamPipeline:
+    """
+    流式批处理流水线
+    参数：
+        decode_threads: 解码线程数
+        enhance_workers: 增强阶段进程数；为 1 时在本进程的增强线程中直接计算
+        write_threads: 编码 / 写出线程数
+        queue_size: 每个阶段间队列的容量（图像数）
+        manifest: 增量处理清单（Manifest 对象或清单文件路径），None 时全部重新处理
+        resize_mode: 缩放方式（'nearest' | 'bilinear' | 'area'）
+        draft: 是否对 JPEG 启用缩小解码
+        cache: 预解码平面缓存文件路径，命中的图像跳过解码
+        clahe_workers: CLAHE 单图进程数（大图走多进程 CLAHE，见 enhance_image）
+    """
+
+    def __init__(self, output_dir, resize=(446, 446), modes=DEFAULT_MODES, backend=None,
+                 decode_threads=2, enhance_workers=1, write_threads=2, queue_size=8, manifest=None,
+                 resize_mode='nearest', draft=True, cache=None, clahe_workers=1):
+        self.output_dir = output_dir
+        self.resize = resize
+        self.resize_mode = resize_mode
+        self.draft = draft
+        self.cache = open_plane_cache(cache)
+        if self.cache is not None:
+            self.cache.check(resize, resize_mode, draft)
+        self.modes = tuple(modes)
+        self.backend = backend
+        self.decode_threads = decode_threads
+        self.enhance_workers = enhance_workers
+        self.clahe_workers = clahe_workers
+        self.write_threads = write_threads
+        self.manifest = Manifest(manifest) if isinstance(manifest, str) else manifest
+        self._signatures = None
+        if self.manifest is not None:
+            self._signatures = mode_signatures(self.modes, resize, resize_mode, draft)
+
+        self.paths = StageQueue('paths', queue_size)
+        self.decoded = StageQueue('decoded', queue_size)
+        self.enhanced = StageQueue('enhanced', queue_size)
+
+        self._lock = threading.Lock()
+        self.succeeded = 0
+        self.skipped = 0
+        self.failed = []
+        self._on_result = None
+
+    # === 统计 ===
+    def stats(self):
+        """各阶段队列快照及当前完成情况，可在运行中随时调用"""
+        with self._lock:
+            done = {'succeeded': self.succeeded, 'skipped': self.skipped, 'failed': len(self.failed)}
+        return {
+            'queues': {q.name: q.snapshot() for q in (self.paths, self.decoded, self.enhanced)},
+            **done,
+        }
+
+    def _finish(self, path, name, error):
+        with self._lock:
+            if error is None:
+                self.succeeded += 1
+            else:
+                self.failed.append((path, error))
+                metrics.count('images.failed')
+            # 回调在锁内串行执行，调用方无需考虑多线程同时回调
+            if self._on_result is not None:
+                self._on_result(path, name, error)
+
+    # === 各阶段 ===
+    def _walk(self, source):
+        # 计算内容哈希、比对清单也在遍历线程中完成，与下游阶段重叠
+        def skip(path):
+            with self._lock:
+                self.skipped += 1
+
+        try:
+            jobs = plan_images(source, self.output_dir, self.resize, self.modes, self.manifest,
+                               on_skip=skip, resize_mode=self.resize_mode, draft=self.draft)
+            for job in jobs:
+                self.paths.put(job)
+        finally:
+            for _ in range(self.decode_threads):
+                self.paths.put(_DONE)
+
+    def _decode(self):
+        try:
+            while True:
+                job = self.paths.get()
+                if job is _DONE:
+                    break
+                path, modes, digest = job
+                try:
+                    with metrics.trace(path):
+                        name, y_channel, cb, cr = decode_image(path, self.resize, self.resize_mode, self.draft,
+                                                               self.cache)
+                except Exception as e:
+                    self._finish(path, None, f'{type(e).__name__}: {e}')
+                    continue
+                self.decoded.put((path, name, y_channel, cb, cr, modes, digest))
+        finally:
+            self.decoded.put(_DONE)
+
+    def _enhance(self):
+        pool = ProcessPoolExecutor(self.enhance_workers) if self.enhance_workers > 1 else None
+        inflight = deque()
+
+        def emit(path, compute):
+            """compute 为无参可调用对象：直接计算，或等待子进程结果（future.result）"""
+            try:
+                result = compute()
+            except Exception as e:
+                self._finish(path, None, f'{type(e).__name__}: {e}')
+                return
+            self.enhanced.put(result)
+
+        try:
+            remaining = self.decode_threads
+            while remaining:
+                item = self.decoded.get()
+                if item is _DONE:
+                    remaining -= 1
+                    continue
+                if pool is None:
+                    emit(item[0], lambda: _enhance_task(item, self.backend, clahe_workers=self.clahe_workers))
+                    continue
+                # 进程池中同时在算的图像数有上限，保持整条流水线内存有界
+                task = pool.submit(_enhance_task, item, self.backend, metrics.METRICS.config(), self.clahe_workers)
+                inflight.append((item[0], task.result))
+                if len(inflight) >= 2 * self.enhance_workers:
+                    emit(*inflight.popleft())
+            while inflight:
+                emit(*inflight.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            for _ in range(self.write_threads):
+                self.enhanced.put(_DONE)
+
+    def _write(self):
+        while True:
+            item = self.enhanced.get()
+            if item is _DONE:
+                break
+            path, name, outputs, modes, digest, stage_data = item
+            metrics.METRICS.merge(stage_data)
+            try:
+                with metrics.trace(path):
+                    write_outputs(outputs, self.output_dir)
+                if self.manifest is not None and digest is not None:
+                    self.manifest.record(path, digest, modes, self._signatures)
+            except Exception as e:
+                self._finish(path, name, f'{type(e).__name__}: {e}')
+            else:
+                self._finish(path, name, None)
+
+    # === 运行 ===
+    def run(self, source, on_result=None, monitor=None, monitor_interval=1.0):
+        """
+        处理 source（任意路径可迭代对象，可为惰性生成器）中的全部图像
+        参数：
+            on_result: 每完成一张调用 on_result(path, name, error)
+            monitor: 每隔 monitor_interval 秒调用 monitor(stats) 观察队列深度与占用率
+        返回：统计字典 {total, succeeded, skipped, failed, seconds, images_per_sec, queues}
+        """
+        self._on_result = on_result
+        prepare_output_dirs(self.output_dir, self.modes)
+        start = time.perf_counter()
+
+        threads = [threading.Thread(target=self._walk, args=(source,), name='walk')]
+        threads += [threading.Thread(target=self._decode, name=f'decode-{i}') for i in range(self.decode_threads)]
+        threads.append(threading.Thread(target=self._enhance, name='enhance'))
+        threads += [threading.Thread(target=self._write, name=f'write-{i}') for i in range(self.write_threads)]
+        for t in threads:
+            t.daemon = True
+            t.start()
+
+        last = threads[-self.write_threads:]
+        while any(t.is_alive() for t in last):
+            for t in last:
+                t.join(monitor_interval if monitor else None)
+            if monitor and any(t.is_alive() for t in last):
+                monitor(self.stats())
+        for t in threads:
+            t.join()
+
+        if self.manifest is not None:
+            self.manifest.compact()
+        seconds = time.perf_counter() - start
+        processed = self.succeeded + len(self.failed)
+        return {
+            'total': processed + self.skipped,
+            'succeeded': self.succeeded,
+            'skipped': self.skipped,
+            'failed': sorted(self.failed),
+            'seconds': seconds,
+            'images_per_sec': processed / seconds if seconds > 0 else 0.0,
+            'queues': self.stats()['queues'],
+        }
+
+
+def run_stream(input_dir, output_dir, max_files=None, **kwargs):
+    """
+    便捷入口：惰性遍历 input_dir 并以流水线方式处理
+    其余参数见 StreamPipeline 与 StreamPipeline.run
+    """
+    run_keys = ('on_result', 'monitor', 'monitor_interval')
+    run_kwargs = {k: kwargs.pop(k) for k in run_keys if k in kwargs}
+    pipeline = StreamPipeline(output_dir, **kwargs)
+    return pipeline.run(iter_image_files(input_dir, max_files=max_files), **run_kwargs)
@@ -0,0 +1,154 @@
+# 异步输出写出服务：每张图像的 12 个输出文件（4 种方式 × 增强图 / 直方图 / CDF）交给后台线程编码并写盘
+# 计算循环只负责提交，不等待磁盘；Pillow 编码时释放 GIL，多个写出线程可真正并行
+# 在途字节数有上限：写盘跟不上时 submit 阻塞（背压）；批处理同时按名额分发任务（见 batch._gated），
+# submit 阻塞时子进程很快停止领取新任务，主进程内存不随运行长度增长
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from image_io import save_image
+from utils import metrics
+from utils.file_utils import ensure_dir
+
+# 默认在途（已提交、未写完）像素字节上限
+DEFAULT_MAX_INFLIGHT_BYTES = 256 << 20
+
+
+class OutputWriter:
+    """
+    线程池写出服务
+    参数：
+        output_dir: 输出根目录，submit 的相对路径以此为基准
+        threads: 编码 / 写出线程数
+        max_inflight_bytes: 在途像素字节上限（按 ImageBuffer 数据长度计）；单组超过上限时仍会放行，避免死锁
+        shard: 可选 TarShardWriter，给出时编码结果写入该 tar 分片（成员名为相对路径），不创建目录与文件
+    用法：
+        with OutputWriter(out) as writer:
+            writer.submit(path, outputs, on_done)
+        # 退出时等待全部写完，writer.errors 为 [(输出路径, 错误)]
+    错误不会被静默丢弃：失败的组经 on_done(key, error) 交给调用方；没有 on_done 的组写出失败、
+    或 on_done 本身抛出异常时，with 块正常退出会抛出 ValueError（块内已有异常时不覆盖，仍可查看 errors）
+    """
+
+    def __init__(self, output_dir, threads=4, max_inflight_bytes=DEFAULT_MAX_INFLIGHT_BYTES, shard=None):
+        self.output_dir = output_dir
+        self.shard = shard
+        self.max_inflight_bytes = max_inflight_bytes
+        self.errors = []
+        self.written = 0
+        self._unreported = []
+        self._pool = ThreadPoolExecutor(max(1, threads), thread_name_prefix='writer')
+        self._cond = threading.Condition()
+        self._inflight = 0
+        self._pending = 0
+        self._dirs = set()
+        self._dirs_lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        if exc_type is None and self._unreported:
+            shown = '；'.join(f'{path}: {error}' for path, error in self._unreported[:3])
+            more = f' 等 {len(self._unreported)} 项' if len(self._unreported) > 3 else ''
+            raise ValueError(f"输出写出失败（未经 on_done 报告）：{shown}{more}")
+
+    @property
+    def inflight_bytes(self):
+        return self._inflight
+
+    def _ensure_parent(self, path):
+        """每个目录只创建一次（首次写入该目录时）"""
+        parent = os.path.dirname(path)
+        if parent in self._dirs:
+            return
+        with self._dirs_lock:
+            if parent not in self._dirs:
+                ensure_dir(parent)
+                self._dirs.add(parent)
+
+    def submit(self, key, outputs, on_done=None):
+        """
+        提交一组输出 [(相对路径, ImageBuffer)]（通常为一张图像的全部输出）
+        on_done(key, error) 在这一组全部写完后于写出线程中调用，error 为第一个失败的描述或 None
+        """
+        if self._closed:
+            raise ValueError("写出服务已关闭")
+        outputs = list(outputs)
+        size = sum(len(image.data) for _, image in outputs)
+        with self._cond:
+            while self._inflight and self._inflight + size > self.max_inflight_bytes:
+                self._cond.wait()
+            self._inflight += size
+            self._pending += 1
+        group = {'key': key, 'remaining': len(outputs), 'size': size, 'error': None, 'on_done': on_done}
+        if not outputs:
+            self._finish_group(group)
+            return
+        for rel_path, image in outputs:
+            self._pool.submit(self._write_one, group, rel_path, image)
+
+    def _write_one(self, group, rel_path, image):
+        path = os.path.join(self.output_dir, rel_path)
+        error = None
+        try:
+            with metrics.trace(group['key']):
+                if self.shard is not None:
+                    self._write_member(rel_path, image)
+                else:
+                    self._ensure_parent(path)
+                    save_image(image, path)
+            metrics.count('files.written')
+        except Exception as e:
+            error = f'{type(e).__name__}: {e}'
+        with self._cond:
+            if error is None:
+                self.written += 1
+            else:
+                self.errors.append((path, error))
+                if group['on_done'] is None:
+                    self._unreported.append((path, error))
+                if group['error'] is None:
+                    group['error'] = error
+            group['remaining'] -= 1
+            last = group['remaining'] == 0
+        if last:
+            self._finish_group(group)
+
+    def _write_member(self, rel_path, image):
+        """编码到内存后追加为分片成员（格式与写文件时相同：.png 为 PNG，其余为 JPEG）"""
+        buf = io.BytesIO()
+        save_image(image, buf, format='PNG' if rel_path.lower().endswith('.png') else 'JPEG')
+        self.shard.add(rel_path.replace(os.sep, '/'), buf.getvalue())
+
+    def _finish_group(self, group):
+        try:
+            if group['on_done'] is not None:
+                group['on_done'](group['key'], group['error'])
+        except Exception as e:
+            error = (group['key'], f'{type(e).__name__}: {e}')
+            with self._cond:
+                self.errors.append(error)
+                self._unreported.append(error)
+        finally:
+            with self._cond:
+                self._inflight -= group['size']
+                self._pending -= 1
+                self._cond.notify_all()
+
+    def flush(self):
+        """等待已提交的全部输出写完"""
+        with self._cond:
+            while self._pending:
+                self._cond.wait()
+
+    def close(self):
+        """写完全部输出并停止线程池，返回失败列表 [(输出路径, 错误)]"""
+        if not self._closed:
+            self.flush()
+            self._closed = True
+            self._pool.shutdown(wait=True)
+        return self.errors
@@ -0,0 +1,63 @@
+# 后端一致性：每种增强方式用到的后端函数都要经过 backend.parity 的逐函数比较
+# 运行：cd src && python -m pytest tests（或 python -m unittest discover tests）
+import os
+import sys
+import unittest
+from unittest import mock
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+import backend  # noqa: E402
+from backend import BACKEND_FUNCTIONS, available_backends, get_backend, register_backend  # noqa: E402
+from backend.parity import TOLERANCE, check_parity  # noqa: E402
+from pipeline.batch import AVAILABLE_MODES, enhance_methods  # noqa: E402
+
+HAS_NUMPY = 'numpy' in available_backends()
+
+
+class RecordingBackend:
+    """转发到参考后端并记录被调用的函数名"""
+
+    def __init__(self):
+        self.called = set()
+        ref = get_backend('python')
+        for name in BACKEND_FUNCTIONS:
+            setattr(self, name, self._wrap(name, getattr(ref, name)))
+
+    def _wrap(self, name, func):
+        def call(*args, **kwargs):
+            self.called.add(name)
+            return func(*args, **kwargs)
+        return call
+
+
+class BackendParityTest(unittest.TestCase):
+
+    def test_every_mode_uses_a_checked_function(self):
+        methods = enhance_methods('python')
+        for mode in AVAILABLE_MODES:
+            with self.subTest(mode=mode):
+                self.assertIn(methods[mode].__name__, BACKEND_FUNCTIONS)
+        self.assertEqual(set(TOLERANCE), set(BACKEND_FUNCTIONS))
+
+    def test_check_parity_covers_every_function(self):
+        recorder = RecordingBackend()
+        with mock.patch.dict(backend._REGISTRY):
+            register_backend('recording', recorder)
+            self.assertEqual(check_parity('recording'), [])
+        self.assertEqual(recorder.called, set(BACKEND_FUNCTIONS))
+
+    @unittest.skipUnless(HAS_NUMPY, '未安装 NumPy')
+    def test_numpy_matches_reference(self):
+        failures = check_parity('numpy')
+        methods = enhance_methods('numpy')
+        for mode in AVAILABLE_MODES:
+            func = methods[mode].__name__
+            with self.subTest(mode=mode, func=func):
+                self.assertEqual([f for f in failures if f[0] == func], [])
+        self.assertEqual(failures, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
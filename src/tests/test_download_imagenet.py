@@ -0,0 +1,214 @@
+# data/download_imagenet.py 的端到端测试：本地 HTTP 服务器提供测试用 tar（支持 Range，可让首个响应中途断开）
+# 运行：cd src && python -m pytest tests（或 python -m unittest discover tests）
+import hashlib
+import io
+import os
+import random
+import sys
+import tarfile
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(SRC, 'data'))
+
+import download_imagenet as dl  # noqa: E402
+from image_io.shards import TarShard  # noqa: E402
+
+
+def make_fixture_tar(path, count, size, seed):
+    """生成测试用 tar：count 个随机内容的 .JPEG 成员，返回 {成员名: 字节}"""
+    rng = random.Random(seed)
+    files = {}
+    with tarfile.open(path, 'w', format=tarfile.GNU_FORMAT) as tar:
+        for i in range(count):
+            name = f'img_{seed}_{i:03d}.JPEG'
+            data = rng.randbytes(size + rng.randrange(size))
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            files[name] = data
+    return files
+
+
+class FixtureServer:
+    """
+    提供 root 目录中文件的 HTTP 服务器
+    drop_after 给出时，每个文件的第一次响应只发送这么多字节就断开连接；requests 记录 (路径, Range 头)
+    """
+
+    def __init__(self, root, drop_after=None):
+        self.root = root
+        self.drop_after = drop_after
+        self.requests = []
+        self._dropped = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_port}'
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def handle(self, handler):
+        rng = handler.headers.get('Range')
+        with self._lock:
+            self.requests.append((handler.path, rng))
+        path = os.path.join(self.root, handler.path.lstrip('/'))
+        if not os.path.isfile(path):
+            handler.send_response(404)
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        start = int(rng.split('=')[1].split('-')[0]) if rng else 0
+        if start >= len(data) > 0:
+            handler.send_response(416)
+            handler.send_header('Content-Range', f'bytes */{len(data)}')
+            handler.send_header('Content-Length', '0')
+            handler.end_headers()
+            return
+        if rng:
+            handler.send_response(206)
+            handler.send_header('Content-Range', f'bytes {start}-{len(data) - 1}/{len(data)}')
+        else:
+            handler.send_response(200)
+        body = data[start:]
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        with self._lock:
+            drop = self.drop_after is not None and handler.path not in self._dropped
+            self._dropped.add(handler.path)
+        if drop:
+            handler.wfile.write(body[:self.drop_after])
+            handler.wfile.flush()
+            handler.close_connection = True
+            return
+        handler.wfile.write(body)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class DownloadTest(unittest.TestCase):
+    SYNSETS = ('n001', 'n002')
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = self._tmp.name
+        self.served = os.path.join(self.tmp, 'served')
+        os.makedirs(self.served)
+        self.files = {}
+        self.digests = {}
+        for seed, sid in enumerate(self.SYNSETS):
+            path = os.path.join(self.served, f'{sid}.tar')
+            self.files[sid] = make_fixture_tar(path, count=24, size=96 << 10, seed=seed)
+            with open(path, 'rb') as f:
+                self.digests[sid] = hashlib.sha256(f.read()).hexdigest()
+        self.tar_dir = os.path.join(self.tmp, 'tars')
+        self.extract_dir = os.path.join(self.tmp, 'extracted')
+        # 重试前不等待
+        patcher = mock.patch.object(dl.time, 'sleep')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+    def serve(self, drop_after=None):
+        server = FixtureServer(self.served, drop_after)
+        self.addCleanup(server.close)
+        return server
+
+    def run_main(self, server, *args):
+        with mock.patch('builtins.print'):
+            dl.main([*args, '--base-url', server.base_url, '--tar-dir', self.tar_dir,
+                     '--extract-dir', self.extract_dir])
+
+    def write_checksums(self, digests):
+        path = os.path.join(self.tmp, 'sums.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            for sid, digest in digests.items():
+                f.write(f'{digest}  {sid}.tar\n')
+        return path
+
+    def assert_extracted(self, sid):
+        folder = os.path.join(self.extract_dir, sid)
+        self.assertEqual(sorted(os.listdir(folder)), sorted(self.files[sid]))
+        for name, data in self.files[sid].items():
+            with open(os.path.join(folder, name), 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+    def test_resume_after_dropped_connection(self):
+        server = self.serve(drop_after=1_500_000)
+        self.run_main(server, *self.SYNSETS, '--checksums', self.write_checksums(self.digests))
+        for sid in self.SYNSETS:
+            self.assert_extracted(sid)
+            ranges = [rng for path, rng in server.requests if path == f'/{sid}.tar']
+            self.assertEqual(ranges[0], None)
+            self.assertRegex(ranges[1], r'^bytes=[1-9]\d*-$')
+            with open(os.path.join(self.tar_dir, f'{sid}.tar.sha256'), encoding='utf-8') as f:
+                self.assertEqual(f.read().split()[0], self.digests[sid])
+            self.assertFalse(os.path.exists(os.path.join(self.tar_dir, f'{sid}.tar.part')))
+
+    def test_resume_from_partial_file(self):
+        server = self.serve()
+        os.makedirs(self.tar_dir)
+        with open(os.path.join(self.served, 'n001.tar'), 'rb') as f:
+            head = f.read(700_000)
+        with open(os.path.join(self.tar_dir, 'n001.tar.part'), 'wb') as f:
+            f.write(head)
+        self.run_main(server, 'n001')
+        self.assertEqual(server.requests, [('/n001.tar', 'bytes=700000-')])
+        self.assert_extracted('n001')
+
+    def test_checksum_mismatch(self):
+        server = self.serve()
+        with self.assertRaises(SystemExit):
+            self.run_main(server, 'n001', 'n002', '--checksums', self.write_checksums({'n001': '0' * 64}))
+        self.assertFalse(os.path.exists(os.path.join(self.tar_dir, 'n001.tar')))
+        self.assertFalse(os.path.exists(os.path.join(self.extract_dir, 'n001')))
+        self.assert_extracted('n002')
+
+    def test_rerun_with_checksums_on_completed_synset(self):
+        server = self.serve()
+        self.run_main(server, 'n001', '--no-extract')
+        self.run_main(server, 'n001', '--no-extract', '--checksums', self.write_checksums(self.digests))
+        self.assertEqual(len(server.requests), 1)
+        with self.assertRaises(SystemExit):
+            self.run_main(server, 'n001', '--no-extract', '--checksums', self.write_checksums({'n001': '0' * 64}))
+        self.assertFalse(os.path.exists(os.path.join(self.tar_dir, 'n001.tar')))
+
+    def test_no_extract_index_matches_shard_reads(self):
+        server = self.serve(drop_after=1_000_000)
+        self.run_main(server, 'n002', '--no-extract')
+        self.assertFalse(os.path.exists(os.path.join(self.extract_dir, 'n002')))
+        path = os.path.join(self.tar_dir, 'n002.tar')
+        # 必须直接使用下载时写出的索引，而不是重新遍历 tar 头
+        with mock.patch.object(TarShard, '_build_index', side_effect=AssertionError), TarShard(path) as shard:
+            self.assertEqual(shard.names(), list(self.files['n002']))
+            for name, data in self.files['n002'].items():
+                self.assertEqual(shard.read(name), data)
+
+    def test_missing_synset_leaves_no_part_file(self):
+        server = self.serve()
+        with self.assertRaises(SystemExit):
+            self.run_main(server, 'n404', '--no-extract')
+        self.assertEqual(os.listdir(self.tar_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+# main.py --group-by-size：批处理按尺寸分组后的顺序分发图像，同尺寸图像连续处理
+# 运行：cd src && python -m pytest tests
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+import main  # noqa: E402
+import pipeline.batch as batch  # noqa: E402
+
+# 文件名顺序与尺寸交错：按名称排序时相邻图像尺寸都不同
+SIZES = [(40, 30), (24, 24), (40, 30), (32, 20), (24, 24), (40, 30), (32, 20), (40, 30)]
+
+
+class GroupBySizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.input = os.path.join(self._tmp.name, 'input')
+        self.output = os.path.join(self._tmp.name, 'output')
+        os.makedirs(self.input)
+        self.sizes = {}
+        for i, size in enumerate(SIZES):
+            path = os.path.join(self.input, f'img_{i:02d}.jpg')
+            Image.new('RGB', size, (i * 30, 100, 200 - i * 20)).save(path)
+            self.sizes[f'img_{i:02d}'] = size
+
+    def dispatched(self, *args):
+        """运行 main.py 批处理（单进程），返回交给计算阶段的图像名顺序"""
+        order = []
+        compute = batch._compute_safe
+
+        def record(job, **kwargs):
+            order.append(os.path.splitext(os.path.basename(job[0]))[0])
+            return compute(job, **kwargs)
+
+        with mock.patch.object(batch, '_compute_safe', record), mock.patch('builtins.print'):
+            main.main(['-i', self.input, '-o', self.output, '-j', '1', '--resize', '16', '16',
+                       '-m', 'equalize', '--force', *args])
+        return order
+
+    def test_group_by_size_dispatch_order(self):
+        order = self.dispatched('--group-by-size')
+        self.assertEqual(sorted(order), sorted(self.sizes))
+        sizes = [self.sizes[name] for name in order]
+        # 每种尺寸的图像连续出现，组按图像数从多到少排列，组内保持文件名顺序
+        self.assertEqual(sizes, sorted(sizes, key=lambda s: (-SIZES.count(s), s)))
+        for size in set(SIZES):
+            names = [name for name in order if self.sizes[name] == size]
+            self.assertEqual(names, sorted(names))
+
+    def test_default_order_is_by_name(self):
+        self.assertEqual(self.dispatched(), sorted(self.sizes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# pipeline.writer.OutputWriter：写出失败不能在退出 with 块时被静默丢弃
+# 运行：cd src && python -m pytest tests（或 python -m unittest discover tests）
+import os
+import sys
+import tempfile
+import unittest
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+from image_io.buffer import ImageBuffer  # noqa: E402
+from pipeline.writer import OutputWriter  # noqa: E402
+
+OUTPUTS = [('clahe/a.jpg', ImageBuffer(4, 4, 1, bytes(16)))]
+
+
+class OutputWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        # 输出根目录是一个普通文件，创建子目录必然失败
+        self.blocked = os.path.join(self._tmp.name, 'blocked')
+        with open(self.blocked, 'wb'):
+            pass
+
+    def test_unreported_error_raises_on_exit(self):
+        with self.assertRaisesRegex(ValueError, 'a.jpg'):
+            with OutputWriter(self.blocked, threads=1) as writer:
+                writer.submit('a', OUTPUTS)
+        self.assertEqual(len(writer.errors), 1)
+
+    def test_error_passed_to_on_done_does_not_raise(self):
+        done = []
+        with OutputWriter(self.blocked, threads=1) as writer:
+            writer.submit('a', OUTPUTS, lambda key, error: done.append((key, error)))
+        self.assertEqual(len(done), 1)
+        self.assertIsNotNone(done[0][1])
+
+    def test_failing_on_done_raises_on_exit(self):
+        def on_done(key, error):
+            raise KeyError(key)
+
+        with self.assertRaisesRegex(ValueError, 'KeyError'):
+            with OutputWriter(self._tmp.name, threads=1) as writer:
+                writer.submit('a', OUTPUTS, on_done)
+
+    def test_exception_in_block_is_not_replaced(self):
+        with self.assertRaises(KeyError):
+            with OutputWriter(self.blocked, threads=1) as writer:
+                writer.submit('a', OUTPUTS)
+                raise KeyError('a')
+        self.assertEqual(len(writer.errors), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
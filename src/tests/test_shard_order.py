@@ -0,0 +1,64 @@
+# --shards 输入：批处理与预解码都按成员在 tar 中的顺序读取（顺序读，不按名称重排成随机跳读）
+# 运行：cd src && python -m pytest tests
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SRC)
+
+import main  # noqa: E402
+import pipeline.batch as batch  # noqa: E402
+import pipeline.plane_cache as plane_cache  # noqa: E402
+from image_io.shards import split_member_ref  # noqa: E402
+
+# tar 中的成员顺序与名称顺序相反
+MEMBERS = [f'img_{i:02d}.jpg' for i in range(6, 0, -1)]
+
+
+class ShardOrderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.shard = os.path.join(self._tmp.name, 'input.tar')
+        self.output = os.path.join(self._tmp.name, 'output')
+        with tarfile.open(self.shard, 'w') as tar:
+            for i, name in enumerate(MEMBERS):
+                buf = io.BytesIO()
+                Image.new('RGB', (24 + i, 20), (i * 40, 90, 160)).save(buf, format='JPEG')
+                info = tarfile.TarInfo(name)
+                info.size = buf.tell()
+                buf.seek(0)
+                tar.addfile(info, buf)
+
+    def run_main(self, module, func, *args):
+        """运行 main.py（单进程），返回交给 module.func 的成员名顺序"""
+        order = []
+        original = getattr(module, func)
+
+        def record(job, **kwargs):
+            order.append(split_member_ref(job[0])[1])
+            return original(job, **kwargs)
+
+        with mock.patch.object(module, func, record), mock.patch('builtins.print'):
+            main.main(['--shards', '-i', self.shard, '-o', self.output, '-j', '1', '--resize', '16', '16',
+                       '-m', 'equalize', *args])
+        return order
+
+    def test_batch_reads_members_in_tar_order(self):
+        self.assertEqual(self.run_main(batch, '_compute_safe', '--group-by-size'), MEMBERS)
+
+    def test_ingest_reads_members_in_tar_order(self):
+        cache = os.path.join(self._tmp.name, 'planes.bin')
+        self.assertEqual(self.run_main(plane_cache, '_ingest_task', '--cache', cache, '--ingest'), MEMBERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,22 +1,32 @@
 import os
 
-def list_image_files(folder_path, exts={'.jpg', '.jpeg', '.png'}, max_files=3):
+def iter_image_files(folder_path, exts={'.jpg', '.jpeg', '.png'}, max_files=None):
+    """
+    惰性遍历文件夹，逐个产出图像文件路径（不预先构建完整列表）
+    目录与文件按名称排序遍历，结果顺序确定
+    参数同 list_image_files
+    """
+    count = 0
+    for root, dirs, filenames in os.walk(folder_path):
+        dirs.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in exts:
+                if max_files is not None and count >= max_files:
+                    return
+                yield os.path.join(root, name)
+                count += 1
+
+
+def list_image_files(folder_path, exts={'.jpg', '.jpeg', '.png'}, max_files=None):
     """
     遍历文件夹并返回所有图像文件路径（可指定最大数量）
     参数:
         folder_path: 根目录
         exts: 允许的扩展名集合
         max_files: 返回的最大文件数（默认不限）
+    目录与文件按名称排序遍历，结果顺序确定
     """
-    files = []
-    for root, _, filenames in os.walk(folder_path):
-        for name in filenames:
-            if os.path.splitext(name)[1].lower() in exts:
-                files.append(os.path.join(root, name))
-                if max_files is not None and len(files) >= max_files:
-                    return files
-    return files
-
+    return list(iter_image_files(folder_path, exts, max_files))
 
 
 def ensure_dir(path):
@@ -1,3 +1,6 @@
+from itertools import accumulate
+
+
 def clip(value, min_val=0, max_val=255):
     """将值限制在[min_val, max_val]之间"""
     return max(min_val, min(value, max_val))
@@ -6,13 +9,9 @@ def clip(value, min_val=0, max_val=255):
 def compute_cdf(hist):
     """
     根据灰度直方图计算累计分布函数 CDF
-    返回列表 cdf[0..255]
+    返回列表 cdf[0..255]（整数）
     """
-    cdf = [0] * 256
-    cdf[0] = hist[0]
-    for i in range(1, 256):
-        cdf[i] = cdf[i - 1] + hist[i]
-    return cdf
+    return list(accumulate(hist))
 
 
 def bilinear_interpolate(a, b, c, d, wx, wy):
@@ -0,0 +1,289 @@
+# 轻量级分阶段计时与计数：定位时间花在解码、缩放、色彩空间、增强、直方图渲染、合并还是编码上
+# 默认关闭；关闭时 stage() 返回共享的空上下文，@timed 包装只多一次布尔判断，开销可忽略
+# 开启方式：metrics.enable(...)，或环境变量 ENHANCE_METRICS=1（子进程同样生效）
+# 多进程时各子进程先在本进程内累计，再由 drain() 取出增量、在主进程 merge() 汇总
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from functools import wraps
+
+# 环境变量：非空且不为 0 时默认开启
+METRICS_ENV = 'ENHANCE_METRICS'
+
+# Prometheus 指标名前缀
+PROMETHEUS_PREFIX = 'enhance'
+
+# 关闭时所有 stage() 共享的空上下文
+_NULL = nullcontext()
+
+
+class _Stage:
+    """一次阶段计时（开启时由 stage() 创建）"""
+    __slots__ = ('metrics', 'name', 'start', 'mem_start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        if self.metrics.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.mem_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        peak = None
+        if self.metrics.memory:
+            peak = max(tracemalloc.get_traced_memory()[1] - self.mem_start, 0)
+        self.metrics.record(self.name, elapsed, peak)
+        return False
+
+
+class Metrics:
+    """
+    阶段耗时 + 计数器 + 可选的单图轨迹
+    属性：
+        enabled: 是否采集
+        memory: 是否用 tracemalloc 记录各阶段峰值内存（开销较大，阶段嵌套或多线程并发时为近似值）
+        traces: 是否记录单图轨迹（每张图像各阶段的开始时刻与耗时）
+    阶段耗时为包含式：嵌套阶段的时间同时计入内外两层
+    """
+
+    def __init__(self, enabled=False, memory=False, traces=False):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.enabled = enabled
+        self.memory = memory
+        self.traces = traces
+        self.reset()
+
+    def reset(self):
+        """清空已采集的数据（不改变开关）"""
+        with self._lock:
+            self._stages = {}    # 名称 → [次数, 总秒数, 最小, 最大, 峰值字节]
+            self._counters = {}  # 名称 → 累计值
+            self._traces = {}    # 图像 → [(阶段, 开始时刻, 秒数)]
+            self._started = time.time()
+
+    def _after_fork(self):
+        # fork 出的子进程从空白开始：继承来的数据仍在父进程中，否则 drain() 会重复上报；
+        # 锁也重新创建（fork 时可能正被其他线程持有）
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def configure(self, enabled=True, memory=False, traces=False):
+        self.enabled = enabled
+        self.memory = memory and enabled
+        self.traces = traces and enabled
+
+    def config(self):
+        """当前开关，可传给子进程的 configure(**config)"""
+        return {'enabled': self.enabled, 'memory': self.memory, 'traces': self.traces}
+
+    # === 采集 ===
+    def stage(self, name):
+        """阶段计时上下文：with metrics.stage('decode'): ..."""
+        if not self.enabled:
+            return _NULL
+        return _Stage(self, name)
+
+    def timed(self, name):
+        """阶段计时装饰器：@metrics.timed('resize')"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Stage(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, value=1):
+        """累加计数器（如 'images.decoded'、'pixels.enhanced'）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def trace(self, key):
+        """
+        单图轨迹上下文：其中（当前线程内）的阶段计时同时记入 key 的轨迹
+        流式流水线中同一张图像的各阶段分布在不同线程，按 key 汇总到同一条轨迹
+        """
+        if not (self.enabled and self.traces):
+            return _NULL
+        return _TraceScope(self, key)
+
+    def record(self, name, seconds, peak=None):
+        """记录一次阶段耗时（stage / timed 内部使用，也可直接调用）"""
+        with self._lock:
+            s = self._stages.get(name)
+            if s is None:
+                self._stages[name] = [1, seconds, seconds, seconds, peak]
+            else:
+                s[0] += 1
+                s[1] += seconds
+                s[2] = min(s[2], seconds)
+                s[3] = max(s[3], seconds)
+                if peak is not None:
+                    s[4] = peak if s[4] is None else max(s[4], peak)
+            key = getattr(self._local, 'trace', None)
+            if key is not None:
+                # 轨迹的开始时刻用墙上时间（各进程的 perf_counter 起点不同）
+                self._traces.setdefault(key, []).append((name, time.time() - seconds, seconds))
+
+    # === 跨进程汇总 ===
+    def drain(self):
+        """取出并清空本进程已采集的数据（可序列化的字典），用于子进程 → 主进程汇总"""
+        with self._lock:
+            data = {'stages': self._stages, 'counters': self._counters, 'traces': self._traces}
+            self._stages, self._counters, self._traces = {}, {}, {}
+        return data
+
+    def merge(self, data):
+        """合并 drain() 的结果"""
+        if not data:
+            return
+        with self._lock:
+            for name, (n, total, lo, hi, peak) in data['stages'].items():
+                s = self._stages.get(name)
+                if s is None:
+                    self._stages[name] = [n, total, lo, hi, peak]
+                    continue
+                s[0] += n
+                s[1] += total
+                s[2] = min(s[2], lo)
+                s[3] = max(s[3], hi)
+                if peak is not None:
+                    s[4] = peak if s[4] is None else max(s[4], peak)
+            for name, value in data['counters'].items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for key, events in data['traces'].items():
+                self._traces.setdefault(key, []).extend(events)
+
+    # === 导出 ===
+    def summary(self, traces=None):
+        """
+        汇总字典：{elapsed_s, stages: {名称: {count, total_s, mean_s, min_s, max_s, share, peak_bytes}},
+                  counters, traces?}
+        share 为该阶段总耗时占全部阶段总耗时之和的比例（嵌套阶段会重复计入）
+        traces 为 None 时按开关决定是否包含单图轨迹
+        """
+        with self._lock:
+            stages = {name: list(s) for name, s in self._stages.items()}
+            counters = dict(self._counters)
+            trace_data = {key: sorted(events, key=lambda e: e[1]) for key, events in self._traces.items()}
+            started = self._started
+            elapsed = time.time() - started
+        grand = sum(s[1] for s in stages.values()) or 1.0
+        result = {
+            'elapsed_s': elapsed,
+            'stages': {
+                name: {
+                    'count': n, 'total_s': total, 'mean_s': total / n, 'min_s': lo, 'max_s': hi,
+                    'share': total / grand, 'peak_bytes': peak,
+                }
+                for name, (n, total, lo, hi, peak) in sorted(stages.items(), key=lambda kv: -kv[1][1])
+            },
+            'counters': dict(sorted(counters.items())),
+        }
+        if self.traces if traces is None else traces:
+            result['traces'] = {
+                key: {
+                    'total_s': sum(sec for _, _, sec in events),
+                    # start 为相对于 reset() 的秒数
+                    'stages': [{'stage': name, 'start': start - started, 'seconds': sec} for name, start, sec in events],
+                }
+                for key, events in sorted(trace_data.items())
+            }
+        return result
+
+    def write_json(self, path, traces=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(traces), f, ensure_ascii=False, indent=1)
+
+    def prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """Prometheus 文本格式（可交给 node_exporter 的 textfile collector）"""
+        summary = self.summary(traces=False)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{prefix}_{name}{labels} {value}')
+
+        stages = summary['stages']
+        metric('stage_seconds_total', 'counter', 'Total seconds spent in each stage',
+               [(f'{{stage="{n}"}}', f"{s['total_s']:.6f}") for n, s in stages.items()])
+        metric('stage_calls_total', 'counter', 'Number of times each stage ran',
+               [(f'{{stage="{n}"}}', s['count']) for n, s in stages.items()])
+        metric('stage_max_seconds', 'gauge', 'Slowest single call of each stage',
+               [(f'{{stage="{n}"}}', f"{s['max_s']:.6f}") for n, s in stages.items()])
+        peaks = [(f'{{stage="{n}"}}', s['peak_bytes']) for n, s in stages.items() if s['peak_bytes'] is not None]
+        if peaks:
+            metric('stage_peak_bytes', 'gauge', 'Peak traced allocation within each stage', peaks)
+        for name, value in summary['counters'].items():
+            metric(name.replace('.', '_').replace('-', '_') + '_total', 'counter', f'Counter {name}', [('', value)])
+        metric('run_seconds', 'gauge', 'Wall-clock seconds since metrics were reset',
+               [('', f"{summary['elapsed_s']:.6f}")])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix=PROMETHEUS_PREFIX):
+        # 先写临时文件再替换，textfile collector 不会读到半个文件
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(prefix))
+        os.replace(tmp, path)
+
+
+class _TraceScope:
+    __slots__ = ('metrics', 'key', 'previous')
+
+    def __init__(self, metrics, key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        local = self.metrics._local
+        self.previous = getattr(local, 'trace', None)
+        local.trace = self.key
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics._local.trace = self.previous
+        return False
+
+
+# 进程内的全局实例；各模块通过下面的模块级函数使用
+METRICS = Metrics(enabled=os.environ.get(METRICS_ENV, '') not in ('', '0'))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=METRICS._after_fork)
+
+stage = METRICS.stage
+timed = METRICS.timed
+count = METRICS.count
+trace = METRICS.trace
+
+
+def enable(memory=False, traces=False):
+    """开启采集；memory 记录各阶段峰值内存，traces 记录单图轨迹"""
+    METRICS.configure(True, memory, traces)
+
+
+def disable():
+    METRICS.configure(False)
+
+
+def is_enabled():
+    return METRICS.enabled